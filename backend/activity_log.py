@@ -0,0 +1,213 @@
+"""
+Asynchronous, batched ActivityLog writer.
+
+- Endpoints call `log_activity(...)`, which only enqueues onto a bounded
+  in-process queue; the request never waits on SQLite's write lock
+- A background thread flushes with one executemany per batch, every
+  FLUSH_INTERVAL_MS or as soon as BATCH_SIZE events are waiting
+- When the queue is full events are dropped and counted, never blocked on
+- On shutdown whatever is left is flushed; anything that cannot be written
+  goes to an NDJSON spill file (fsynced) that is replayed on the next start
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from database import ActivityLog
+
+
+MAX_QUEUE_SIZE = int(os.getenv("ACTIVITY_LOG_QUEUE_SIZE", "10000"))
+BATCH_SIZE = 500
+FLUSH_INTERVAL_MS = 200
+SHUTDOWN_FLUSH_SECONDS = 5.0
+SPILL_PATH = os.getenv(
+    "ACTIVITY_LOG_SPILL",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "activity_log.spill.ndjson"),
+)
+
+
+@dataclass
+class ActivityEvent:
+    user_id: Optional[int]
+    action: str
+    details: str
+    timestamp: datetime.datetime
+
+
+@dataclass
+class WriterCounters:
+    enqueued: int = 0
+    written: int = 0
+    dropped: int = 0
+    failed_batches: int = 0
+    spilled: int = 0
+    replayed: int = 0
+
+
+class ActivityLogWriter:
+    def __init__(self, session_factory: Callable[[], Session], max_queue: int = MAX_QUEUE_SIZE,
+                 batch_size: int = BATCH_SIZE, flush_interval_ms: int = FLUSH_INTERVAL_MS,
+                 spill_path: str = SPILL_PATH) -> None:
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.spill_path = spill_path
+        self.counters = WriterCounters()
+        self._queue: "queue.Queue[ActivityEvent]" = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            setattr(self.counters, name, getattr(self.counters, name) + n)
+
+    def log(self, user_id: Optional[int], action: str, details: str = "") -> bool:
+        """Enqueue one event. Returns False (and counts a drop) when the queue is full."""
+        event = ActivityEvent(user_id=user_id, action=action, details=details,
+                              timestamp=datetime.datetime.utcnow())
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("enqueued")
+        return True
+
+    # -- writing ---------------------------------------------------------
+
+    def _write(self, events: List[ActivityEvent]) -> None:
+        db = self.session_factory()
+        try:
+            db.execute(ActivityLog.__table__.insert(), [asdict(e) for e in events])
+            db.commit()
+        finally:
+            db.close()
+
+    def _flush(self, events: List[ActivityEvent]) -> None:
+        if not events:
+            return
+        try:
+            self._write(events)
+            self._count("written", len(events))
+        except Exception as e:
+            self._count("failed_batches")
+            print(f"[ActivityLog] Batch of {len(events)} failed, spilling: {e}")
+            self._spill(events)
+
+    def _drain(self, limit: int) -> List[ActivityEvent]:
+        events = []
+        while len(events) < limit:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    # -- spill file --------------------------------------------------------
+
+    def _spill(self, events: List[ActivityEvent]) -> None:
+        if not events:
+            return
+        with open(self.spill_path, "a", encoding="utf-8") as fh:
+            for e in events:
+                fh.write(json.dumps(dict(asdict(e), timestamp=e.timestamp.isoformat()), ensure_ascii=False) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+        self._count("spilled", len(events))
+
+    def replay_spill(self) -> int:
+        """Write events left in the spill file by a previous run, then remove it."""
+        if not os.path.exists(self.spill_path):
+            return 0
+        events = []
+        with open(self.spill_path, encoding="utf-8") as fh:
+            for line in fh:
+                if line.strip():
+                    raw = json.loads(line)
+                    raw["timestamp"] = datetime.datetime.fromisoformat(raw["timestamp"])
+                    events.append(ActivityEvent(**raw))
+        for start in range(0, len(events), self.batch_size):
+            self._write(events[start:start + self.batch_size])
+        os.remove(self.spill_path)
+        self._count("replayed", len(events))
+        if events:
+            print(f"[ActivityLog] Replayed {len(events)} spilled events")
+        return len(events)
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        try:
+            self.replay_spill()
+        except Exception as e:
+            print(f"[ActivityLog] Spill replay failed, keeping {self.spill_path}: {e}")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="activity-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = SHUTDOWN_FLUSH_SECONDS) -> None:
+        """Stop the writer, flush what is queued, spill whatever is left after `timeout`."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                break
+            self._flush(batch)
+        self._spill(self._drain(self._queue.qsize() + 1))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = asdict(self.counters)
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "running": self._thread is not None,
+            **counters,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_activity_writer() -> ActivityLogWriter:
+    from database import SessionLocal
+
+    return ActivityLogWriter(SessionLocal)
+
+
+def log_activity(user_id: Optional[int], action: str, details: str = "") -> bool:
+    return get_activity_writer().log(user_id, action, details)
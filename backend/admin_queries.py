@@ -0,0 +1,135 @@
+"""
+Admin user listing without per-user COUNT queries.
+
+- Keyset pagination: by id, or by activity (actions_count desc, id desc)
+  with an opaque "count:id" cursor
+- Report and action counts come from grouped subqueries joined once; in id
+  order they are restricted to the ids on the page
+- `export_users` streams every user as NDJSON or CSV page by page, so the
+  full result is never held in memory
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select, true
+from sqlalchemy.orm import Session
+
+from database import ActivityLog, CitizenReport, User
+
+
+MAX_PAGE_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
+SORTS = ("id", "activity")
+EXPORT_FIELDS = ("id", "email", "username", "created_at", "reports_count", "actions_count")
+
+
+def _parse_cursor(cursor: Optional[str], sort: str) -> Optional[Tuple[int, int]]:
+    if not cursor:
+        return None
+    try:
+        if sort == "activity":
+            count, user_id = cursor.split(":", 1)
+            return int(count), int(user_id)
+        return 0, int(cursor)
+    except ValueError:
+        raise ValueError(f"Invalid cursor {cursor!r}")
+
+
+def users_page(db: Session, limit: int = 50, cursor: Optional[str] = None,
+               sort: str = "id") -> Tuple[List[Dict], Optional[str]]:
+    """One page of users with counts, plus the cursor for the next page (None at the end)."""
+    if sort not in SORTS:
+        raise ValueError(f"sort must be one of {SORTS}")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = _parse_cursor(cursor, sort)
+
+    if sort == "id":
+        page = select(User.id).order_by(User.id).limit(limit)
+        if after is not None:
+            page = page.where(User.id > after[1])
+        scope = page.subquery()
+        report_filter = CitizenReport.user_id.in_(select(scope.c.id))
+        action_filter = ActivityLog.user_id.in_(select(scope.c.id))
+    else:
+        report_filter = action_filter = true()
+
+    reports = (
+        select(CitizenReport.user_id, func.count().label("n"))
+        .where(report_filter).group_by(CitizenReport.user_id).subquery()
+    )
+    actions = (
+        select(ActivityLog.user_id, func.count().label("n"))
+        .where(action_filter).group_by(ActivityLog.user_id).subquery()
+    )
+    reports_count = func.coalesce(reports.c.n, 0)
+    actions_count = func.coalesce(actions.c.n, 0)
+
+    stmt = (
+        select(User.id, User.email, User.username, User.created_at,
+               reports_count.label("reports_count"), actions_count.label("actions_count"))
+        .outerjoin(reports, reports.c.user_id == User.id)
+        .outerjoin(actions, actions.c.user_id == User.id)
+        .limit(limit)
+    )
+    if sort == "id":
+        stmt = stmt.order_by(User.id)
+        if after is not None:
+            stmt = stmt.where(User.id > after[1])
+    else:
+        stmt = stmt.order_by(actions_count.desc(), User.id.desc())
+        if after is not None:
+            stmt = stmt.where(or_(
+                actions_count < after[0],
+                and_(actions_count == after[0], User.id < after[1]),
+            ))
+
+    rows = [dict(row._mapping) for row in db.execute(stmt)]
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = f"{last['actions_count']}:{last['id']}" if sort == "activity" else str(last["id"])
+    return rows, next_cursor
+
+
+def iter_user_pages(session_factory: Callable[[], Session], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[Dict]]:
+    """Every user in id order, one keyset page at a time, each page in a short-lived session.
+
+    Id order keeps every page's aggregates scoped to its own users; activity
+    order would re-aggregate all logs per page.
+    """
+    cursor = None
+    while True:
+        db = session_factory()
+        try:
+            rows, cursor = users_page(db, limit=batch_size, cursor=cursor)
+        finally:
+            db.close()
+        if rows:
+            yield rows
+        if cursor is None:
+            return
+
+
+def _export_row(row: Dict) -> Dict:
+    return dict(row, created_at=row["created_at"].isoformat() if row["created_at"] else None)
+
+
+def export_users(session_factory: Callable[[], Session], fmt: str = "ndjson") -> Iterator[str]:
+    """NDJSON lines or CSV (with header), one chunk per page of users."""
+    if fmt not in ("ndjson", "csv"):
+        raise ValueError("format must be ndjson or csv")
+    if fmt == "csv":
+        yield ",".join(EXPORT_FIELDS) + "\r\n"
+    for rows in iter_user_pages(session_factory):
+        if fmt == "ndjson":
+            yield "".join(json.dumps(_export_row(row), ensure_ascii=False) + "\n" for row in rows)
+        else:
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+            writer.writerows(_export_row(row) for row in rows)
+            yield buffer.getvalue()
@@ -0,0 +1,175 @@
+"""
+Background warm-up for the AI stack.
+
+- Components (intent router, retriever, enhanced AI, synthesizer) are built
+  in background threads at startup instead of on the first chat request
+- Independent components build concurrently; dependents wait for their inputs
+- Per-component state and timings back the /api/ready readiness probe
+- A component that fails is retried with exponential backoff (RETRY_BASE_SECONDS
+  doubling up to RETRY_MAX_SECONDS), so a transient failure does not keep the
+  instance out of rotation until it is restarted
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+PENDING = "pending"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+RETRY_BASE_SECONDS = 5.0
+RETRY_MAX_SECONDS = 300.0
+
+
+@dataclass
+class ComponentState:
+    name: str
+    status: str = PENDING
+    depends_on: Tuple[str, ...] = ()
+    started_at: Optional[float] = None
+    duration_ms: Optional[float] = None
+    error: str = ""
+    attempts: int = 0
+    next_retry_at: Optional[float] = None
+
+
+class WarmupOrchestrator:
+    def __init__(self, retry_base_seconds: float = RETRY_BASE_SECONDS,
+                 retry_max_seconds: float = RETRY_MAX_SECONDS) -> None:
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._lock = threading.Lock()
+        self._builders: Dict[str, Callable[[], object]] = {}
+        self._states: Dict[str, ComponentState] = {}
+        self._done: Dict[str, threading.Event] = {}
+        self._ready: Dict[str, threading.Event] = {}
+        self._settled = threading.Event()
+        self._started_at: Optional[float] = None
+
+    @property
+    def started(self) -> bool:
+        return self._started_at is not None
+
+    def register(self, name: str, builder: Callable[[], object], depends_on: Tuple[str, ...] = ()) -> None:
+        with self._lock:
+            if self.started:
+                raise RuntimeError("Cannot register components after warm-up started")
+            self._builders[name] = builder
+            self._states[name] = ComponentState(name=name, depends_on=tuple(depends_on))
+            self._done[name] = threading.Event()
+            self._ready[name] = threading.Event()
+
+    def start(self) -> None:
+        """Start one daemon thread per component. Safe to call more than once."""
+        with self._lock:
+            if self.started:
+                return
+            self._started_at = time.time()
+            names = list(self._builders)
+        if not names:
+            self._settled.set()
+            return
+        for name in names:
+            threading.Thread(target=self._run, args=(name,), name=f"warmup-{name}", daemon=True).start()
+
+    def _run(self, name: str) -> None:
+        state = self._states[name]
+        for dep in state.depends_on:
+            event = self._done.get(dep)
+            if event:
+                event.wait()
+        while True:
+            with self._lock:
+                state.status = WARMING
+                state.started_at = time.time()
+                state.attempts += 1
+                state.next_retry_at = None
+            began = time.perf_counter()
+            try:
+                self._builders[name]()
+                status, error = READY, ""
+            except Exception as e:
+                status, error = FAILED, f"{type(e).__name__}: {e}"
+            delay = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (state.attempts - 1))
+            with self._lock:
+                state.status = status
+                state.error = error
+                state.duration_ms = round((time.perf_counter() - began) * 1000.0, 1)
+                if status == FAILED:
+                    state.next_retry_at = time.time() + delay
+                if all(s.status in (READY, FAILED) for s in self._states.values()):
+                    self._settled.set()
+            # Dependents go ahead after the first attempt either way.
+            self._done[name].set()
+            if status == READY:
+                self._ready[name].set()
+                return
+            print(f"[Warmup] {name} failed (attempt {state.attempts}): {error}; retrying in {delay:g}s")
+            time.sleep(delay)
+
+    def is_ready(self) -> bool:
+        """True when every component built successfully."""
+        with self._lock:
+            return self.started and all(s.status == READY for s in self._states.values())
+
+    def status(self, name: str) -> Optional[str]:
+        with self._lock:
+            state = self._states.get(name)
+            return state.status if state else None
+
+    def wait_ready(self, name: str, timeout: Optional[float] = None) -> bool:
+        """Wait until `name` has built successfully; True at once for components that are not registered."""
+        event = self._ready.get(name)
+        return event is None or event.wait(timeout)
+
+    def is_settled(self) -> bool:
+        """True when every component finished, successfully or not."""
+        return self._settled.is_set()
+
+    def wait_settled(self, timeout: Optional[float] = None) -> bool:
+        return self._settled.wait(timeout)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            components: List[Dict] = [asdict(s) for s in self._states.values()]
+            started_at = self._started_at
+        ready = self.is_ready()
+        return {
+            "ready": ready,
+            "started": started_at is not None,
+            "elapsed_ms": round((time.time() - started_at) * 1000.0, 1) if started_at else 0.0,
+            "components": {c.pop("name"): c for c in components},
+        }
+
+
+def _build_synthesizer() -> None:
+    from enhanced_gpt_ai import get_enhanced_ai
+
+    get_enhanced_ai().synthesizer.initialize()
+
+
+def register_ai_components(warmup: WarmupOrchestrator) -> None:
+    from enhanced_gpt_ai import get_enhanced_ai
+    from intent_router_v3 import get_intent_router
+    from local_retriever import get_local_retriever
+    from proactive_engine import get_proactive_engine
+
+    warmup.register("intent_router", get_intent_router)
+    warmup.register("local_retriever", get_local_retriever)
+    warmup.register("proactive_engine", get_proactive_engine)
+    # EnhancedGPTStyleAI loads NeuralClassifierV2 and reuses the router and
+    # retriever singletons, so it waits for them instead of building them twice.
+    warmup.register("enhanced_ai", get_enhanced_ai, depends_on=("intent_router", "local_retriever"))
+    warmup.register("response_synthesizer", _build_synthesizer, depends_on=("enhanced_ai",))
+
+
+@lru_cache(maxsize=1)
+def get_warmup() -> WarmupOrchestrator:
+    return WarmupOrchestrator()
@@ -0,0 +1,104 @@
+"""
+Emergency dispatch: grid-index queries vs brute force, incremental index
+updates per simulation tick, and batch assignment time.
+
+Scatters `--units` units of mixed types over the city, then times k-nearest
+and within-radius lookups for `--queries` random points, a tick's worth of
+movement re-indexed, and one Hungarian solve for `--incidents` incidents.
+
+Usage:
+    python benchmarks/emergency_dispatch.py --units 5000 --incidents 300
+"""
+
+import argparse
+import pathlib
+import statistics
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+import numpy as np
+
+from emergency_dispatch import INCIDENT_UNIT_TYPES, assign_units
+from emergency_sim import CITY_BOUNDS, METERS_PER_DEG_LAT, PATROL_SPEED_MS
+from spatial_index import GridIndex, haversine_m
+
+
+def timed(fn, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Emergency dispatch benchmark")
+    parser.add_argument("--units", type=int, default=5000)
+    parser.add_argument("--incidents", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    min_lat, min_lng, max_lat, max_lng = CITY_BOUNDS
+    lat = rng.uniform(min_lat, max_lat, args.units)
+    lng = rng.uniform(min_lng, max_lng, args.units)
+    types = rng.choice(["POLICE", "AMBULANCE", "FIRE"], args.units).astype(object)
+    status = rng.choice(["AVAILABLE", "PATROLLING", "EN_ROUTE", "ON_SCENE"], args.units).astype(object)
+    ids = [f"{t}_{i}" for i, t in enumerate(types)]
+    q_lat = rng.uniform(min_lat, max_lat, args.queries)
+    q_lng = rng.uniform(min_lng, max_lng, args.queries)
+
+    index = GridIndex()
+    index.rebuild(lat, lng)
+    available = np.isin(status, ("AVAILABLE", "PATROLLING"))
+
+    def grid_nearest() -> None:
+        for a, b in zip(q_lat, q_lng):
+            index.nearest(a, b, args.k, available)
+
+    def brute_nearest() -> None:
+        for a, b in zip(q_lat, q_lng):
+            d = np.where(available, haversine_m(a, b, lat, lng), np.inf)
+            np.argsort(d)[:args.k]
+
+    def grid_within() -> None:
+        for a, b in zip(q_lat, q_lng):
+            index.within(a, b, 1000.0, available)
+
+    per_query = lambda seconds: seconds / args.queries * 1e6
+    print(f"{args.units} units, {args.queries} queries, k={args.k}")
+    print(f"- nearest (grid):   {per_query(timed(grid_nearest, args.repeats)):8.1f} us/query")
+    print(f"- nearest (brute):  {per_query(timed(brute_nearest, args.repeats)):8.1f} us/query")
+    print(f"- within 1 km:      {per_query(timed(grid_within, args.repeats)):8.1f} us/query")
+
+    # One 1 s patrol tick: every unit moves PATROL_SPEED_MS metres.
+    heading = rng.uniform(0, 2 * np.pi, args.units)
+    moved_lat = lat + PATROL_SPEED_MS * np.cos(heading) / METERS_PER_DEG_LAT
+    moved_lng = lng + PATROL_SPEED_MS * np.sin(heading) / (METERS_PER_DEG_LAT * np.cos(np.radians(lat)))
+    rebucketed = index.update(moved_lat, moved_lng)
+    tick = timed(lambda: (index.update(lat, lng), index.update(moved_lat, moved_lng)), args.repeats) / 2
+    print(f"- index update:     {tick * 1000:8.2f} ms/tick ({rebucketed} units changed cell)")
+
+    incidents = [
+        {"id": i, "type": t, "severity": s, "lat": a, "lng": b}
+        for i, (t, s, a, b) in enumerate(zip(
+            rng.choice(list(INCIDENT_UNIT_TYPES), args.incidents),
+            rng.choice(["LOW", "MEDIUM", "HIGH", "CRITICAL"], args.incidents),
+            rng.uniform(min_lat, max_lat, args.incidents),
+            rng.uniform(min_lng, max_lng, args.incidents),
+        ))
+    ]
+    assignments = assign_units(incidents, ids, types, status, lat, lng)
+    solve = timed(lambda: assign_units(incidents, ids, types, status, lat, lng), args.repeats)
+    mean_m = np.mean([a.distance_m for a in assignments]) if assignments else 0.0
+    print(f"- batch assignment: {solve * 1000:8.1f} ms for {args.incidents} incidents x {int(available.sum())} "
+          f"available units ({len(assignments)} assigned, mean {mean_m:.0f} m)")
+
+
+if __name__ == "__main__":
+    main()
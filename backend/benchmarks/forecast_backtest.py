@@ -0,0 +1,82 @@
+"""
+Forecast backtest: holdout MAE per model and horizon, plus batch fit time.
+
+By default generates `--series` synthetic hourly sensors (daily cycle, weekly
+modulation, drift and noise) for `--days`; with `--db` it backtests the real
+rollups in that SQLite file instead.
+
+Usage:
+    python benchmarks/forecast_backtest.py --series 150 --days 28
+    python benchmarks/forecast_backtest.py --db smart_city.db
+"""
+
+import argparse
+import datetime
+import pathlib
+import statistics
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from forecasting import HORIZONS, MODELS, HourlyHistory, fit_forecasts, load_history
+
+
+def synthetic_history(series: int, days: int, seed: int = 7) -> HourlyHistory:
+    rng = np.random.default_rng(seed)
+    hours = days * 24
+    t = np.arange(hours)
+    start = datetime.datetime(2026, 1, 5)  # a Monday
+    base = rng.uniform(5, 150, size=(series, 1))
+    amplitude = base * rng.uniform(0.1, 0.5, size=(series, 1))
+    phase = rng.uniform(0, 2 * np.pi, size=(series, 1))
+    weekend = ((t // 24) % 7 >= 5)[None, :] * rng.uniform(-0.2, 0.0, size=(series, 1)) * base
+    drift = np.cumsum(rng.normal(0, 0.01, size=(series, hours)), axis=1) * base
+    noise = rng.normal(0, 0.05, size=(series, hours)) * base
+    values = base + amplitude * np.sin(2 * np.pi * t / 24 + phase) + weekend + drift + noise
+    return HourlyHistory([f"S{i:03d}" for i in range(series)], start, values)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Forecasting backtest")
+    parser.add_argument("--series", type=int, default=150)
+    parser.add_argument("--days", type=int, default=28)
+    parser.add_argument("--db", help="backtest the rollups of this SQLite database instead")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.db:
+        engine = create_engine(f"sqlite:///{args.db}")
+        db = sessionmaker(bind=engine)()
+        history = load_history(db, days=args.days)
+        db.close()
+        if history is None:
+            sys.exit("No hourly rollups in that database")
+    else:
+        history = synthetic_history(args.series, args.days)
+
+    samples = []
+    for _ in range(args.repeats):
+        started = time.perf_counter()
+        forecasts = fit_forecasts(history)
+        samples.append(time.perf_counter() - started)
+    n, hours = history.values.shape
+    print(f"Fitted {n} series x {hours} hours: median {statistics.median(samples) * 1000:.0f} ms")
+
+    with_backtest = [f for f in forecasts.values() if f.mae]
+    if not with_backtest:
+        print("History too short for a backtest; served", {f.model for f in forecasts.values()})
+        return
+    print("Holdout MAE (mean over series), by horizon " + " / ".join(f"+{h}h" for h in HORIZONS) + ":")
+    for model in MODELS:
+        mae = np.mean([f.mae[model] for f in with_backtest], axis=0)
+        wins = sum(f.model == model for f in with_backtest)
+        print(f"- {model:15s} " + " / ".join(f"{v:7.3f}" for v in mae) + f"   chosen for {wins} series")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Heatmap binning: load time and per-request bin time over N geo-tagged readings.
+
+Writes `--points` readings scattered over Almaty (a few hot spots plus
+uniform noise) into a temporary SQLite database, loads them into a
+HeatmapStore, then times uncached square and hex heatmaps with and without
+time-window / category filters.
+
+Usage:
+    python benchmarks/heatmap_bins.py --points 1000000
+"""
+
+import argparse
+import datetime
+import pathlib
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, SensorReading
+from heatmap import ALMATY_BBOX, HeatmapStore
+
+
+def seed(db, points: int, seed_value: int = 7) -> None:
+    rng = np.random.default_rng(seed_value)
+    min_lng, min_lat, max_lng, max_lat = ALMATY_BBOX
+    hot = rng.uniform((min_lat, min_lng), (max_lat, max_lng), size=(12, 2))
+    which = rng.integers(0, len(hot), points)
+    lat = np.where(rng.random(points) < 0.7, hot[which, 0] + rng.normal(0, 0.01, points), rng.uniform(min_lat, max_lat, points))
+    lng = np.where(rng.random(points) < 0.7, hot[which, 1] + rng.normal(0, 0.01, points), rng.uniform(min_lng, max_lng, points))
+    types = rng.choice(["AQI", "PM25", "NOISE"], points)
+    values = rng.uniform(0, 200, points)
+    now = datetime.datetime.utcnow()
+    ages = rng.integers(0, 7 * 24 * 3600, points)
+    table = SensorReading.__table__
+    for start in range(0, points, 50_000):
+        stop = min(points, start + 50_000)
+        db.execute(table.insert(), [
+            {"sensor_type": str(types[i]), "value": float(values[i]), "lat": float(lat[i]), "lng": float(lng[i]),
+             "timestamp": now - datetime.timedelta(seconds=int(ages[i]))}
+            for i in range(start, stop)
+        ])
+    db.commit()
+
+
+def timed(fn, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Heatmap binning benchmark")
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/heatmap.db")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        started = time.perf_counter()
+        seed(db, args.points)
+        print(f"Seeded {args.points} readings in {time.perf_counter() - started:.1f} s")
+
+        store = HeatmapStore()
+        started = time.perf_counter()
+        store.points(db, "readings")
+        print(f"Loaded into memory in {time.perf_counter() - started:.2f} s")
+
+        since = datetime.datetime.utcnow() - datetime.timedelta(days=2)
+        cases = [
+            ("square 250 m, count", dict(grid="square")),
+            ("hex 250 m, count", dict(grid="hex")),
+            ("hex 100 m, mean", dict(grid="hex", cell_m=100.0, agg="mean")),
+            ("square, last 2 days, AQI+PM25", dict(grid="square", start=since, categories=["AQI", "PM25"])),
+        ]
+        for label, params in cases:
+            store.heatmap(db, "readings", **params)  # builds the grid's cell index once
+            def uncached():
+                store._results.clear()
+                return store.heatmap(db, "readings", **params)
+            body = uncached()
+            print(f"- {label:32s} {timed(uncached, args.repeats) * 1000:7.1f} ms uncached, "
+                  f"{timed(lambda: store.heatmap(db, 'readings', **params), args.repeats) * 1000:6.2f} ms cached, "
+                  f"{len(body) / 1024:.0f} KiB")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
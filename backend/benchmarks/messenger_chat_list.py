@@ -0,0 +1,151 @@
+"""
+Chat-list benchmark: legacy per-chat query loop vs messenger_queries.chat_list.
+
+Builds a user with many chats (private + group) and checks that both
+implementations return identical payloads before timing them. The legacy
+loop counts unread messages per chat; chat_list reads the materialized
+chat_members.unread_count, so matching payloads also validate the recount.
+
+Usage:
+    python benchmarks/messenger_chat_list.py --chats 500 --messages-per-chat 40
+"""
+
+import argparse
+import datetime
+import os
+import pathlib
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, Chat, ChatMember, Message, User, UserProfile, apply_sqlite_pragmas
+from messenger_queries import chat_list, recount_unread
+from migrations import run_migrations
+
+
+def legacy_chat_list(db, user_id: int):
+    """The original get_user_chats loop, kept for comparison."""
+    memberships = db.query(ChatMember).filter(ChatMember.user_id == user_id).all()
+    chats = []
+    for membership in memberships:
+        chat = db.query(Chat).filter(Chat.id == membership.chat_id).first()
+        if not chat:
+            continue
+        last_message = db.query(Message).filter(Message.chat_id == chat.id).order_by(Message.created_at.desc()).first()
+        unread_count = db.query(Message).filter(
+            Message.chat_id == chat.id, Message.id > (membership.last_read_message_id or 0)
+        ).count()
+        chat_name = chat.name
+        chat_avatar = chat.avatar_url
+        if chat.type == "PRIVATE":
+            other_member = db.query(ChatMember).filter(ChatMember.chat_id == chat.id, ChatMember.user_id != user_id).first()
+            if other_member:
+                other_user = db.query(User).filter(User.id == other_member.user_id).first()
+                if other_user:
+                    chat_name = other_user.username
+                    profile = db.query(UserProfile).filter(UserProfile.user_id == other_user.id).first()
+                    if profile:
+                        chat_avatar = profile.avatar_url
+        member_count = db.query(ChatMember).filter(ChatMember.chat_id == chat.id).count()
+        chats.append({
+            "id": chat.id,
+            "type": chat.type,
+            "name": chat_name or f"Chat {chat.id}",
+            "avatar_url": chat_avatar,
+            "description": chat.description,
+            "member_count": member_count,
+            "unread_count": unread_count,
+            "last_message": {
+                "content": last_message.content,
+                "sender_id": last_message.sender_id,
+                "created_at": last_message.created_at.isoformat()
+            } if last_message else None,
+            "created_at": chat.created_at.isoformat()
+        })
+    chats.sort(key=lambda x: x["last_message"]["created_at"] if x["last_message"] else "", reverse=True)
+    return chats
+
+
+def populate(engine, chats: int, messages_per_chat: int, users: int = 2000) -> int:
+    """Create `chats` chats for user 1; returns that user id."""
+    rng = random.Random(7)
+    now = datetime.datetime.utcnow()
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": i, "email": f"u{i}@example.com", "username": f"user{i}", "password": "x", "created_at": now}
+            for i in range(1, users + 1)
+        ])
+        conn.execute(UserProfile.__table__.insert(), [
+            {"user_id": i, "avatar_url": f"/a/{i}.png", "last_seen": now} for i in range(2, users + 1, 2)
+        ])
+        conn.execute(Chat.__table__.insert(), [
+            {"id": c, "type": "PRIVATE" if c % 3 else "GROUP", "name": None if c % 3 else f"Group {c}",
+             "created_by": 1, "created_at": now}
+            for c in range(1, chats + 1)
+        ])
+        members = []
+        for c in range(1, chats + 1):
+            members.append({"chat_id": c, "user_id": 1, "role": "OWNER", "joined_at": now})
+            for peer in rng.sample(range(2, users + 1), 1 if c % 3 else 6):
+                members.append({"chat_id": c, "user_id": peer, "role": "MEMBER", "joined_at": now})
+        conn.execute(ChatMember.__table__.insert(), members)
+        conn.execute(Message.__table__.insert(), [
+            {"chat_id": rng.randint(1, chats), "sender_id": rng.randint(1, users), "content": f"msg {i}",
+             "message_type": "TEXT", "is_edited": False, "created_at": now - datetime.timedelta(seconds=i)}
+            for i in range(chats * messages_per_chat)
+        ])
+        # Mark roughly half of each chat as read.
+        conn.exec_driver_sql(
+            "UPDATE chat_members SET last_read_message_id = "
+            "(SELECT MAX(id) / 2 FROM messages WHERE messages.chat_id = chat_members.chat_id) WHERE user_id = 1"
+        )
+    # Rows were bulk-inserted around send_message, so build the counters in one pass.
+    db = sessionmaker(bind=engine)()
+    recount_unread(db)
+    db.commit()
+    db.close()
+    return 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Messenger chat-list benchmark")
+    parser.add_argument("--chats", type=int, default=500)
+    parser.add_argument("--messages-per-chat", type=int, default=40)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        event.listen(engine, "connect", apply_sqlite_pragmas)
+        user_id = populate(engine, args.chats, args.messages_per_chat)
+        db = sessionmaker(bind=engine)()
+
+        legacy = legacy_chat_list(db, user_id)
+        current = chat_list(db, user_id)
+        assert [c["id"] for c in legacy] == [c["id"] for c in current], "ordering differs"
+        assert legacy == current, "payload differs"
+        print(f"Payloads identical for {len(current)} chats.")
+
+        for label, fn in (("legacy loop", legacy_chat_list), ("aggregate query", chat_list)):
+            samples = []
+            for _ in range(args.repeats):
+                db.expire_all()
+                started = time.perf_counter()
+                fn(db, user_id)
+                samples.append((time.perf_counter() - started) * 1000.0)
+            print(f"- {label}: median {statistics.median(samples):.1f} ms")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Message search benchmark: LIKE '%term%' scan vs the FTS5 index.
+
+Fills a temporary database through the migration triggers with synthetic
+chat traffic, then times membership-filtered searches for rare and common
+terms with both approaches.
+
+Usage:
+    python benchmarks/messenger_search.py --messages 1000000
+"""
+
+import argparse
+import datetime
+import os
+import pathlib
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, Chat, ChatMember, Message, User, apply_sqlite_pragmas
+from messenger_search import search_messages
+from migrations import run_migrations
+
+
+WORDS = (
+    "traffic jam metro bus stop road repair park snow water power outage school "
+    "hospital pharmacy market coffee meeting tomorrow today evening morning"
+).split()
+
+
+def populate(engine, messages: int, chats: int = 2000, users: int = 5000) -> None:
+    rng = random.Random(11)
+    now = datetime.datetime.utcnow()
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": i, "email": f"u{i}@example.com", "username": f"user{i}", "password": "x", "created_at": now}
+            for i in range(1, users + 1)
+        ])
+        conn.execute(Chat.__table__.insert(), [
+            {"id": c, "type": "GROUP", "name": f"Chat {c}", "created_by": 1, "created_at": now}
+            for c in range(1, chats + 1)
+        ])
+        conn.execute(ChatMember.__table__.insert(), [
+            {"chat_id": c, "user_id": 1 if c % 10 == 0 else rng.randint(2, users), "role": "MEMBER", "joined_at": now}
+            for c in range(1, chats + 1)
+        ])
+    for start in range(0, messages, 100_000):
+        batch = []
+        for i in range(start, min(start + 100_000, messages)):
+            words = rng.choices(WORDS, k=8)
+            if i % 50_000 == 0:
+                words.append("zebracrossing")
+            batch.append({"chat_id": rng.randint(1, chats), "sender_id": rng.randint(1, users),
+                          "content": " ".join(words), "message_type": "TEXT", "is_edited": False,
+                          "created_at": now})
+        with engine.begin() as conn:
+            conn.execute(Message.__table__.insert(), batch)
+
+
+def like_search(db, user_id: int, term: str, limit: int = 20):
+    return list(db.execute(text(
+        "SELECT m.id FROM messages m JOIN chat_members cm ON cm.chat_id = m.chat_id "
+        "WHERE cm.user_id = :user_id AND m.content LIKE :pattern ORDER BY m.id DESC LIMIT :limit"
+    ), {"user_id": user_id, "pattern": f"%{term}%", "limit": limit}))
+
+
+def timed(fn, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Messenger search benchmark")
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        event.listen(engine, "connect", apply_sqlite_pragmas)
+        started = time.perf_counter()
+        populate(engine, args.messages)
+        print(f"Inserted {args.messages} messages (with FTS triggers) in {time.perf_counter() - started:.1f} s")
+        db = sessionmaker(bind=engine)()
+
+        for term in ("zebracrossing", "traffic", "metr", "traffic jam"):
+            like_ms = timed(lambda: like_search(db, 1, term), args.repeats)
+            fts_ms = timed(lambda: search_messages(db, 1, term), args.repeats)
+            hits = len(search_messages(db, 1, term))
+            print(f"- {term!r}: LIKE {like_ms:.1f} ms, FTS5 {fts_ms:.1f} ms ({hits} hits on page)")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+WebSocket hub load test: many idle /ws/messenger connections on one worker.
+
+Starts a single uvicorn worker serving only the messenger hub router in a
+child process, opens `--connections` idle sockets spread over `--chats`
+chat topics, then publishes one message per chat and times how long it
+takes until every socket has received it. Reports server RSS before and
+after connecting.
+
+Usage:
+    python benchmarks/messenger_ws_load.py --connections 5000 --chats 100
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import pathlib
+import resource
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+import httpx
+import websockets
+
+
+def serve(port: int, chats: int) -> None:
+    import uvicorn
+    from fastapi import FastAPI
+
+    from messenger_hub import get_messenger_hub, messenger_ws_router
+
+    hub = get_messenger_hub()
+    hub.chat_loader = lambda user_id: [user_id % chats]
+    app = FastAPI()
+    app.include_router(messenger_ws_router)
+
+    @app.post("/bench/publish/{chat_id}")
+    def publish(chat_id: int):
+        hub.publish_message(chat_id, {"id": chat_id, "chat_id": chat_id, "sender_id": -1, "content": "load"})
+        return {"ok": True}
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", ws_ping_interval=None)
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as fh:
+        for line in fh:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024.0
+    return 0.0
+
+
+async def run(port: int, connections: int, chats: int, server_pid: int) -> None:
+    base = f"127.0.0.1:{port}"
+    async with httpx.AsyncClient(base_url=f"http://{base}") as http:
+        for _ in range(100):
+            try:
+                await http.get("/api/messenger/hub/stats")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+
+        started = time.perf_counter()
+        sockets = []
+        for batch_start in range(0, connections, 500):
+            batch = range(batch_start, min(batch_start + 500, connections))
+            sockets += await asyncio.gather(*(
+                websockets.connect(f"ws://{base}/ws/messenger?user_id={i}", ping_interval=None, open_timeout=30)
+                for i in batch
+            ))
+        connect_s = time.perf_counter() - started
+        stats = (await http.get("/api/messenger/hub/stats")).json()
+        print(f"- connected {stats['connections']} sockets over {stats['topics']} topics in {connect_s:.1f} s")
+        print(f"- server RSS with connections: {rss_mb(server_pid):.1f} MB")
+
+        await asyncio.sleep(1.0)
+        started = time.perf_counter()
+        receivers = [asyncio.create_task(ws.recv()) for ws in sockets]
+        for chat_id in range(chats):
+            await http.post(f"/bench/publish/{chat_id}")
+        await asyncio.gather(*receivers)
+        print(f"- fan-out of {chats} messages to {len(sockets)} sockets: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        for ws in sockets:
+            await ws.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Messenger WebSocket hub load test")
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--chats", type=int, default=100)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    needed = args.connections + 256
+    if soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(needed, hard), hard))
+
+    server = multiprocessing.Process(target=serve, args=(args.port, args.chats), daemon=True)
+    server.start()
+    try:
+        time.sleep(1.0)
+        print(f"- server RSS idle: {rss_mb(server.pid):.1f} MB")
+        asyncio.run(run(args.port, args.connections, args.chats, server.pid))
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
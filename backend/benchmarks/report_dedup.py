@@ -0,0 +1,82 @@
+"""
+Report deduplication: ingest latency with the cluster lookup, re-cluster
+time, and how much the map / triage listing shrinks.
+
+Generates `--reports` reports over `--days`: most land near a few hundred
+recurring problem spots (potholes on busy avenues), the rest are scattered.
+They are filed one by one through `file_report` into a temporary SQLite
+database, then `recluster` replays them.
+
+Usage:
+    python benchmarks/report_dedup.py --reports 5000 --hotspots 300
+"""
+
+import argparse
+import datetime
+import pathlib
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, CitizenReport
+from heatmap import ALMATY_BBOX
+from report_dedup import file_report, recluster
+
+CATEGORIES = ["ROADS", "LIGHTING", "SANITATION", "WATER"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report dedup benchmark")
+    parser.add_argument("--reports", type=int, default=5000)
+    parser.add_argument("--hotspots", type=int, default=300)
+    parser.add_argument("--days", type=int, default=14)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    min_lng, min_lat, max_lng, max_lat = ALMATY_BBOX
+    spots = np.column_stack([rng.uniform(min_lat, max_lat, args.hotspots), rng.uniform(min_lng, max_lng, args.hotspots)])
+    spot_category = rng.choice(CATEGORIES, args.hotspots)
+    start = datetime.datetime(2026, 5, 1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/dedup.db")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        offsets = np.sort(rng.uniform(0, args.days * 86400, args.reports))
+        latencies = []
+        for i, offset in enumerate(offsets):
+            if rng.random() < 0.8:
+                spot = rng.integers(args.hotspots)
+                lat, lng = spots[spot] + rng.normal(0, 0.0002, 2)  # ~20 m GPS scatter
+                category = spot_category[spot]
+            else:
+                lat, lng = rng.uniform(min_lat, max_lat), rng.uniform(min_lng, max_lng)
+                category = rng.choice(CATEGORIES)
+            started = time.perf_counter()
+            file_report(db, str(category), "benchmark", float(lat), float(lng),
+                        now=start + datetime.timedelta(seconds=float(offset)))
+            db.commit()
+            latencies.append(time.perf_counter() - started)
+
+        heads = db.query(CitizenReport).filter(CitizenReport.duplicate_of.is_(None)).count()
+        latencies.sort()
+        print(f"Filed {args.reports} reports: median {statistics.median(latencies) * 1000:.2f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms per report (lookup + insert + commit)")
+        print(f"Map / triage items: {args.reports} -> {heads} ({heads / args.reports:.0%})")
+
+        started = time.perf_counter()
+        result = recluster(db)
+        print(f"Re-clustered {result['reports']} reports into {result['clusters']} clusters "
+              f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
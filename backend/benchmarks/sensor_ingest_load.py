@@ -0,0 +1,84 @@
+"""
+Sensor ingestion throughput: parse + validate + enqueue, with the writer running.
+
+Encodes `--batch`-sized JSON payloads from `--sensors` sensors, pushes them
+through `parse_json_batch` and `SensorIngestor.ingest` for `--seconds`
+while the background writer persists to a temporary database, and times
+`latest()` reads in between. Reports ingest rate, write rate and read latency.
+
+Usage:
+    python benchmarks/sensor_ingest_load.py --seconds 10 --batch 1000 --rate 10000
+"""
+
+import argparse
+import datetime
+import json
+import os
+import pathlib
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, apply_sqlite_pragmas
+from sensor_ingest import SensorIngestor, parse_json_batch
+
+
+TYPES = ("AQI", "PM25", "TRAFFIC", "TEMP", "NOISE")
+
+
+def payload(rng: random.Random, sensors: int, size: int) -> bytes:
+    now = datetime.datetime.utcnow().isoformat()
+    return json.dumps([
+        {"sensor_type": TYPES[rng.randrange(sensors) % len(TYPES)], "value": round(rng.uniform(0, 200), 2), "timestamp": now}
+        for _ in range(size)
+    ]).encode()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sensor ingestion load test")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--sensors", type=int, default=150)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=0, help="target readings/s (0 = as fast as possible)")
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        event.listen(engine, "connect", apply_sqlite_pragmas)
+        Base.metadata.create_all(bind=engine)
+        ingestor = SensorIngestor(sessionmaker(bind=engine))
+        ingestor.start()
+        bodies = [payload(rng, args.sensors, args.batch) for _ in range(20)]
+
+        reads, started, i = [], time.perf_counter(), 0
+        while time.perf_counter() - started < args.seconds:
+            ingestor.ingest(parse_json_batch(bodies[i % len(bodies)]))
+            i += 1
+            t = time.perf_counter()
+            ingestor.latest("AQI")
+            reads.append((time.perf_counter() - t) * 1e6)
+            if args.rate:
+                ahead = i * args.batch / args.rate - (time.perf_counter() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+        elapsed = time.perf_counter() - started
+        ingestor.stop()
+        stats = ingestor.stats()
+
+        print(f"Ingested {stats['accepted']} readings in {elapsed:.1f} s: {stats['accepted'] / elapsed:,.0f}/s "
+              f"(batches of {args.batch})")
+        print(f"Written {stats['written']} rows, dropped {stats['dropped']}, failed batches {stats['failed_batches']}")
+        print(f"latest() read: median {statistics.median(reads):.1f} µs, max {max(reads):.1f} µs")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
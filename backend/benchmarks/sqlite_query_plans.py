@@ -0,0 +1,153 @@
+"""
+Query-plan and latency benchmark for the SQLite performance profile.
+
+Builds a synthetic database, then runs the hot queries twice:
+1. "before": default pragmas, no secondary indexes (create_all only)
+2. "after":  connection pragmas from database.SQLITE_PRAGMAS + run_migrations()
+
+Usage:
+    python benchmarks/sqlite_query_plans.py --messages 200000
+"""
+
+import argparse
+import datetime
+import os
+import pathlib
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine, event, text
+
+from database import (
+    ActivityLog,
+    Base,
+    ChatMember,
+    CitizenReport,
+    Contact,
+    Message,
+    SensorReading,
+    User,
+    UserProfile,
+    apply_sqlite_pragmas,
+)
+from migrations import run_migrations
+
+
+HOT_QUERIES = [
+    ("latest AQI reading",
+     "SELECT id, value FROM sensor_readings WHERE sensor_type = 'AQI' ORDER BY timestamp DESC LIMIT 1", {}),
+    ("chat message page",
+     "SELECT id FROM messages WHERE chat_id = :chat ORDER BY created_at DESC LIMIT 50", {"chat": 7}),
+    ("membership lookup",
+     "SELECT id FROM chat_members WHERE chat_id = :chat AND user_id = :user", {"chat": 7, "user": 11}),
+    ("user activity history",
+     "SELECT id FROM activity_logs WHERE user_id = :user ORDER BY timestamp DESC LIMIT 20", {"user": 11}),
+    ("AI query count",
+     "SELECT COUNT(*) FROM activity_logs WHERE action = 'AI_QUERY'", {}),
+    ("user contacts",
+     "SELECT id FROM contacts WHERE user_id = :user", {"user": 11}),
+    ("user report count",
+     "SELECT COUNT(*) FROM reports WHERE user_id = :user", {"user": 11}),
+    ("user profile",
+     "SELECT id FROM user_profiles WHERE user_id = :user", {"user": 11}),
+]
+
+
+def populate(engine, users: int, chats: int, messages: int, readings: int, logs: int) -> None:
+    rng = random.Random(42)
+    now = datetime.datetime.utcnow()
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": i, "email": f"user{i}@example.com", "username": f"user{i}", "password": "x", "created_at": now}
+            for i in range(1, users + 1)
+        ])
+        conn.execute(UserProfile.__table__.insert(), [
+            {"user_id": i, "bio": "", "last_seen": now, "is_online": False} for i in range(1, users + 1)
+        ])
+        conn.execute(ChatMember.__table__.insert(), [
+            {"chat_id": c, "user_id": rng.randint(1, users), "role": "MEMBER", "joined_at": now}
+            for c in range(1, chats + 1) for _ in range(4)
+        ])
+        conn.execute(Message.__table__.insert(), [
+            {"chat_id": rng.randint(1, chats), "sender_id": rng.randint(1, users), "content": "hello",
+             "message_type": "TEXT", "is_edited": False, "created_at": now - datetime.timedelta(seconds=i)}
+            for i in range(messages)
+        ])
+        conn.execute(SensorReading.__table__.insert(), [
+            {"sensor_type": rng.choice(["AQI", "TRAFFIC", "WEATHER"]), "value": rng.random() * 150,
+             "timestamp": now - datetime.timedelta(minutes=i)}
+            for i in range(readings)
+        ])
+        conn.execute(ActivityLog.__table__.insert(), [
+            {"user_id": rng.randint(1, users), "action": rng.choice(["LOGIN", "AI_QUERY", "REPORT_FILED"]),
+             "details": "", "timestamp": now - datetime.timedelta(seconds=i)}
+            for i in range(logs)
+        ])
+        conn.execute(Contact.__table__.insert(), [
+            {"user_id": rng.randint(1, users), "contact_id": rng.randint(1, users), "created_at": now}
+            for _ in range(users * 5)
+        ])
+        conn.execute(CitizenReport.__table__.insert(), [
+            {"user_id": rng.randint(1, users), "category": "ROADS", "description": "", "lat": 43.2, "lng": 76.9,
+             "status": "RECEIVED", "created_at": now}
+            for _ in range(users * 3)
+        ])
+
+
+def measure(engine, label: str, repeats: int) -> dict:
+    print(f"\n=== {label} ===")
+    with engine.connect() as conn:
+        mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+        print(f"journal_mode={mode}")
+        timings = {}
+        for name, sql, params in HOT_QUERIES:
+            plan = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).fetchall()
+            samples = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                conn.execute(text(sql), params).fetchall()
+                samples.append((time.perf_counter() - started) * 1000.0)
+            timings[name] = statistics.median(samples)
+            print(f"- {name}: {timings[name]:.3f} ms")
+            for row in plan:
+                print(f"    {row[-1]}")
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SQLite query plans before/after the performance profile")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--chats", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--readings", type=int, default=100000)
+    parser.add_argument("--logs", type=int, default=100000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        before = create_engine(url)
+        populate(before, args.users, args.chats, args.messages, args.readings, args.logs)
+        before_timings = measure(before, "before: default pragmas, no secondary indexes", args.repeats)
+        before.dispose()
+
+        after = create_engine(url)
+        event.listen(after, "connect", apply_sqlite_pragmas)
+        run_migrations(after)
+        after_timings = measure(after, "after: WAL pragmas + migrations", args.repeats)
+        after.dispose()
+
+    print("\n=== speedup (median) ===")
+    for name, _, _ in HOT_QUERIES:
+        ratio = before_timings[name] / after_timings[name] if after_timings[name] else float("inf")
+        print(f"- {name}: {ratio:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
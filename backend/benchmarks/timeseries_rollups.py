@@ -0,0 +1,91 @@
+"""
+Time-series chart benchmark: raw scan vs rollups (+ LTTB).
+
+Loads minute-level readings for one sensor through `record_readings` (so the
+rollups are maintained exactly as in production), then times chart queries
+for day / month / year windows.
+
+Usage:
+    python benchmarks/timeseries_rollups.py --days 365
+"""
+
+import argparse
+import datetime
+import os
+import pathlib
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, SensorReading, apply_sqlite_pragmas
+from timeseries import record_readings, series
+
+
+def populate(db, days: int, end: datetime.datetime) -> int:
+    rng = random.Random(5)
+    start = end - datetime.timedelta(days=days)
+    total = days * 24 * 60
+    for offset in range(0, total, 50_000):
+        batch = [
+            {"sensor_type": "AQI", "value": 60 + 40 * rng.random(), "timestamp": start + datetime.timedelta(minutes=m)}
+            for m in range(offset, min(offset + 50_000, total))
+        ]
+        record_readings(db, batch)
+        db.commit()
+    return total
+
+
+def timed(fn, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time-series rollup benchmark")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--points", type=int, default=500)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        event.listen(engine, "connect", apply_sqlite_pragmas)
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        end = datetime.datetime(2026, 1, 1)
+        started = time.perf_counter()
+        rows = populate(db, args.days, end)
+        print(f"Inserted {rows} readings with rollups in {time.perf_counter() - started:.1f} s")
+
+        start = end - datetime.timedelta(days=args.days)
+        raw_ms = timed(lambda: db.execute(
+            select(SensorReading.timestamp, SensorReading.value)
+            .where(SensorReading.sensor_type == "AQI", SensorReading.timestamp >= start)
+            .order_by(SensorReading.timestamp)
+        ).all(), args.repeats)
+        print(f"- raw scan of the whole range: {raw_ms:.1f} ms")
+
+        for label, days in (("day", 1), ("month", 30), ("year", args.days)):
+            window = end - datetime.timedelta(days=days)
+            auto = series(db, "AQI", window, end)
+            auto_ms = timed(lambda: series(db, "AQI", window, end), args.repeats)
+            budget_ms = timed(lambda: series(db, "AQI", window, end, points=args.points), args.repeats)
+            print(f"- {label}: auto ({auto['resolution']}, {len(auto['points'])} pts) {auto_ms:.1f} ms, "
+                  f"LTTB to {args.points} pts {budget_ms:.1f} ms")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
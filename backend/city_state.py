@@ -0,0 +1,225 @@
+"""
+Shared "latest city state" for the AI, proactive, stats and dashboard paths.
+
+- One `CityStateCache` holds the latest AQI, PM2.5, traffic congestion,
+  modelled road traffic, Open-Meteo air quality and weather, each as a
+  `Signal` with the time it was observed and where it came from
+- Sensor signals are pushed in by the sensor ingestor on every accepted batch
+  and re-read from sensor_readings by a background refresh, so they also
+  cover readings written by other processes
+- Open-Meteo air quality and weather are pushed in from the shared
+  `open_meteo` client (a startup poller and /api/sensors/qa), never fetched
+  here
+- Reads take the current immutable snapshot: a dict lookup, no DB or HTTP;
+  `freshness()` gives the age/staleness metadata endpoints return
+"""
+
+from __future__ import annotations
+
+import datetime
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database import SensorReading
+
+
+REFRESH_SECONDS = 15.0
+
+# sensor_readings.sensor_type -> signal name
+SENSOR_SIGNALS = {"AQI": "aqi", "PM25": "pm25", "TRAFFIC": "traffic"}
+
+# Seconds after which a signal is reported as stale.
+STALE_AFTER = {
+    "aqi": 600,
+    "pm25": 600,
+    "traffic": 600,
+    "road_traffic": 120,
+    "air_quality": 1800,
+    "weather": 1800,
+}
+
+
+@dataclass(frozen=True)
+class Signal:
+    value: Any
+    observed_at: datetime.datetime
+    source: str
+
+
+def traffic_model(now: datetime.datetime) -> Dict:
+    """Realistic Almaty traffic based on time of day; values are constant within a minute."""
+    hour = now.hour
+    is_weekend = now.weekday() >= 5
+    # Use minute as seed for pseudo-random but consistent values
+    seed_value = hour * 60 + now.minute
+
+    # Almaty Rush Hours: 08:30-10:00 and 17:30-20:00
+    if is_weekend:
+        base_congestion = 2 + (seed_value % 2)  # 2-3 Light weekend
+        if 12 <= hour <= 18:
+            base_congestion = 3 + (seed_value % 3)  # 3-5 Afternoon leisure
+    else:
+        if (8 <= hour <= 10) or (17 <= hour <= 20):
+            base_congestion = 7 + (seed_value % 3)  # 7-9 Heavy rush hour
+        elif (11 <= hour <= 16):
+            base_congestion = 4 + (seed_value % 3)  # 4-6 Moderate midday
+        else:
+            base_congestion = 1 + (seed_value % 4)  # 1-4 Night/Early morning
+
+    # Calculate derived values deterministically
+    incidents = (seed_value % 3) if base_congestion < 7 else 2 + (seed_value % 4)
+    avg_speed = max(10, 60 - (base_congestion * 6) + (seed_value % 5))
+
+    return {
+        "congestion_level": min(10, base_congestion),
+        "incidents": incidents,
+        "avg_speed_kmh": avg_speed
+    }
+
+
+class CityStateCache:
+    def __init__(self, clock: Callable[[], datetime.datetime] = datetime.datetime.utcnow) -> None:
+        self.clock = clock
+        self._signals: Dict[str, Signal] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # -- reads ---------------------------------------------------------------
+
+    def get(self, name: str) -> Optional[Signal]:
+        return self._signals.get(name)
+
+    def value(self, name: str, default: Any = None) -> Any:
+        signal = self._signals.get(name)
+        return signal.value if signal is not None else default
+
+    def is_stale(self, name: str, now: Optional[datetime.datetime] = None) -> bool:
+        signal = self._signals.get(name)
+        if signal is None:
+            return True
+        age = ((now or self.clock()) - signal.observed_at).total_seconds()
+        return age > STALE_AFTER.get(name, REFRESH_SECONDS * 4)
+
+    def freshness(self, names: Optional[Iterable[str]] = None) -> Dict[str, Optional[Dict]]:
+        """{name: {observed_at, age_seconds, stale, source}} (None for signals never observed)."""
+        now = self.clock()
+        signals = self._signals
+        meta = {}
+        for name in (names if names is not None else signals):
+            signal = signals.get(name)
+            if signal is None:
+                meta[name] = None
+                continue
+            meta[name] = {
+                "observed_at": signal.observed_at.isoformat(),
+                "age_seconds": round((now - signal.observed_at).total_seconds(), 1),
+                "stale": self.is_stale(name, now),
+                "source": signal.source,
+            }
+        return meta
+
+    # -- updates -------------------------------------------------------------
+
+    def _set_many(self, updates: Dict[str, Signal]) -> None:
+        """Copy-on-write so readers never see a half-applied update; older observations lose."""
+        if not updates:
+            return
+        with self._lock:
+            signals = dict(self._signals)
+            for name, signal in updates.items():
+                current = signals.get(name)
+                if current is None or signal.observed_at >= current.observed_at:
+                    signals[name] = signal
+            self._signals = signals
+
+    def apply_readings(self, rows: Iterable[Dict], source: str = "sensor-ingest") -> None:
+        """Ingest hook: keep the newest reading per tracked sensor type from a batch."""
+        newest: Dict[str, Signal] = {}
+        for row in rows:
+            name = SENSOR_SIGNALS.get(row["sensor_type"])
+            if name is None:
+                continue
+            current = newest.get(name)
+            if current is None or row["timestamp"] >= current.observed_at:
+                newest[name] = Signal(row["value"], row["timestamp"], source)
+        self._set_many(newest)
+
+    def refresh_sensors(self, db: Session) -> None:
+        updates = {}
+        for sensor_type, name in SENSOR_SIGNALS.items():
+            row = db.execute(
+                select(SensorReading.value, SensorReading.timestamp)
+                .where(SensorReading.sensor_type == sensor_type)
+                .order_by(SensorReading.timestamp.desc())
+                .limit(1)
+            ).first()
+            if row is not None and row.timestamp is not None:
+                updates[name] = Signal(row.value, row.timestamp, "sensor_readings")
+        self._set_many(updates)
+
+    def refresh_traffic(self) -> None:
+        # The model works on local (Almaty) time of day.
+        model = traffic_model(datetime.datetime.now())
+        self._set_many({"road_traffic": Signal(model, self.clock(), "time-of-day model")})
+
+    def apply_air_quality(self, current: Dict, age_seconds: float = 0.0,
+                          source: str = "Open-Meteo Real-time") -> None:
+        """Record an Open-Meteo air-quality `current` block fetched `age_seconds` ago."""
+        observed_at = self.clock() - datetime.timedelta(seconds=age_seconds)
+        self._set_many({"air_quality": Signal({
+            "aqi": current.get("european_aqi", 50),
+            "pm25": current.get("pm2_5", 15),
+            "pm10": current.get("pm10", 25),
+            "no2": current.get("nitrogen_dioxide", 10),
+            "o3": current.get("ozone", 30),
+        }, observed_at, source)})
+
+    def apply_weather(self, current: Dict, age_seconds: float = 0.0,
+                      source: str = "Open-Meteo Forecast") -> None:
+        observed_at = self.clock() - datetime.timedelta(seconds=age_seconds)
+        self._set_many({"weather": Signal({
+            "temperature": current.get("temperature_2m"),
+            "humidity": current.get("relative_humidity_2m"),
+            "wind_speed": current.get("wind_speed_10m"),
+            "weather_code": current.get("weather_code"),
+        }, observed_at, source)})
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def start(self, session_factory: Callable[[], Session], interval: float = REFRESH_SECONDS) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def loop() -> None:
+            while True:
+                self.refresh_traffic()
+                db = session_factory()
+                try:
+                    self.refresh_sensors(db)
+                except Exception as e:
+                    print(f"[CityState] Sensor refresh failed: {e}")
+                finally:
+                    db.close()
+                if self._stop.wait(interval):
+                    return
+
+        self._thread = threading.Thread(target=loop, name="city-state", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+@lru_cache(maxsize=1)
+def get_city_state() -> CityStateCache:
+    return CityStateCache()
@@ -1,14 +1,41 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 import datetime
 
 import os
 
+from migrations import run_migrations
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, 'smart_city.db')}"
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# Applied to every new pooled connection. WAL lets readers run alongside the
+# single writer; synchronous=NORMAL is durable across app crashes in WAL mode.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-65536",      # 64 MB page cache
+    "PRAGMA mmap_size=268435456",    # 256 MB memory-mapped I/O
+    "PRAGMA temp_store=MEMORY",
+)
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    pool_size=10,
+    max_overflow=20,
+)
+event.listen(engine, "connect", apply_sqlite_pragmas)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -46,6 +73,12 @@ class CitizenReport(Base):
     status = Column(String, default="RECEIVED")
     ai_analysis = Column(Text)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    quadkey = Column(String, nullable=True, index=True) # map tile path, maintained by map_tiles
+    # Dedup clusters (report_dedup): heads have duplicate_of NULL and carry the counters
+    duplicate_of = Column(Integer, ForeignKey("reports.id"), nullable=True, index=True)
+    report_count = Column(Integer, nullable=False, default=1, server_default="1") # 0 on duplicates
+    severity = Column(String, nullable=True) # "LOW", "MEDIUM", "HIGH", "CRITICAL"
+    last_reported_at = Column(DateTime, nullable=True)
 
     user = relationship("User", back_populates="reports")
 
@@ -55,6 +88,8 @@ class SensorReading(Base):
     sensor_type = Column(String) # "AQI", "TRAFFIC", "WEATHER"
     value = Column(Float)
     timestamp = Column(DateTime, default=datetime.datetime.utcnow)
+    lat = Column(Float, nullable=True) # set for geo-tagged (mobile / street-level) sensors
+    lng = Column(Float, nullable=True)
 
 class EmergencyIncident(Base):
     __tablename__ = "emergency_incidents"
@@ -66,6 +101,8 @@ class EmergencyIncident(Base):
     severity = Column(String) # "LOW", "MEDIUM", "HIGH", "CRITICAL"
     status = Column(String, default="ACTIVE") # "ACTIVE", "RESPONDING", "RESOLVED"
     reported_at = Column(DateTime, default=datetime.datetime.utcnow)
+    assigned_units = Column(String, nullable=True) # comma-separated emergency_units ids
+    quadkey = Column(String, nullable=True, index=True) # map tile path, maintained by map_tiles
 
 class BusLocation(Base):
     __tablename__ = "bus_locations"
@@ -85,6 +122,8 @@ class EmergencyUnit(Base):
     lat = Column(Float)
     lng = Column(Float)
     heading = Column(Float)
+    target_lat = Column(Float, nullable=True) # dispatch target while EN_ROUTE
+    target_lng = Column(Float, nullable=True)
     last_update = Column(DateTime, default=datetime.datetime.utcnow)
 
 class Petition(Base):
@@ -106,6 +145,33 @@ class AIKnowledge(Base):
     language = Column(String) # "en" or "ru"
     importance = Column(Integer, default=1) # 1-5 for relevance ranking
 
+    __table_args__ = (
+        Index("ux_ai_knowledge_pattern_language", "pattern", "language", unique=True),
+    )
+
+class SensorRollup(Base):
+    """Per-bucket aggregates of sensor_readings, maintained by timeseries.record_readings"""
+    __tablename__ = "sensor_rollups"
+    id = Column(Integer, primary_key=True)
+    sensor_type = Column(String, nullable=False)
+    resolution = Column(String, nullable=False)  # "1m", "1h", "1d"
+    bucket_start = Column(DateTime, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)
+    min_value = Column(Float)
+    max_value = Column(Float)
+
+    __table_args__ = (
+        Index("ux_sensor_rollups_bucket", "sensor_type", "resolution", "bucket_start", unique=True),
+    )
+
+class DataVersion(Base):
+    """Marker rows recording which version of seed data is already loaded"""
+    __tablename__ = "data_versions"
+    key = Column(String, primary_key=True)  # e.g. "startup_seed"
+    version = Column(String)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
 # ============================================
 # MESSENGER / SOCIAL NETWORK MODELS
 # ============================================
@@ -146,6 +212,8 @@ class ChatMember(Base):
     role = Column(String, default="MEMBER")  # "OWNER", "ADMIN", "MEMBER"
     joined_at = Column(DateTime, default=datetime.datetime.utcnow)
     last_read_message_id = Column(Integer, nullable=True)
+    # Maintained by messenger_queries on send/read; repair with `python messenger_queries.py`
+    unread_count = Column(Integer, nullable=False, default=0, server_default="0")
     
     chat = relationship("Chat", back_populates="members")
     user = relationship("User")
@@ -176,4 +244,4 @@ class Contact(Base):
 
 def init_db():
     Base.metadata.create_all(bind=engine)
-
+    run_migrations(engine)
@@ -0,0 +1,307 @@
+"""
+Emergency unit movement simulation, ticked in the background and served from memory.
+
+- Unit state lives in NumPy arrays (lat, lng, heading, speed, target) and is
+  advanced every TICK_SECONDS by one vectorized step: patrolling units wander
+  with a random heading drift, units with a target head straight for it and
+  go ON_SCENE on arrival (and stay there until `release`d when their
+  incident is resolved); everyone is kept inside the city bounds
+- After every tick the state is frozen into an immutable snapshot, JSON
+  included, so GET /api/emergency/units is a reference read: no DB access,
+  no lock, and the cost does not grow with the number of pollers
+- A `GridIndex` over the positions is updated incrementally on every tick and
+  answers nearest / within-radius queries for dispatch
+- Positions and dispatch targets are written back to emergency_units every
+  PERSIST_SECONDS with a single executemany UPDATE; units added to the table
+  meanwhile are picked up at the same time
+- On load, EN_ROUTE units resume towards their stored target; one without a
+  target (e.g. seeded rows) could never arrive, so it is made AVAILABLE
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from database import EmergencyUnit
+from spatial_index import GridIndex
+
+
+TICK_SECONDS = 1.0
+PERSIST_SECONDS = 30.0
+PATROL_SPEED_MS = 6.0
+RESPONSE_SPEED_MS = 14.0
+HEADING_DRIFT_DEG = 8.0
+ARRIVAL_METERS = 40.0
+METERS_PER_DEG_LAT = 111_320.0
+
+# (min_lat, min_lng, max_lat, max_lng) patrol area
+CITY_BOUNDS = (43.15, 76.75, 43.35, 77.10)
+
+MOVING_STATUSES = ("PATROLLING", "AVAILABLE", "EN_ROUTE")
+AVAILABLE_STATUSES = ("AVAILABLE", "PATROLLING")
+
+
+@dataclass(frozen=True)
+class UnitsSnapshot:
+    units: Tuple[Dict, ...]
+    body: bytes
+    tick: int
+    taken_at: datetime.datetime
+
+
+class UnitSimulation:
+    def __init__(self, tick_seconds: float = TICK_SECONDS, persist_seconds: float = PERSIST_SECONDS,
+                 seed: Optional[int] = None) -> None:
+        self.tick_seconds = tick_seconds
+        self.persist_seconds = persist_seconds
+        self.rng = np.random.default_rng(seed)
+        self.ids: List[str] = []
+        self.types = np.array([], dtype=object)
+        self.status = np.array([], dtype=object)
+        self.lat = np.zeros(0)
+        self.lng = np.zeros(0)
+        self.heading = np.zeros(0)
+        self.target_lat = np.zeros(0)
+        self.target_lng = np.zeros(0)
+        self.tick = 0
+        self.index = GridIndex()
+        self._snapshot: Optional[UnitsSnapshot] = None
+        self._lock = threading.Lock()  # serializes state changes (ticks, loads, dispatch)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # -- state ---------------------------------------------------------------
+
+    def load(self, db: Session) -> int:
+        """Add units from the table that the simulation does not know yet. Returns how many."""
+        known = set(self.ids)
+        rows = [u for u in db.execute(select(EmergencyUnit).order_by(EmergencyUnit.id)).scalars() if u.id not in known]
+        with self._lock:
+            if not rows:
+                if self._snapshot is None:
+                    self._publish()
+                return 0
+            self.ids += [u.id for u in rows]
+            self.types = np.append(self.types, np.array([u.type for u in rows], dtype=object))
+            target_lat = np.array([np.nan if u.target_lat is None else u.target_lat for u in rows], dtype=float)
+            target_lng = np.array([np.nan if u.target_lng is None else u.target_lng for u in rows], dtype=float)
+            stranded = np.isnan(target_lat) | np.isnan(target_lng)
+            status = [
+                "AVAILABLE" if not u.status or (u.status == "EN_ROUTE" and lost) else u.status
+                for u, lost in zip(rows, stranded.tolist())
+            ]
+            self.status = np.append(self.status, np.array(status, dtype=object))
+            self.lat = np.append(self.lat, [u.lat for u in rows])
+            self.lng = np.append(self.lng, [u.lng for u in rows])
+            self.heading = np.append(self.heading, [u.heading or 0.0 for u in rows])
+            en_route = np.array(status, dtype=object) == "EN_ROUTE"
+            self.target_lat = np.append(self.target_lat, np.where(en_route, target_lat, np.nan))
+            self.target_lng = np.append(self.target_lng, np.where(en_route, target_lng, np.nan))
+            self.index.update(self.lat, self.lng)
+            self._publish()
+        return len(rows)
+
+    def step(self, dt: Optional[float] = None) -> None:
+        """Advance every unit by `dt` seconds in one vectorized update."""
+        dt = self.tick_seconds if dt is None else dt
+        with self._lock:
+            n = len(self.ids)
+            if n:
+                moving = np.isin(self.status, MOVING_STATUSES)
+                has_target = ~np.isnan(self.target_lat)
+                cos_lat = np.cos(np.radians(self.lat))
+
+                # Patrol: random-walk the heading. Response: steer straight at the target.
+                drift = self.rng.normal(0.0, HEADING_DRIFT_DEG, n)
+                dy = (self.target_lat - self.lat) * METERS_PER_DEG_LAT
+                dx = (self.target_lng - self.lng) * METERS_PER_DEG_LAT * cos_lat
+                bearing = np.degrees(np.arctan2(dx, dy)) % 360
+                self.heading = np.where(has_target, bearing, (self.heading + drift) % 360)
+
+                speed = np.where(has_target, RESPONSE_SPEED_MS, PATROL_SPEED_MS) * moving
+                step_m = speed * dt
+                distance = np.hypot(dx, dy)
+                arrived = has_target & (distance <= np.maximum(step_m, ARRIVAL_METERS))
+                step_m = np.where(arrived, 0.0, step_m)
+
+                rad = np.radians(self.heading)
+                self.lat = self.lat + step_m * np.cos(rad) / METERS_PER_DEG_LAT
+                self.lng = self.lng + step_m * np.sin(rad) / (METERS_PER_DEG_LAT * cos_lat)
+                self.lat = np.where(arrived, self.target_lat, self.lat)
+                self.lng = np.where(arrived, self.target_lng, self.lng)
+                self.status = np.where(arrived, "ON_SCENE", self.status).astype(object)
+                self.target_lat = np.where(arrived, np.nan, self.target_lat)
+                self.target_lng = np.where(arrived, np.nan, self.target_lng)
+
+                # Bounce off the city bounds.
+                min_lat, min_lng, max_lat, max_lng = CITY_BOUNDS
+                out = (self.lat < min_lat) | (self.lat > max_lat) | (self.lng < min_lng) | (self.lng > max_lng)
+                self.heading = np.where(out, (self.heading + 180) % 360, self.heading)
+                self.lat = np.clip(self.lat, min_lat, max_lat)
+                self.lng = np.clip(self.lng, min_lng, max_lng)
+                self.index.update(self.lat, self.lng)
+            self.tick += 1
+            self._publish()
+
+    def dispatch(self, unit_id: str, lat: float, lng: float) -> None:
+        """Send a unit to a location: EN_ROUTE until it arrives, then ON_SCENE."""
+        with self._lock:
+            i = self.ids.index(unit_id)
+            self.target_lat[i], self.target_lng[i] = lat, lng
+            self.status[i] = "EN_ROUTE"
+            self._publish()
+
+    def set_status(self, unit_id: str, status: str) -> None:
+        with self._lock:
+            i = self.ids.index(unit_id)
+            self.status[i] = status
+            if status != "EN_ROUTE":
+                self.target_lat[i] = self.target_lng[i] = np.nan
+            self._publish()
+
+    def release(self, unit_ids: List[str]) -> List[str]:
+        """Return units to AVAILABLE (e.g. when their incident is resolved). Unknown ids are skipped."""
+        with self._lock:
+            released = [uid for uid in unit_ids if uid in self.ids]
+            for uid in released:
+                i = self.ids.index(uid)
+                self.status[i] = "AVAILABLE"
+                self.target_lat[i] = self.target_lng[i] = np.nan
+            if released:
+                self._publish()
+        return released
+
+    # -- reads ---------------------------------------------------------------
+
+    def _publish(self) -> None:
+        units = tuple(
+            {"id": uid, "type": t, "status": s, "lat": float(la), "lng": float(ln), "heading": round(float(h), 1)}
+            for uid, t, s, la, ln, h in zip(self.ids, self.types, self.status, self.lat, self.lng, self.heading)
+        )
+        self._snapshot = UnitsSnapshot(units, json.dumps(units).encode("utf-8"), self.tick,
+                                       datetime.datetime.utcnow())
+
+    def snapshot(self) -> Optional[UnitsSnapshot]:
+        return self._snapshot
+
+    def positions(self) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Copies of (ids, types, status, lat, lng) taken atomically."""
+        with self._lock:
+            return list(self.ids), self.types.copy(), self.status.copy(), self.lat.copy(), self.lng.copy()
+
+    def available_mask(self, unit_types: Optional[Tuple[str, ...]] = None,
+                       statuses: Tuple[str, ...] = AVAILABLE_STATUSES) -> np.ndarray:
+        mask = np.isin(self.status, statuses)
+        if unit_types:
+            mask &= np.isin(self.types, unit_types)
+        return mask
+
+    def _unit_rows(self, indices: np.ndarray, distances: np.ndarray) -> List[Dict]:
+        return [
+            {"id": self.ids[i], "type": self.types[i], "status": self.status[i],
+             "lat": float(self.lat[i]), "lng": float(self.lng[i]), "distance_m": round(float(d), 1)}
+            for i, d in zip(indices.tolist(), distances.tolist())
+        ]
+
+    def nearest(self, lat: float, lng: float, k: int = 5, unit_types: Optional[Tuple[str, ...]] = None,
+                statuses: Tuple[str, ...] = AVAILABLE_STATUSES) -> List[Dict]:
+        """The k closest units of the given types/statuses, nearest first."""
+        with self._lock:
+            indices, distances = self.index.nearest(lat, lng, k, self.available_mask(unit_types, statuses))
+            return self._unit_rows(indices, distances)
+
+    def within(self, lat: float, lng: float, radius_m: float, unit_types: Optional[Tuple[str, ...]] = None,
+               statuses: Tuple[str, ...] = AVAILABLE_STATUSES) -> List[Dict]:
+        with self._lock:
+            indices, distances = self.index.within(lat, lng, radius_m, self.available_mask(unit_types, statuses))
+            return self._unit_rows(indices, distances)
+
+    # -- persistence ---------------------------------------------------------
+
+    def persist(self, db: Session) -> int:
+        with self._lock:
+            rows = [
+                {"id": uid, "status": s, "lat": float(la), "lng": float(ln), "heading": float(h),
+                 "target_lat": None if np.isnan(tla) else float(tla),
+                 "target_lng": None if np.isnan(tln) else float(tln)}
+                for uid, s, la, ln, h, tla, tln in zip(self.ids, self.status, self.lat, self.lng, self.heading,
+                                                       self.target_lat, self.target_lng)
+            ]
+        if not rows:
+            return 0
+        now = datetime.datetime.utcnow()
+        for row in rows:
+            row["last_update"] = now
+        db.execute(update(EmergencyUnit), rows)
+        db.commit()
+        return len(rows)
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def _sync(self, session_factory: Callable[[], Session]) -> None:
+        db = session_factory()
+        try:
+            self.persist(db)
+            self.load(db)
+        finally:
+            db.close()
+
+    def ensure_loaded(self, session_factory: Callable[[], Session]) -> UnitsSnapshot:
+        if self._snapshot is None:
+            db = session_factory()
+            try:
+                self.load(db)
+            finally:
+                db.close()
+        return self._snapshot
+
+    def start(self, session_factory: Callable[[], Session]) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self.ensure_loaded(session_factory)
+
+        def loop() -> None:
+            next_tick = time.monotonic()
+            next_persist = next_tick + self.persist_seconds
+            while True:
+                next_tick += self.tick_seconds
+                if self._stop.wait(max(0.0, next_tick - time.monotonic())):
+                    return
+                try:
+                    self.step()
+                    if time.monotonic() >= next_persist:
+                        self._sync(session_factory)
+                        next_persist = time.monotonic() + self.persist_seconds
+                except Exception as e:
+                    print(f"[EmergencySim] Tick failed: {e}")
+
+        self._thread = threading.Thread(target=loop, name="emergency-sim", daemon=True)
+        self._thread.start()
+
+    def stop(self, session_factory: Optional[Callable[[], Session]] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if session_factory is not None:
+            db = session_factory()
+            try:
+                self.persist(db)
+            finally:
+                db.close()
+
+
+@lru_cache(maxsize=1)
+def get_unit_simulation() -> UnitSimulation:
+    return UnitSimulation()
@@ -18,6 +18,7 @@ Total: ~800 lines of AI orchestration logic
 import re
 import random
 import logging
+import threading
 from typing import Optional, Dict, List, Any, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
@@ -849,12 +850,15 @@ class EnhancedGPTStyleAI:
 # ============================================
 
 _enhanced_ai: Optional[EnhancedGPTStyleAI] = None
+_enhanced_ai_lock = threading.Lock()
 
 def get_enhanced_ai(config: Optional[GPTConfig] = None) -> EnhancedGPTStyleAI:
-    """Get or create enhanced AI singleton"""
+    """Get or create enhanced AI singleton (built once, even when the warm-up thread races a request)"""
     global _enhanced_ai
     if _enhanced_ai is None:
-        _enhanced_ai = EnhancedGPTStyleAI(config)
+        with _enhanced_ai_lock:
+            if _enhanced_ai is None:
+                _enhanced_ai = EnhancedGPTStyleAI(config)
     return _enhanced_ai
 
 def create_ai(config: Optional[GPTConfig] = None) -> EnhancedGPTStyleAI:
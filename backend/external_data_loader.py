@@ -2,8 +2,12 @@ import json
 import os
 import random
 import re
+import threading
+from collections import Counter
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 
 # Mapping from external JSON categories to AI Engine tags
 CATEGORY_MAP = {
@@ -18,6 +22,11 @@ CATEGORY_MAP = {
 }
 
 
+# Fixed seed so every component (retriever, intent router, trainer) sees the
+# same sample of the external files within and across processes.
+DEFAULT_SAMPLE_SEED = int(os.getenv("EXTERNAL_DATA_SEED", "1854"))
+
+
 def _is_english_text(text: str) -> bool:
     if not text:
         return False
@@ -44,6 +53,76 @@ def _safe_read_json(path: Path) -> List[Dict[str, Any]]:
         return []
 
 
+def _file_signature(path: Path) -> Tuple[int, int]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return (0, -1)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class DatasetRegistry:
+    """
+    Process-wide registry of parsed dataset files.
+    Each file is parsed once and re-parsed only when its mtime or size changes.
+    Records are handed out as read-only mappings shared by all callers.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._files: Dict[Path, Tuple[Tuple[int, int], Tuple[Mapping[str, Any], ...]]] = {}
+        self._samples: Dict[Tuple[Any, ...], Tuple[Mapping[str, str], ...]] = {}
+        self._site_records: Optional[Tuple[Mapping[str, str], ...]] = None
+        self.parse_counts: Counter = Counter()
+
+    def source(self, path: Path) -> Tuple[Mapping[str, Any], ...]:
+        path = Path(path).resolve()
+        signature = _file_signature(path)
+        with self._lock:
+            cached = self._files.get(path)
+            if cached and cached[0] == signature:
+                return cached[1]
+            records = tuple(
+                MappingProxyType(dict(item)) for item in _safe_read_json(path) if isinstance(item, dict)
+            )
+            self._files[path] = (signature, records)
+            self.parse_counts[path] += 1
+            return records
+
+    def sample(self, path: Path, limit: int, seed: int = DEFAULT_SAMPLE_SEED) -> Tuple[Mapping[str, Any], ...]:
+        """Deterministic shuffled sample of `limit` records from one file."""
+        records = self.source(path)
+        order = list(range(len(records)))
+        random.Random(f"{seed}:{Path(path).name}").shuffle(order)
+        return tuple(records[i] for i in order[: max(0, limit)])
+
+    def site_records(self) -> Tuple[Mapping[str, str], ...]:
+        with self._lock:
+            if self._site_records is None:
+                self._site_records = tuple(MappingProxyType(r) for r in _load_site_knowledge())
+            return self._site_records
+
+    def cached_sample(self, key: Tuple[Any, ...]) -> Optional[Tuple[Mapping[str, str], ...]]:
+        with self._lock:
+            return self._samples.get(key)
+
+    def store_sample(self, key: Tuple[Any, ...], records: Tuple[Mapping[str, str], ...]) -> None:
+        with self._lock:
+            self._samples[key] = records
+
+    def clear(self) -> None:
+        with self._lock:
+            self._files.clear()
+            self._samples.clear()
+            self._site_records = None
+            self.parse_counts.clear()
+
+
+@lru_cache(maxsize=1)
+def get_dataset_registry() -> DatasetRegistry:
+    return DatasetRegistry()
+
+
 def _build_record(category: str, pattern: str, response: str) -> Optional[Dict[str, str]]:
     pattern = (pattern or "").strip()
     response = (response or "").strip()
@@ -98,12 +177,15 @@ def _load_site_knowledge() -> List[Dict[str, str]]:
     return records
 
 
-def load_external_datasets(limit_per_file: int = 3000) -> List[Dict[str, str]]:
+def load_external_datasets(limit_per_file: int = 3000, seed: int = DEFAULT_SAMPLE_SEED) -> List[Mapping[str, str]]:
     """
     Load external english datasets for training:
     - Smart city json dataset
     - General chat json dataset
     - Optional full website crawl via EXTERNAL_SITE_URLS
+
+    Files are parsed once per process through the dataset registry and the
+    sample is seeded, so repeated calls return the same read-only records.
     """
     script_dir = Path(__file__).resolve().parent
     base_dir = Path(os.getenv("EXTERNAL_DATA_DIR", str(script_dir / "datasets")))
@@ -114,12 +196,24 @@ def load_external_datasets(limit_per_file: int = 3000) -> List[Dict[str, str]]:
     smart_city_path = _resolve_path(base_dir, smart_file)
     chat_10k_path = _resolve_path(base_dir, chat_file)
 
-    external_patterns: List[Dict[str, str]] = []
+    registry = get_dataset_registry()
+    cache_key = (
+        limit_per_file,
+        seed,
+        str(smart_city_path),
+        _file_signature(smart_city_path),
+        str(chat_10k_path),
+        _file_signature(chat_10k_path),
+        os.getenv("EXTERNAL_SITE_URLS", "").strip(),
+    )
+    cached = registry.cached_sample(cache_key)
+    if cached is not None:
+        return list(cached)
+
+    external_patterns: List[Mapping[str, str]] = []
 
     # 1. Smart City dataset
-    smart_data = _safe_read_json(smart_city_path)
-    random.shuffle(smart_data)
-    for item in smart_data[:limit_per_file]:
+    for item in registry.sample(smart_city_path, limit_per_file, seed):
         ext_cat = str(item.get("category", "")).strip().lower()
         target_cat = CATEGORY_MAP.get(ext_cat, "CITY_INFO")
         record = _build_record(
@@ -128,25 +222,23 @@ def load_external_datasets(limit_per_file: int = 3000) -> List[Dict[str, str]]:
             response=str(item.get("output", "")),
         )
         if record:
-            external_patterns.append(record)
+            external_patterns.append(MappingProxyType(record))
 
     # 2. General chat dataset
-    chat_data = _safe_read_json(chat_10k_path)
-    random.shuffle(chat_data)
-    for item in chat_data[:limit_per_file]:
+    for item in registry.sample(chat_10k_path, limit_per_file, seed):
         record = _build_record(
             category="CHAT",
             pattern=str(item.get("instruction", "")),
             response=str(item.get("output", "")),
         )
         if record:
-            external_patterns.append(record)
+            external_patterns.append(MappingProxyType(record))
 
     # 3. Optional full-site knowledge ingestion
-    site_records = _load_site_knowledge()
-    external_patterns.extend(site_records)
+    external_patterns.extend(registry.site_records())
 
-    random.shuffle(external_patterns)
+    random.Random(seed).shuffle(external_patterns)
+    registry.store_sample(cache_key, tuple(external_patterns))
     return external_patterns
 
 
@@ -154,4 +246,4 @@ if __name__ == "__main__":
     patterns = load_external_datasets()
     print(f"Loaded {len(patterns)} external patterns.")
     if patterns:
-        print(f"First pattern: {patterns[0]}")
+        print(f"First pattern: {dict(patterns[0])}")
@@ -0,0 +1,402 @@
+"""
+Short-horizon sensor forecasts (1-3 h) fitted in batch with NumPy.
+
+- History is the hourly rollup (sensor_rollups, 1h) of the last HISTORY_DAYS
+  for every sensor type, aligned on one hourly grid: a (series, hours) matrix
+- Three models run on the whole matrix at once:
+  seasonal-naive (same hour yesterday), additive Holt-Winters with daily
+  seasonality and a damped trend (a small parameter grid searched per series
+  in the same pass), and a ridge regression on hour-of-day / weekday one-hots
+  plus the last value and the seasonal lag (all series solved as one batched
+  linear system)
+- The last HOLDOUT_HOURS are a backtest: each series serves the model with the
+  lowest MAE there, with a 90% interval from that model's holdout errors
+- `ForecastCache` refits on a background thread every FORECAST_REFIT_SECONDS;
+  /api/ai/forecast only reads the cached result
+- Forecasts are anchored at the last hour with data (`origin`), not at the
+  wall clock; when that is more than STALE_AFTER_HOURS old they are flagged
+  stale instead of being relabelled as the coming hours
+"""
+
+from __future__ import annotations
+
+import datetime
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database import SensorRollup
+
+
+SEASON = 24
+HORIZONS = (1, 2, 3)
+HISTORY_DAYS = 28
+HOLDOUT_HOURS = 48
+RIDGE_LAMBDA = 1.0
+DAMPING = 0.98
+Z_90 = 1.645
+FORECAST_REFIT_SECONDS = 900.0
+STALE_AFTER_HOURS = max(HORIZONS)
+
+HW_GRID = np.array(list(itertools.product((0.1, 0.3, 0.5, 0.8), (0.01, 0.1), (0.05, 0.2, 0.4))))
+MODELS = ("seasonal_naive", "holt_winters", "ridge")
+
+
+@dataclass
+class HourlyHistory:
+    sensor_types: List[str]
+    start: datetime.datetime  # first hourly bucket (UTC)
+    values: np.ndarray  # (series, hours), gaps filled
+
+
+def fill_gaps(values: np.ndarray) -> np.ndarray:
+    """Forward-fill NaNs along time (back-fill leading ones), all rows at once."""
+    mask = np.isnan(values)
+    idx = np.where(~mask, np.arange(values.shape[1]), 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    filled = values[np.arange(values.shape[0])[:, None], idx]
+    first = np.argmax(~mask, axis=1)
+    leading = np.arange(values.shape[1])[None, :] < first[:, None]
+    return np.where(leading, values[np.arange(values.shape[0]), first][:, None], filled)
+
+
+def load_history(db: Session, now: Optional[datetime.datetime] = None, days: int = HISTORY_DAYS) -> Optional[HourlyHistory]:
+    """Hourly means for every sensor type over the last `days`, as one aligned matrix."""
+    now = now or datetime.datetime.utcnow()
+    since = (now - datetime.timedelta(days=days)).replace(minute=0, second=0, microsecond=0)
+    rows = db.execute(
+        select(SensorRollup.sensor_type, SensorRollup.bucket_start, SensorRollup.total / SensorRollup.count)
+        .where(SensorRollup.resolution == "1h", SensorRollup.bucket_start >= since)
+    ).all()
+    if not rows:
+        return None
+    sensor_types = sorted({r[0] for r in rows})
+    start = min(r[1] for r in rows)
+    hours = int((max(r[1] for r in rows) - start).total_seconds() // 3600) + 1
+    row_of = {t: i for i, t in enumerate(sensor_types)}
+    values = np.full((len(sensor_types), hours), np.nan)
+    cols = np.array([int((r[1] - start).total_seconds() // 3600) for r in rows])
+    values[[row_of[r[0]] for r in rows], cols] = [r[2] for r in rows]
+    return HourlyHistory(sensor_types, start, fill_gaps(values))
+
+
+# -- models -----------------------------------------------------------------
+# Each `*_paths` function returns predictions of shape (series, len(origins), len(HORIZONS)):
+# the forecast made at origin t for t + h, using data up to and including t.
+
+
+def seasonal_naive_paths(y: np.ndarray, origins: np.ndarray) -> np.ndarray:
+    h = np.array(HORIZONS)
+    return y[:, origins[:, None] + h[None, :] - SEASON]
+
+
+def _damped(h: int) -> float:
+    return sum(DAMPING ** i for i in range(1, h + 1))
+
+
+def holt_winters_paths(y: np.ndarray, origins: np.ndarray, fit_until: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Additive damped Holt-Winters; (paths, chosen grid index per series).
+
+    Every (series, parameter set) pair is one row of the state arrays, so the
+    whole grid search is a single pass over time.
+    """
+    n, T = y.shape
+    g = len(HW_GRID)
+    alpha, beta, gamma = (np.tile(HW_GRID[:, k], n) for k in range(3))
+    obs = np.repeat(y, g, axis=0)  # (n * g, T)
+
+    level = obs[:, :SEASON].mean(axis=1)
+    trend = (obs[:, SEASON:2 * SEASON].mean(axis=1) - level) / SEASON
+    season = obs[:, :SEASON] - level[:, None]
+    sse = np.zeros(n * g)
+    origin_pos = {t: i for i, t in enumerate(origins)}
+    paths = np.zeros((n * g, len(origins), len(HORIZONS)))
+
+    for t in range(SEASON, T):
+        s = season[:, t % SEASON]
+        if t < fit_until:
+            sse += (obs[:, t] - (level + DAMPING * trend + s)) ** 2
+        new_level = alpha * (obs[:, t] - s) + (1 - alpha) * (level + DAMPING * trend)
+        trend = beta * (new_level - level) + (1 - beta) * DAMPING * trend
+        season[:, t % SEASON] = gamma * (obs[:, t] - new_level) + (1 - gamma) * s
+        level = new_level
+        pos = origin_pos.get(t)
+        if pos is not None:
+            for k, h in enumerate(HORIZONS):
+                paths[:, pos, k] = level + _damped(h) * trend + season[:, (t + h) % SEASON]
+
+    best = sse.reshape(n, g).argmin(axis=1)
+    rows = np.arange(n) * g + best
+    return paths[rows], best
+
+
+def _calendar(origins: np.ndarray, h: int, start: datetime.datetime) -> np.ndarray:
+    """(origins, 32): hour-of-day and weekday one-hots of the target hour, plus an intercept."""
+    target = origins + h
+    hour = (start.hour + target) % 24
+    weekday = (start.weekday() + (start.hour + target) // 24) % 7
+    return np.concatenate([np.eye(24)[hour], np.eye(7)[weekday], np.ones((len(origins), 1))], axis=1)
+
+
+def ridge_paths(y: np.ndarray, origins: np.ndarray, fit_until: int, start: datetime.datetime) -> np.ndarray:
+    """Ridge per series and horizon, fitted on origins whose target is before `fit_until`.
+
+    Features are the shared calendar columns C plus two per-series columns
+    (last value, seasonal lag). The normal equations are assembled blockwise,
+    so the only large products are C.T @ (hours x series) matrices.
+    """
+    n, T = y.shape
+    paths = np.zeros((n, len(origins), len(HORIZONS)))
+    # Scale by each series' level so one lambda suits AQI (~100) and traffic (~5) alike.
+    scale = np.abs(y[:, :fit_until]).mean(axis=1)[:, None] + 1e-9
+    z = y / scale
+    for k, h in enumerate(HORIZONS):
+        train = np.arange(SEASON, fit_until - h)
+        C = _calendar(train, h, start)
+        own = np.stack([z[:, train], z[:, train + h - SEASON]], axis=2)  # (series, N, 2)
+        target = z[:, train + h]
+        p = C.shape[1]
+
+        XtX = np.zeros((n, p + 2, p + 2))
+        XtX[:, :p, :p] = C.T @ C
+        cross = C.T @ own
+        XtX[:, :p, p:] = cross
+        XtX[:, p:, :p] = cross.transpose(0, 2, 1)
+        XtX[:, p:, p:] = own.transpose(0, 2, 1) @ own
+        XtX += RIDGE_LAMBDA * np.eye(p + 2)
+        Xty = np.concatenate([target @ C, (own * target[..., None]).sum(axis=1)], axis=1)
+        coef = np.linalg.solve(XtX, Xty[..., None])[..., 0]
+
+        Co = _calendar(origins, h, start)
+        own_o = np.stack([z[:, origins], z[:, origins + h - SEASON]], axis=2)
+        pred = coef[:, :p] @ Co.T + (own_o * coef[:, None, p:]).sum(axis=2)
+        paths[:, :, k] = pred * scale
+    return paths
+
+
+# -- fitting ----------------------------------------------------------------
+
+
+@dataclass
+class SeriesForecast:
+    sensor_type: str
+    model: str
+    values: np.ndarray  # (len(HORIZONS),)
+    half_width: np.ndarray  # 90% interval half-width per horizon
+    mae: Dict[str, List[float]]  # holdout MAE per model and horizon
+    last_value: float
+    history_hours: int
+
+
+def fit_forecasts(history: HourlyHistory, holdout: int = HOLDOUT_HOURS) -> Dict[str, SeriesForecast]:
+    """Backtest every model on the last `holdout` hours, then forecast from the end of history."""
+    y = history.values
+    n, T = y.shape
+    last = T - 1
+    h_max = max(HORIZONS)
+    results: Dict[str, SeriesForecast] = {}
+
+    if T < 2 * SEASON + holdout:
+        # Too short for a backtest: seasonal-naive when a day of history exists, else persistence.
+        if T > SEASON:
+            point = seasonal_naive_paths(y, np.array([last]))[:, 0, :]
+            errors = np.abs(y[:, SEASON:] - y[:, :-SEASON])
+            model = "seasonal_naive"
+        else:
+            point = np.repeat(y[:, last:], len(HORIZONS), axis=1)
+            errors = np.abs(np.diff(y, axis=1)) if T > 1 else np.zeros((n, 1))
+            model = "persistence"
+        spread = np.sqrt((errors ** 2).mean(axis=1)) if errors.size else np.zeros(n)
+        for i, sensor_type in enumerate(history.sensor_types):
+            results[sensor_type] = SeriesForecast(
+                sensor_type, model, point[i], Z_90 * spread[i] * np.sqrt(np.array(HORIZONS)),
+                {}, float(y[i, last]), T,
+            )
+        return results
+
+    split = T - holdout
+    test_origins = np.arange(split - 1, T - h_max)
+    truth = y[:, test_origins[:, None] + np.array(HORIZONS)[None, :]]
+    origins = np.append(test_origins, last)
+
+    paths = {
+        "seasonal_naive": seasonal_naive_paths(y, origins),
+        "holt_winters": holt_winters_paths(y, origins, fit_until=split)[0],
+        "ridge": ridge_paths(y, origins, fit_until=split, start=history.start),
+    }
+    # Ridge is refitted on all data for the live forecast.
+    paths["ridge"][:, -1, :] = ridge_paths(y, np.array([last]), fit_until=T, start=history.start)[:, 0, :]
+
+    errors = {m: p[:, :-1, :] - truth for m, p in paths.items()}
+    mae = {m: np.abs(e).mean(axis=1) for m, e in errors.items()}  # (series, horizons)
+    score = np.stack([mae[m].mean(axis=1) for m in MODELS], axis=1)
+    best = score.argmin(axis=1)
+
+    for i, sensor_type in enumerate(history.sensor_types):
+        model = MODELS[best[i]]
+        spread = np.sqrt((errors[model][i] ** 2).mean(axis=0))
+        results[sensor_type] = SeriesForecast(
+            sensor_type, model, paths[model][i, -1, :], Z_90 * spread,
+            {m: [round(float(v), 3) for v in mae[m][i]] for m in MODELS}, float(y[i, last]), T,
+        )
+    return results
+
+
+def forecast_payload(forecasts: Dict[str, SeriesForecast], origin: datetime.datetime,
+                     fit_seconds: float) -> Dict:
+    series = {}
+    for sensor_type, f in forecasts.items():
+        series[sensor_type] = {
+            "model": f.model,
+            "last_value": round(f.last_value, 2),
+            "history_hours": f.history_hours,
+            "backtest_mae": f.mae,
+            "points": [
+                {
+                    "horizon_hours": h,
+                    "timestamp": (origin + datetime.timedelta(hours=h)).isoformat(),
+                    "value": round(float(f.values[k]), 2),
+                    "lower": round(float(f.values[k] - f.half_width[k]), 2),
+                    "upper": round(float(f.values[k] + f.half_width[k]), 2),
+                }
+                for k, h in enumerate(HORIZONS)
+            ],
+        }
+    return {
+        "origin": origin.isoformat(),
+        "fitted_at": datetime.datetime.utcnow().isoformat(),
+        "fit_ms": round(fit_seconds * 1000, 1),
+        "series": series,
+    }
+
+
+def build_forecasts(db: Session, now: Optional[datetime.datetime] = None) -> Dict:
+    started = time.perf_counter()
+    history = load_history(db, now)
+    if history is None:
+        return forecast_payload({}, (now or datetime.datetime.utcnow()).replace(minute=0, second=0, microsecond=0), 0.0)
+    forecasts = fit_forecasts(history)
+    origin = history.start + datetime.timedelta(hours=history.values.shape[1] - 1)
+    return forecast_payload(forecasts, origin, time.perf_counter() - started)
+
+
+def _point(payload: Dict, sensor_type: str, k: int) -> Optional[Dict]:
+    series = payload["series"].get(sensor_type)
+    return series["points"][k] if series else None
+
+
+def _confidence(point: Optional[Dict]) -> int:
+    """Narrow intervals relative to the value read as high confidence (50-99%)."""
+    if point is None:
+        return 50
+    relative = (point["upper"] - point["lower"]) / 2 / max(abs(point["value"]), 1.0)
+    return int(min(99, max(50, round(100 - 100 * relative))))
+
+
+def is_stale(payload: Dict, now: Optional[datetime.datetime] = None) -> bool:
+    """True once even the furthest horizon lies in the past, i.e. sensor data stopped arriving."""
+    now = now or datetime.datetime.utcnow()
+    origin = datetime.datetime.fromisoformat(payload["origin"])
+    return now - origin > datetime.timedelta(hours=STALE_AFTER_HOURS)
+
+
+def dashboard_forecasts(payload: Dict, now: Optional[datetime.datetime] = None) -> List[Dict]:
+    """The per-hour cards of the dashboard panel (traffic on a 1-10 scale, AQI).
+
+    Card times count from the forecast origin (the last hourly bucket with
+    data, UTC), shown in server-local time, so an old origin is never passed
+    off as the coming hours.
+    """
+    origin = datetime.datetime.fromisoformat(payload["origin"]).replace(tzinfo=datetime.timezone.utc)
+    stale = is_stale(payload, now)
+    cards = []
+    last_aqi = payload["series"].get("AQI", {}).get("last_value")
+    for k, h in enumerate(HORIZONS):
+        traffic, aqi = _point(payload, "TRAFFIC", k), _point(payload, "AQI", k)
+        traffic_value = int(round(min(10, max(1, traffic["value"])))) if traffic else 5
+        aqi_value = int(round(max(0, aqi["value"]))) if aqi else 50
+        if traffic_value >= 7:
+            insight = "Expected congestion increase on Al-Farabi Ave"
+        elif last_aqi is not None and aqi_value > last_aqi + 10:
+            insight = "Air quality expected to worsen, limit outdoor activity"
+        elif last_aqi is not None and aqi_value < last_aqi - 10:
+            insight = "Air quality improving due to mountain breeze"
+        else:
+            insight = "Normal traffic patterns predicted"
+        cards.append({
+            "time": (origin + datetime.timedelta(hours=h)).astimezone().strftime("%H:00"),
+            "traffic_prediction": traffic_value,
+            "aqi_prediction": aqi_value,
+            "confidence": min(_confidence(traffic), _confidence(aqi)),
+            "insight": insight,
+            "stale": stale,
+        })
+    return cards
+
+
+class ForecastCache:
+    def __init__(self, session_factory: Callable[[], Session]) -> None:
+        self.session_factory = session_factory
+        self._payload: Optional[Dict] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def get(self) -> Dict:
+        """The cached forecasts; fits once (single-flight) if nothing has been fitted yet."""
+        payload = self._payload
+        if payload is not None:
+            return payload
+        with self._lock:
+            if self._payload is None:
+                self._refit()
+            return self._payload
+
+    def refit(self) -> Dict:
+        with self._lock:
+            return self._refit()
+
+    def _refit(self) -> Dict:
+        db = self.session_factory()
+        try:
+            self._payload = build_forecasts(db)
+        finally:
+            db.close()
+        return self._payload
+
+    def start(self, interval: float = FORECAST_REFIT_SECONDS) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def loop() -> None:
+            while True:
+                try:
+                    self.refit()
+                except Exception as e:
+                    print(f"[Forecast] Refit failed: {e}")
+                if self._stop.wait(interval):
+                    return
+
+        self._thread = threading.Thread(target=loop, name="forecast-refit", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+@lru_cache(maxsize=1)
+def get_forecast_cache() -> ForecastCache:
+    from database import SessionLocal
+
+    return ForecastCache(SessionLocal)
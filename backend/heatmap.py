@@ -0,0 +1,360 @@
+"""
+Server-side heatmaps of citizen reports, emergency incidents and geo-tagged readings.
+
+- Each layer's points live in memory as NumPy arrays (lat, lng, epoch
+  seconds, category code, value). They are loaded once, then extended with
+  the rows whose id is above the last one seen. Every request runs that
+  (indexed) query, so an insert is visible on the next heatmap. A full
+  reload every RELOAD_SECONDS picks up edits and deletes
+- Bins are a square or hexagonal (pointy-top, H3-like) grid of `cell_m`
+  metres over ALMATY_BBOX. Each point's cell index is computed once per grid
+  and cached alongside the coordinates
+- A request is then masks (time window, categories) plus one `np.bincount`
+  (two for sum/mean of reading values) over the cached cell indices
+- Encoded responses are cached per (layer, data version, parameters), so the
+  cache is invalidated by any insert into the layer
+"""
+
+from __future__ import annotations
+
+import datetime
+import itertools
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import Integer, cast, func, select
+from sqlalchemy.orm import Session
+
+from database import CitizenReport, EmergencyIncident, SensorReading
+from map_tiles import BBox
+
+
+ALMATY_BBOX: BBox = (76.75, 43.15, 77.15, 43.35)
+GRIDS = ("square", "hex")
+AGGREGATES = ("count", "sum", "mean")
+DEFAULT_CELL_METERS = 250.0
+MIN_CELL_METERS = 50.0
+MAX_CELL_METERS = 5000.0
+RELOAD_SECONDS = 600.0
+RESULT_CACHE_SIZE = 256
+MAX_CACHED_GRIDS = 8  # per layer; each costs 8 bytes per point
+METERS_PER_DEG_LAT = 111_320.0
+SQRT3 = math.sqrt(3.0)
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def _naive_utc(ts: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+    """Point times are naive UTC; convert aware query bounds to match."""
+    if ts is not None and ts.tzinfo is not None:
+        return ts.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def _category_key(category: Optional[str]) -> str:
+    """Stored categories and filter values are compared case- and padding-insensitively."""
+    return (category or "").strip().upper()
+
+
+# -- grids -------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Grid:
+    kind: str
+    cell_m: float
+    bbox: BBox = ALMATY_BBOX
+
+    @property
+    def _scale(self) -> Tuple[float, float]:
+        """Metres per degree of (lng, lat) at the middle of the box."""
+        mid_lat = (self.bbox[1] + self.bbox[3]) / 2
+        return METERS_PER_DEG_LAT * math.cos(math.radians(mid_lat)), METERS_PER_DEG_LAT
+
+    def _local(self, lat: np.ndarray, lng: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        mx, my = self._scale
+        return (lng - self.bbox[0]) * mx, (lat - self.bbox[1]) * my
+
+    @property
+    def _extent(self) -> Tuple[float, float]:
+        mx, my = self._scale
+        return (self.bbox[2] - self.bbox[0]) * mx, (self.bbox[3] - self.bbox[1]) * my
+
+    @property
+    def _hex_size(self) -> float:
+        # cell_m is the flat-to-flat width; the circumradius is width / sqrt(3).
+        return self.cell_m / SQRT3
+
+    @property
+    def _hex_origin(self) -> Tuple[int, int, int]:
+        """(q0, r0, nq): axial offsets and row width covering the box."""
+        width, height = self._extent
+        s = self._hex_size
+        q0 = math.floor(-height / (3 * s)) - 1
+        q1 = math.ceil(SQRT3 / 3 * width / s) + 1
+        return q0, -1, q1 - q0 + 1
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """(rows, columns) of the cell index space."""
+        width, height = self._extent
+        if self.kind == "square":
+            return math.ceil(height / self.cell_m), math.ceil(width / self.cell_m)
+        _, r0, nq = self._hex_origin
+        return math.ceil(height / (1.5 * self._hex_size)) + 2 - r0, nq
+
+    @property
+    def size(self) -> int:
+        rows, cols = self.shape
+        return rows * cols
+
+    def index(self, lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+        """Flat cell index per point; -1 outside the box."""
+        lat, lng = np.asarray(lat, dtype=float), np.asarray(lng, dtype=float)
+        inside = (lng >= self.bbox[0]) & (lng <= self.bbox[2]) & (lat >= self.bbox[1]) & (lat <= self.bbox[3])
+        x, y = self._local(lat, lng)
+        rows, cols = self.shape
+        if self.kind == "square":
+            ix = np.minimum((x // self.cell_m).astype(np.int64), cols - 1)
+            iy = np.minimum((y // self.cell_m).astype(np.int64), rows - 1)
+            flat = iy * cols + ix
+        else:
+            s = self._hex_size
+            qf = (SQRT3 / 3 * x - y / 3) / s
+            rf = (2 / 3 * y) / s
+            # Cube rounding: round all three coordinates, fix the one that moved most.
+            sf = -qf - rf
+            q, r, c = np.round(qf), np.round(rf), np.round(sf)
+            dq, dr, dc = np.abs(q - qf), np.abs(r - rf), np.abs(c - sf)
+            fix_q = (dq > dr) & (dq > dc)
+            fix_r = ~fix_q & (dr > dc)
+            q = np.where(fix_q, -r - c, q)
+            r = np.where(fix_r, -q - c, r)
+            q0, r0, nq = self._hex_origin
+            flat = (r.astype(np.int64) - r0) * nq + (q.astype(np.int64) - q0)
+        return np.where(inside, flat, -1)
+
+    def centers(self, flat: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(lat, lng) of cell centres."""
+        rows, cols = self.shape
+        if self.kind == "square":
+            x = (flat % cols + 0.5) * self.cell_m
+            y = (flat // cols + 0.5) * self.cell_m
+        else:
+            q0, r0, nq = self._hex_origin
+            q, r = flat % nq + q0, flat // nq + r0
+            s = self._hex_size
+            x = s * (SQRT3 * q + SQRT3 / 2 * r)
+            y = s * 1.5 * r
+        mx, my = self._scale
+        return self.bbox[1] + y / my, self.bbox[0] + x / mx
+
+
+# -- point sets --------------------------------------------------------------
+
+@dataclass
+class PointSet:
+    """Append-only columnar points of one layer, with capacity doubling."""
+    n: int = 0
+    max_id: int = 0
+    generation: int = 0  # distinguishes full reloads
+    version: int = 0     # bumped on every append
+    loaded_at: float = 0.0
+    lat: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    lng: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    t: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    cat: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int32))
+    value: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    categories: Dict[str, int] = field(default_factory=dict)
+    cells: Dict[Grid, np.ndarray] = field(default_factory=dict)
+
+    def append(self, ids: Sequence[int], lat: Sequence[float], lng: Sequence[float], t: Sequence[int],
+               categories: Sequence[Optional[str]], values: Optional[Sequence[float]] = None) -> None:
+        k = len(ids)
+        if not k:
+            return
+        need = self.n + k
+        if need > len(self.lat):
+            capacity = max(need, 2 * len(self.lat), 1024)
+            for name in ("lat", "lng", "t", "cat", "value"):
+                old = getattr(self, name)
+                grown = np.zeros(capacity, dtype=old.dtype)
+                grown[:self.n] = old[:self.n]
+                setattr(self, name, grown)
+            for grid, old in list(self.cells.items()):
+                grown = np.full(capacity, -1, dtype=np.int64)
+                grown[:self.n] = old[:self.n]
+                self.cells[grid] = grown
+        lo, hi = self.n, need
+        self.lat[lo:hi] = lat
+        self.lng[lo:hi] = lng
+        self.t[lo:hi] = t
+        codes = self.categories
+        self.cat[lo:hi] = [codes.setdefault(_category_key(c), len(codes)) for c in categories]
+        self.value[lo:hi] = values if values is not None else 1.0
+        for grid, cells in self.cells.items():
+            cells[lo:hi] = grid.index(self.lat[lo:hi], self.lng[lo:hi])
+        self.n = need
+        self.max_id = max(self.max_id, int(max(ids)))
+        self.version += 1
+
+    def cells_for(self, grid: Grid) -> np.ndarray:
+        cells = self.cells.get(grid)
+        if cells is None:
+            while len(self.cells) >= MAX_CACHED_GRIDS:
+                del self.cells[next(iter(self.cells))]
+            cells = np.full(len(self.lat), -1, dtype=np.int64)
+            cells[:self.n] = grid.index(self.lat[:self.n], self.lng[:self.n])
+            self.cells[grid] = cells
+        return cells[:self.n]
+
+
+def _epoch(column):
+    return func.coalesce(cast(func.strftime("%s", column), Integer), 0)
+
+
+LAYER_QUERIES: Dict[str, Callable[[int], object]] = {
+    "reports": lambda after: select(
+        CitizenReport.id, CitizenReport.lat, CitizenReport.lng, _epoch(CitizenReport.created_at), CitizenReport.category,
+    ).where(CitizenReport.id > after, CitizenReport.lat.isnot(None), CitizenReport.lng.isnot(None)),
+    "incidents": lambda after: select(
+        EmergencyIncident.id, EmergencyIncident.lat, EmergencyIncident.lng, _epoch(EmergencyIncident.reported_at),
+        EmergencyIncident.type,
+    ).where(EmergencyIncident.id > after, EmergencyIncident.lat.isnot(None), EmergencyIncident.lng.isnot(None)),
+    "readings": lambda after: select(
+        SensorReading.id, SensorReading.lat, SensorReading.lng, _epoch(SensorReading.timestamp),
+        SensorReading.sensor_type, SensorReading.value,
+    ).where(SensorReading.id > after, SensorReading.lat.isnot(None), SensorReading.lng.isnot(None)),
+}
+
+
+# -- store -------------------------------------------------------------------
+
+class HeatmapStore:
+    def __init__(self, reload_seconds: float = RELOAD_SECONDS, cache_size: int = RESULT_CACHE_SIZE,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.reload_seconds = reload_seconds
+        self.cache_size = cache_size
+        self.clock = clock
+        self._points: Dict[str, PointSet] = {}
+        self._generations = itertools.count(1)
+        self._reloading: Set[str] = set()
+        self._results: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def points(self, db: Session, layer: str) -> PointSet:
+        """The layer's points, extended with rows inserted since the last call."""
+        query = LAYER_QUERIES.get(layer)
+        if query is None:
+            raise ValueError(f"layer must be one of {tuple(LAYER_QUERIES)}")
+        with self._lock:
+            points = self._points.get(layer)
+            reload = points is None or (
+                self.clock() - points.loaded_at >= self.reload_seconds and layer not in self._reloading
+            )
+            if reload:
+                self._reloading.add(layer)
+        if reload:
+            # Full (re)load outside the lock: other requests keep extending the old set meanwhile.
+            try:
+                fresh = PointSet(generation=next(self._generations), loaded_at=self.clock())
+                self._extend(db, fresh, query)
+                with self._lock:
+                    self._points[layer] = fresh
+                return fresh
+            finally:
+                self._reloading.discard(layer)
+        with self._lock:
+            self._extend(db, points, query)
+            return points
+
+    @staticmethod
+    def _extend(db: Session, points: PointSet, query: Callable[[int], object]) -> None:
+        rows = db.execute(query(points.max_id)).all()
+        if rows:
+            columns = list(zip(*rows))
+            points.append(columns[0], columns[1], columns[2], columns[3], columns[4],
+                          columns[5] if len(columns) > 5 else None)
+
+    def heatmap(self, db: Session, layer: str, grid: str = "square", cell_m: float = DEFAULT_CELL_METERS,
+                start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+                categories: Optional[Sequence[str]] = None, agg: str = "count") -> bytes:
+        """JSON-encoded bins: columnar lat/lng/count (and value unless agg=count) of every non-empty cell."""
+        if grid not in GRIDS:
+            raise ValueError(f"grid must be one of {GRIDS}")
+        if agg not in AGGREGATES:
+            raise ValueError(f"agg must be one of {AGGREGATES}")
+        if not MIN_CELL_METERS <= cell_m <= MAX_CELL_METERS:
+            raise ValueError(f"cell_m must be between {MIN_CELL_METERS:g} and {MAX_CELL_METERS:g}")
+        wanted = tuple(sorted({_category_key(c) for c in categories})) if categories else None
+        start, end = _naive_utc(start), _naive_utc(end)
+        points = self.points(db, layer)
+        key = (layer, points.generation, points.version, grid, cell_m, start, end, wanted, agg)
+        with self._lock:
+            body = self._results.get(key)
+            if body is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return body
+            spec = Grid(grid, cell_m)
+            cells = points.cells_for(spec)
+            n = points.n
+            mask = cells >= 0
+            if start is not None:
+                mask &= points.t[:n] >= int((start - EPOCH).total_seconds())
+            if end is not None:
+                mask &= points.t[:n] < int((end - EPOCH).total_seconds())
+            if wanted is not None:
+                codes = [points.categories[c] for c in wanted if c in points.categories]
+                mask &= np.isin(points.cat[:n], codes)
+            idx = cells[mask]
+            counts = np.bincount(idx, minlength=spec.size)
+            nonzero = np.flatnonzero(counts)
+            if agg == "count":
+                values = counts[nonzero].astype(float)
+            else:
+                sums = np.bincount(idx, weights=points.value[:n][mask], minlength=spec.size)[nonzero]
+                values = sums if agg == "sum" else sums / counts[nonzero]
+            lat, lng = spec.centers(nonzero)
+            cells_payload = {
+                "lat": np.round(lat, 6).tolist(),
+                "lng": np.round(lng, 6).tolist(),
+                "count": counts[nonzero].tolist(),
+            }
+            if agg != "count":
+                cells_payload["value"] = np.round(values, 3).tolist()
+            body = json.dumps({
+                "layer": layer,
+                "grid": grid,
+                "cell_m": cell_m,
+                "bbox": list(spec.bbox),
+                "agg": agg,
+                "total": int(counts.sum()),
+                "max": float(values.max()) if len(values) else 0.0,
+                "cells": cells_payload,
+            }).encode("utf-8")
+            self.misses += 1
+            self._results[key] = body
+            while len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+            return body
+
+    def stats(self) -> Dict:
+        return {
+            "layers": {name: {"points": p.n, "version": p.version, "grids": len(p.cells)} for name, p in self._points.items()},
+            "cached_results": len(self._results),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_heatmap_store() -> HeatmapStore:
+    return HeatmapStore()
@@ -10,6 +10,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from database import SessionLocal, AIKnowledge, init_db
 from almaty_dataset import ALMATY_DATASET
 from extended_dataset import EXTENDED_DATASET
+from seed_manager import bulk_load_knowledge
 
 def load_datasets():
     """Load all datasets into the database"""
@@ -26,53 +27,17 @@ def load_datasets():
         
         # Load ALMATY_DATASET
         print("\n📚 Loading ALMATY_DATASET...")
-        for item in ALMATY_DATASET:
-            # Check if pattern already exists
-            existing = db.query(AIKnowledge).filter(
-                AIKnowledge.pattern == item.get("pattern", ""),
-                AIKnowledge.language == item.get("language", "en")
-            ).first()
-            
-            if not existing:
-                knowledge = AIKnowledge(
-                    category=item.get("category", "GENERAL"),
-                    pattern=item.get("pattern", ""),
-                    response=item.get("response", ""),
-                    language=item.get("language", "en"),
-                    importance=item.get("importance", 3)
-                )
-                db.add(knowledge)
-                added_count += 1
-            else:
-                skipped_count += 1
-        
-        db.commit()
-        print(f"  ✓ Processed {len(ALMATY_DATASET)} entries from ALMATY_DATASET")
+        stats = bulk_load_knowledge(db, ALMATY_DATASET, default_importance=3)
+        added_count += stats.inserted
+        skipped_count += stats.skipped
+        print(f"  ✓ Processed {stats.processed} entries from ALMATY_DATASET")
         
         # Load EXTENDED_DATASET
         print("\n📚 Loading EXTENDED_DATASET...")
-        for item in EXTENDED_DATASET:
-            # Check if pattern already exists
-            existing = db.query(AIKnowledge).filter(
-                AIKnowledge.pattern == item.get("pattern", ""),
-                AIKnowledge.language == item.get("language", "en")
-            ).first()
-            
-            if not existing:
-                knowledge = AIKnowledge(
-                    category=item.get("category", "GENERAL"),
-                    pattern=item.get("pattern", ""),
-                    response=item.get("response", ""),
-                    language=item.get("language", "en"),
-                    importance=item.get("importance", 2)
-                )
-                db.add(knowledge)
-                added_count += 1
-            else:
-                skipped_count += 1
-        
-        db.commit()
-        print(f"  ✓ Processed {len(EXTENDED_DATASET)} entries from EXTENDED_DATASET")
+        stats = bulk_load_knowledge(db, EXTENDED_DATASET, default_importance=2)
+        added_count += stats.inserted
+        skipped_count += stats.skipped
+        print(f"  ✓ Processed {stats.processed} entries from EXTENDED_DATASET")
         
         # Final count
         final_count = db.query(AIKnowledge).count()
@@ -86,8 +51,6 @@ def load_datasets():
         
         # Show category breakdown
         print("\n📁 Categories breakdown:")
-        categories = db.query(AIKnowledge.category, db.query(AIKnowledge).filter(AIKnowledge.category == AIKnowledge.category).count()).distinct().all()
-        
         from sqlalchemy import func
         category_counts = db.query(AIKnowledge.category, func.count(AIKnowledge.id)).group_by(AIKnowledge.category).all()
         for cat, count in sorted(category_counts, key=lambda x: -x[1]):
@@ -1,5 +1,8 @@
 """
 Local retrieval pipeline:
+- Exact duplicates collapsed across categories, near-duplicates clustered
+  within each category (one indexed document per cluster, the rest kept as
+  its aliases)
 - BM25 top-k
 - Fuzzy top-k
 - Context-aware rerank
@@ -8,7 +11,8 @@ Local retrieval pipeline:
 from __future__ import annotations
 
 import re
-from dataclasses import dataclass
+from collections import defaultdict
+from dataclasses import dataclass, field
 from functools import lru_cache
 from typing import Dict, List, Set, Tuple
 
@@ -18,6 +22,7 @@ from rank_bm25 import BM25Okapi
 from almaty_dataset import ALMATY_DATASET
 from conversation_dataset import CONVERSATION_DATASET
 from external_data_loader import load_external_datasets
+from near_duplicates import MinHashLSH
 from website_knowledge_dataset import WEBSITE_KNOWLEDGE_DATASET
 
 try:
@@ -47,6 +52,44 @@ class _Doc:
     category: str
     reliability_weight: float
     tokens: Set[str]
+    # (text, source) of the duplicates collapsed into this document
+    aliases: List[Tuple[str, str]] = field(default_factory=list)
+
+
+def _absorb(head: _Doc, member: _Doc) -> None:
+    head.aliases.append((member.text, member.source))
+    head.aliases.extend(member.aliases)
+
+
+def _collapse_near_duplicates(docs: List[_Doc], threshold: float = 0.85) -> List[_Doc]:
+    """Keep the first (highest-priority source) document of each duplicate cluster.
+
+    Identical texts collapse whatever their category. Near-duplicates are only
+    compared within a category, so every category keeps its own wording and
+    its context boost.
+    """
+    by_text: Dict[str, _Doc] = {}
+    for doc in docs:
+        if doc.text in by_text:
+            _absorb(by_text[doc.text], doc)
+        else:
+            by_text[doc.text] = doc
+    unique = list(by_text.values())
+
+    by_category: Dict[str, List[int]] = defaultdict(list)
+    for i, doc in enumerate(unique):
+        by_category[doc.category].append(i)
+    lsh = MinHashLSH(threshold=threshold)
+    kept: List[int] = []
+    for members in by_category.values():
+        clusters = lsh.cluster([unique[i].text for i in members])
+        for root, cluster in clusters.clusters.items():
+            head = unique[members[root]]
+            for m in cluster:
+                if m != root:
+                    _absorb(head, unique[members[m]])
+            kept.append(members[root])
+    return [unique[i] for i in sorted(kept)]
 
 
 class LocalRetriever:
@@ -76,9 +119,11 @@ class LocalRetriever:
             return
         try:
             session = SessionLocal()
-            rows = session.query(AIKnowledge).all()
-            for row in rows:
-                self._append_doc(row.response, "db_ai_knowledge", row.category, 1.1)
+            # Augmented rows repeat the same response many times; only distinct
+            # (response, category) pairs can become separate documents.
+            rows = session.query(AIKnowledge.response, AIKnowledge.category).distinct().all()
+            for response, category in rows:
+                self._append_doc(response, "db_ai_knowledge", category, 1.1)
             session.close()
         except Exception:
             pass
@@ -97,16 +142,7 @@ class LocalRetriever:
     def _build_index(self) -> None:
         self._load_from_db()
         self._load_from_datasets()
-        # Deduplicate by text.
-        seen = set()
-        dedup_docs: List[_Doc] = []
-        for d in self.docs:
-            key = d.text.lower()
-            if key in seen:
-                continue
-            seen.add(key)
-            dedup_docs.append(d)
-        self.docs = dedup_docs
+        self.docs = _collapse_near_duplicates(self.docs)
         self._tokenized_docs = [_tok(d.text) for d in self.docs]
         self._bm25 = BM25Okapi(self._tokenized_docs) if self._tokenized_docs else None
 
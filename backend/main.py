@@ -1,5 +1,7 @@
-from fastapi import FastAPI, HTTPException, Depends, File, UploadFile
+from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 import random
@@ -9,14 +11,33 @@ import hashlib
 from sqlalchemy import func
 import datetime
 from database import SessionLocal, init_db, User, ActivityLog, CitizenReport, SensorReading, EmergencyIncident, BusLocation, AIKnowledge, EmergencyUnit, Petition, UserProfile, Chat, ChatMember, Message, Contact
-from almaty_dataset import ALMATY_DATASET
+from seed_manager import STARTUP_SEED_KEY, get_data_version, knowledge_rows, seed_knowledge_base, set_data_version, startup_seed_version
 import xml.etree.ElementTree as ET
 import os
 import asyncio
+import threading
 import shutil
 import uuid
 from fastapi.staticfiles import StaticFiles
 from routing_api import routing_router
+from ai_warmup import READY, get_warmup, register_ai_components
+from messenger_queries import chat_list, chat_messages, mark_read, record_message
+from messenger_hub import get_messenger_hub, messenger_ws_router
+from presence import get_presence
+import messenger_search
+from stats_snapshot import get_stats_snapshot
+from admin_queries import export_users, users_page
+from activity_log import get_activity_writer, log_activity
+from timeseries import record_readings, series
+from sensor_ingest import MAX_ITEMS_PER_REQUEST, IngestResult, NdjsonDecoder, get_sensor_ingestor, parse_json_batch
+from city_state import get_city_state
+from open_meteo import get_open_meteo
+from forecasting import dashboard_forecasts, get_forecast_cache, is_stale
+from emergency_sim import get_unit_simulation
+from emergency_dispatch import assign_units
+from heatmap import get_heatmap_store
+from report_dedup import DEDUP_RADIUS_M, DEDUP_WINDOW_HOURS, file_report, recluster
+from map_tiles import CLUSTER_MAX_ZOOM, LAYERS, QUADKEY_ZOOM, backfill_quadkeys, get_tile_cache, parse_bbox, points_page
 
 # Create uploads directory
 os.makedirs("uploads/messenger", exist_ok=True)
@@ -57,10 +78,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Modular routing API (eco routing v2)
 app.include_router(routing_router)
+app.include_router(messenger_ws_router)
 
 # Dependency
 def get_db():
@@ -74,15 +97,24 @@ def get_db():
 def startup_event():
     db = SessionLocal()
     try:
+        # Skip all seeding when the stored data version matches this build
+        seed_rows = knowledge_rows()
+        seed_version = startup_seed_version(seed_rows)
+        if get_data_version(db, STARTUP_SEED_KEY) == seed_version:
+            print("Seed data up to date, skipping startup seeding.")
+            return
+
         # Seed sensor data if empty
         if db.query(SensorReading).count() == 0:
             print("Seeding sensor data...")
+            readings = []
             for i in range(24): # Last 24 hours
                 timestamp = datetime.datetime.utcnow() - datetime.timedelta(hours=24-i)
                 # AQI
-                db.add(SensorReading(sensor_type="AQI", value=random.randint(40, 150), timestamp=timestamp))
+                readings.append({"sensor_type": "AQI", "value": random.randint(40, 150), "timestamp": timestamp})
                 # Traffic
-                db.add(SensorReading(sensor_type="TRAFFIC", value=random.randint(2, 9), timestamp=timestamp))
+                readings.append({"sensor_type": "TRAFFIC", "value": random.randint(2, 9), "timestamp": timestamp})
+            record_readings(db, readings)
             db.commit()
 
         # Seed Emergency incidents
@@ -134,29 +166,9 @@ def startup_event():
             db.commit()
             print(f"Seeded {len(all_vehicles)} vehicles across all transport networks.")
 
-        # Seed AI Knowledge base (Incremental Sync)
+        # Seed AI Knowledge base (base dataset + augmentation to reach 10k+ entries)
         print("Syncing AI Knowledge Base...")
-        existing_patterns = {k.pattern for k in db.query(AIKnowledge.pattern).all()}
-        new_entries = 0
-        for item in ALMATY_DATASET:
-            if item["pattern"] not in existing_patterns:
-                knowledge = AIKnowledge(
-                    category=item["category"],
-                    pattern=item["pattern"],
-                    response=item["response"],
-                    language=item["language"],
-                    importance=item.get("importance", 1)
-                )
-                db.add(knowledge)
-                new_entries += 1
-        
-        if new_entries > 0:
-            db.commit()
-            print(f"AI Knowledge Base synced: Added {new_entries} base entries.")
-        
-        # Trigger Augmentation to reach 10k+ entries
-        from data_augmenter import augment_data
-        augment_data()
+        seed_knowledge_base(db, seed_rows)
 
         # Seed Emergency Units
         if db.query(EmergencyUnit).count() == 0:
@@ -201,9 +213,126 @@ def startup_event():
             db.add_all(reports)
             db.commit()
             print("Reports seeded successfully.")
+
+        set_data_version(db, STARTUP_SEED_KEY, seed_version)
+        db.commit()
     finally:
         db.close()
 
+@app.on_event("startup")
+def index_map_layers():
+    """Fill the quadkey tile index for reports/incidents written before it existed"""
+    db = SessionLocal()
+    try:
+        filled = backfill_quadkeys(db)
+        if filled:
+            print(f"[MapTiles] Indexed {filled} rows")
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def start_presence_flush():
+    """Persist in-memory presence to user_profiles in periodic batches"""
+    get_presence().start(SessionLocal)
+
+@app.on_event("shutdown")
+def stop_presence_flush():
+    get_presence().stop(SessionLocal)
+
+@app.on_event("startup")
+def start_activity_writer():
+    """Write ActivityLog rows in background batches (replays any spill file first)"""
+    get_activity_writer().start()
+
+@app.on_event("shutdown")
+def stop_activity_writer():
+    get_activity_writer().stop()
+
+@app.on_event("startup")
+def start_city_state():
+    """Keep the latest AQI / PM2.5 / traffic / weather in memory for the hot read paths"""
+    city = get_city_state()
+    get_sensor_ingestor().listeners.append(city.apply_readings)
+    city.start(SessionLocal)
+
+@app.on_event("shutdown")
+def stop_city_state():
+    get_city_state().stop()
+
+OPEN_METEO_POLL_SECONDS = 300
+
+async def poll_open_meteo():
+    """Keep the city state's air quality and weather warm through the shared client.
+
+    The poll interval exceeds the cache TTL, so it revalidates rather than
+    taking the stale-while-revalidate path, whose refresh would never reach
+    the city state.
+    """
+    client, city = get_open_meteo(), get_city_state()
+    while True:
+        air = await client.air_quality(revalidate=True)
+        if air is not None:
+            city.apply_air_quality(air.data, air.age_seconds)
+        weather = await client.weather(revalidate=True)
+        if weather is not None:
+            city.apply_weather(weather.data, weather.age_seconds)
+        await asyncio.sleep(OPEN_METEO_POLL_SECONDS)
+
+@app.on_event("startup")
+async def start_open_meteo_poller():
+    app.state.open_meteo_poller = asyncio.create_task(poll_open_meteo())
+
+@app.on_event("shutdown")
+async def stop_open_meteo_poller():
+    poller = getattr(app.state, "open_meteo_poller", None)
+    if poller is not None:
+        poller.cancel()
+    await get_open_meteo().aclose()
+
+@app.on_event("startup")
+def start_sensor_ingest():
+    """Persist ingested sensor readings in background batches"""
+    get_sensor_ingestor().start()
+
+@app.on_event("shutdown")
+def stop_sensor_ingest():
+    get_sensor_ingestor().stop()
+
+@app.on_event("startup")
+def start_forecast_refit():
+    """Refit the sensor forecasting models periodically; /api/ai/forecast serves the cached result"""
+    get_forecast_cache().start()
+
+@app.on_event("shutdown")
+def stop_forecast_refit():
+    get_forecast_cache().stop()
+
+@app.on_event("startup")
+def start_unit_simulation():
+    """Tick emergency unit movement in memory; positions are persisted periodically"""
+    get_unit_simulation().start(SessionLocal)
+
+@app.on_event("shutdown")
+def stop_unit_simulation():
+    get_unit_simulation().stop(SessionLocal)
+
+@app.on_event("startup")
+def start_stats_snapshot():
+    """Precompute /api/stats so dashboard polling never hits the database"""
+    get_stats_snapshot().start()
+
+@app.on_event("shutdown")
+def stop_stats_snapshot():
+    get_stats_snapshot().stop()
+
+@app.on_event("startup")
+def start_ai_warmup():
+    """Build the AI stack in background threads once seed data is in place"""
+    warmup = get_warmup()
+    if HAS_AI_BRAIN and os.getenv("AI_WARMUP", "1") == "1":
+        register_ai_components(warmup)
+    warmup.start()
+
 @app.get("/")
 def read_root():
     return {"status": "Online", "system": "Smart City Almaty OS", "version": "2.0.0"}
@@ -228,9 +357,7 @@ def register(user: UserAuth, db: Session = Depends(get_db)):
     db.refresh(new_user)
     
     # Log Action
-    log = ActivityLog(user_id=new_user.id, action="REGISTER", details=f"New citizen registered: {user.email}")
-    db.add(log)
-    db.commit()
+    log_activity(new_user.id, "REGISTER", f"New citizen registered: {user.email}")
     
     return {"success": True, "token": "mock-jwt-token", "user": {"id": new_user.id, "email": new_user.email, "username": new_user.username}}
 
@@ -241,9 +368,7 @@ def login(user: UserAuth, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Invalid credentials")
     
     # Log Action
-    log = ActivityLog(user_id=existing_user.id, action="LOGIN", details="User logged in")
-    db.add(log)
-    db.commit()
+    log_activity(existing_user.id, "LOGIN", "User logged in")
     
     return {"success": True, "token": "mock-jwt-token", "user": {"id": existing_user.id, "email": existing_user.email, "username": existing_user.username}}
 
@@ -258,6 +383,29 @@ class AIQuery(BaseModel):
     context: dict | None = None
     enable_internet_fallback: bool = False
 
+# While the AI stack warms up: "degraded" answers immediately, "wait" holds the
+# request (up to AI_WARMUP_WAIT_SECONDS) and then degrades if still not warm.
+AI_WARMUP_MODE = os.getenv("AI_WARMUP_MODE", "degraded")
+AI_WARMUP_WAIT_SECONDS = float(os.getenv("AI_WARMUP_WAIT_SECONDS", "10"))
+
+def _warming_up_response(context: dict, started: float) -> dict:
+    # Never build the engine here: the warm-up thread may be doing just that.
+    suggestions = []
+    if get_warmup().status("proactive_engine") == READY:
+        suggestions = get_proactive_engine().get_suggestions(context, lang="en")
+    return {
+        "response": "The city assistant is starting up. Please try again in a few seconds.",
+        "intent_detected": "WARMING_UP",
+        "intent_confidence": 0.0,
+        "engine": "SmartCityAlmaty-Neural-V3",
+        "source": "warming_up",
+        "web_sources": [],
+        "language": "en",
+        "proactive_suggestions": suggestions,
+        "processing_time_ms": round((time.perf_counter() - started) * 1000.0, 2),
+        "status": "warming_up"
+    }
+
 @app.post("/api/ai/analyze")
 def analyze_data(ai_query: AIQuery, db: Session = Depends(get_db)):
     """
@@ -265,14 +413,22 @@ def analyze_data(ai_query: AIQuery, db: Session = Depends(get_db)):
     """
     if not HAS_AI_BRAIN:
         return {"response": "AI Engine is initializing...", "status": "error"}
+
+    warmup = get_warmup()
+    # Settled is not enough: a failed enhanced_ai is being retried in the background,
+    # and building it inline here would race that retry.
+    if warmup.started and warmup.status("enhanced_ai") not in (None, READY):
+        if AI_WARMUP_MODE != "wait" or not warmup.wait_ready("enhanced_ai", AI_WARMUP_WAIT_SECONDS):
+            return _warming_up_response(ai_query.context or {}, time.perf_counter())
         
     ai = get_enhanced_ai()
     proactive = get_proactive_engine()
     # V4.1 policy: no web/LLM runtime fallback in production responses.
     ai.config.enable_web_fallback = False
     
-    # 1. Prepare context from frontend (primary) or sensors DB (fallback)
+    # 1. Prepare context from frontend (primary) or the shared city state (fallback)
     context = ai_query.context or {}
+    city = get_city_state()
     
     # Frontend passes: weather, air (with aqi, pm25, pm10, o3, no2), traffic (with congestionLevel, averageSpeed, incidents)
     # Map frontend format to our internal format if present
@@ -280,21 +436,21 @@ def analyze_data(ai_query: AIQuery, db: Session = Depends(get_db)):
         # Frontend context already has air data from API
         pass
     else:
-        # Fallback to DB
-        latest_aqi = db.query(SensorReading).filter(SensorReading.sensor_type == "AQI").order_by(SensorReading.timestamp.desc()).first()
-        if latest_aqi:
-            context.setdefault("air", {})["aqi"] = latest_aqi.value
-            context["air"]["pm25"] = round(latest_aqi.value * 0.4, 2)
+        # Fallback to latest sensor values
+        latest_aqi = city.value("aqi")
+        if latest_aqi is not None:
+            context.setdefault("air", {})["aqi"] = latest_aqi
+            context["air"]["pm25"] = city.value("pm25", round(latest_aqi * 0.4, 2))
     
     if context.get("traffic") and (context["traffic"].get("congestionLevel") or context["traffic"].get("congestion")):
         # Normalize key name
         if "congestionLevel" in context["traffic"]:
             context["traffic"]["congestion"] = context["traffic"]["congestionLevel"]
     else:
-        # Fallback to DB
-        latest_traffic = db.query(SensorReading).filter(SensorReading.sensor_type == "TRAFFIC").order_by(SensorReading.timestamp.desc()).first()
-        if latest_traffic:
-            context.setdefault("traffic", {})["congestion"] = latest_traffic.value
+        # Fallback to latest sensor values
+        latest_traffic = city.value("traffic")
+        if latest_traffic is not None:
+            context.setdefault("traffic", {})["congestion"] = latest_traffic
     
     # 2. Add proactive suggestions (The "WOW" factor)
     proactive_tips = proactive.get_suggestions(context, lang="en")
@@ -321,9 +477,7 @@ def analyze_data(ai_query: AIQuery, db: Session = Depends(get_db)):
     
     # Log Action
     if ai_query.user_id:
-        log = ActivityLog(user_id=ai_query.user_id, action="AI_QUERY", details=f"Intent: {analysis.intent}")
-        db.add(log)
-        db.commit()
+        log_activity(ai_query.user_id, "AI_QUERY", f"Intent: {analysis.intent}")
 
     payload = {
         "response": response_text,
@@ -334,7 +488,8 @@ def analyze_data(ai_query: AIQuery, db: Session = Depends(get_db)):
         "web_sources": getattr(analysis, "sources", []),
         "language": analysis.language,
         "proactive_suggestions": proactive_tips,
-        "processing_time_ms": round(analysis.processing_time_ms, 2)
+        "processing_time_ms": round(analysis.processing_time_ms, 2),
+        "data_freshness": city.freshness(["aqi", "pm25", "traffic"])
     }
     if os.getenv("AI_DEBUG", "0") == "1":
         payload["routing_reason"] = getattr(analysis, "routing_reason", "")
@@ -368,7 +523,7 @@ def text_to_speech_endpoint(data: dict):
     return {"error": "TTS failed"}
 
 @app.get("/api/ai/proactive")
-def get_proactive_tips(db: Session = Depends(get_db)):
+def get_proactive_tips():
     """
     Dedicated endpoint for proactive city intelligence.
     """
@@ -377,16 +532,21 @@ def get_proactive_tips(db: Session = Depends(get_db)):
     
     # Gather context
     context = {}
-    latest_aqi = db.query(SensorReading).filter(SensorReading.sensor_type == "AQI").order_by(SensorReading.timestamp.desc()).first()
-    latest_traffic = db.query(SensorReading).filter(SensorReading.sensor_type == "TRAFFIC").order_by(SensorReading.timestamp.desc()).first()
-    
-    if latest_aqi:
-        context.setdefault("air", {})["aqi"] = latest_aqi.value
-    if latest_traffic:
-        context.setdefault("traffic", {})["congestion"] = latest_traffic.value
+    city = get_city_state()
+    latest_aqi = city.value("aqi")
+    latest_traffic = city.value("traffic")
+    
+    if latest_aqi is not None:
+        context.setdefault("air", {})["aqi"] = latest_aqi
+    if latest_traffic is not None:
+        context.setdefault("traffic", {})["congestion"] = latest_traffic
         
     tips = proactive.get_suggestions(context, lang="en")
-    return {"suggestions": tips, "timestamp": datetime.datetime.now().isoformat()}
+    return {
+        "suggestions": tips,
+        "timestamp": datetime.datetime.now().isoformat(),
+        "data_freshness": city.freshness(["aqi", "traffic"])
+    }
 
 @app.get("/api/ai/vision-history")
 def get_vision_history():
@@ -471,46 +631,92 @@ class Report(BaseModel):
 
 @app.post("/api/reports")
 def create_report(report: Report, db: Session = Depends(get_db)):
-    """Citizen Report Ingestion"""
-    new_report = CitizenReport(
-        user_id=report.user_id,
-        category=report.category,
-        description=report.description,
-        lat=report.lat,
-        lng=report.lng,
-        ai_analysis="Detected issue. High Priority."
-    )
-    db.add(new_report)
+    """Citizen Report Ingestion, merged into an open report of the same issue nearby if there is one"""
+    new_report, head = file_report(db, report.category, report.description, report.lat, report.lng,
+                                   user_id=report.user_id)
     
     # Log Action
     if report.user_id:
-        log = ActivityLog(user_id=report.user_id, action="REPORT_FILED", details=f"Filed report: {report.category}")
-        db.add(log)
+        log_activity(report.user_id, "REPORT_FILED", f"Filed report: {report.category}")
     
     db.commit()
-    db.refresh(new_report)
     
     return {
         "id": f"R-{new_report.id}",
-        "status": "RECEIVED",
+        "status": new_report.status,
         "ai_analysis": new_report.ai_analysis,
+        "duplicate_of": f"R-{head.id}" if head is not new_report else None,
+        "report_count": head.report_count,
+        "severity": head.severity,
         "estimated_fix": "24 hours"
     }
 
+@app.post("/api/admin/reports/recluster")
+def admin_recluster_reports(radius_m: float = Query(DEDUP_RADIUS_M, gt=0, le=1000),
+                            hours: float = Query(DEDUP_WINDOW_HOURS, gt=0, le=24 * 30),
+                            db: Session = Depends(get_db)):
+    """Admin: Recompute report dedup clusters over all historical reports"""
+    return recluster(db, radius_m, hours)
+
+def map_layer_query(layer: str, response: Response, db: Session, bbox: str | None, zoom: int | None,
+                    limit: int, cursor: str | None):
+    """Viewport (bbox + zoom) query for a map layer, or a keyset page of points without bbox"""
+    try:
+        box = parse_bbox(bbox) if bbox else None
+        if box is not None and zoom is not None and zoom < CLUSTER_MAX_ZOOM:
+            return get_tile_cache().viewport(db, layer, box, zoom)
+        rows, next_cursor = points_page(db, layer, limit=limit, cursor=cursor, bbox=box)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if box is None:
+        return rows
+    return {"layer": layer, "zoom": zoom, "clusters": [], "points": rows, "next_cursor": next_cursor}
+
 @app.get("/api/reports")
-def get_reports(db: Session = Depends(get_db)):
-    """Fetch all citizen reports for the Live Map"""
-    reports = db.query(CitizenReport).all()
-    return [{
-        "id": r.id,
-        "category": r.category,
-        "description": r.description,
-        "lat": r.lat,
-        "lng": r.lng,
-        "status": r.status,
-        "ai_analysis": r.ai_analysis,
-        "created_at": r.created_at
-    } for r in reports]
+def get_reports(response: Response, bbox: str | None = None, zoom: int | None = Query(None, ge=0, le=QUADKEY_ZOOM),
+                limit: int = 500, cursor: str | None = None, db: Session = Depends(get_db)):
+    """Citizen reports for the Live Map: clustered tiles for bbox + zoom, else keyset pages (X-Next-Cursor)"""
+    return map_layer_query("reports", response, db, bbox, zoom, limit, cursor)
+
+@app.get("/api/map/tiles/{layer}/{z}/{x}/{y}")
+def get_map_tile(layer: str, z: int, x: int, y: int, db: Session = Depends(get_db)):
+    """One cached map tile (clusters + points) of the reports or incidents layer"""
+    if layer not in LAYERS:
+        raise HTTPException(status_code=404, detail="Unknown map layer")
+    if not 0 <= z <= QUADKEY_ZOOM or not (0 <= x < 1 << z and 0 <= y < 1 << z):
+        raise HTTPException(status_code=400, detail="Tile out of range")
+    return get_tile_cache().tile(db, layer, z, x, y)
+
+@app.get("/api/map/tiles/stats")
+def get_map_tile_stats():
+    return get_tile_cache().stats()
+
+@app.get("/api/heatmap/stats")
+def get_heatmap_stats():
+    return get_heatmap_store().stats()
+
+@app.get("/api/heatmap/{layer}")
+def get_heatmap(
+    layer: str,
+    grid: str = "square",
+    cell_m: float = 250.0,
+    start: datetime.datetime | None = Query(None, alias="from"),
+    end: datetime.datetime | None = Query(None, alias="to"),
+    categories: str | None = None,
+    agg: str = "count",
+    db: Session = Depends(get_db)
+):
+    """Density bins of reports / incidents / geo-tagged readings over Almaty (square or hex grid)"""
+    try:
+        body = get_heatmap_store().heatmap(
+            db, layer, grid=grid, cell_m=cell_m, start=start, end=end,
+            categories=[c for c in categories.split(",") if c] if categories else None, agg=agg,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=body, media_type="application/json")
 
 @app.get("/api/users/{user_id}/history")
 def get_user_history(user_id: int, db: Session = Depends(get_db)):
@@ -525,38 +731,13 @@ def get_user_history(user_id: int, db: Session = Depends(get_db)):
 
 @app.get("/api/transport/traffic")
 def get_traffic_status():
-    """Realistic Almaty Traffic based on time of day - CONSISTENT values"""
-    now = datetime.datetime.now()
-    hour = now.hour
-    minute = now.minute
-    is_weekend = now.weekday() >= 5
-    
-    # Use minute as seed for pseudo-random but consistent values
-    # This ensures same values for all requests within the same minute
-    seed_value = hour * 60 + minute
-    
-    # Almaty Rush Hours: 08:30-10:00 and 17:30-20:00
-    if is_weekend:
-        base_congestion = 2 + (seed_value % 2)  # 2-3 Light weekend
-        if 12 <= hour <= 18:
-            base_congestion = 3 + (seed_value % 3)  # 3-5 Afternoon leisure
-    else:
-        if (8 <= hour <= 10) or (17 <= hour <= 20):
-            base_congestion = 7 + (seed_value % 3)  # 7-9 Heavy rush hour
-        elif (11 <= hour <= 16):
-            base_congestion = 4 + (seed_value % 3)  # 4-6 Moderate midday
-        else:
-            base_congestion = 1 + (seed_value % 4)  # 1-4 Night/Early morning
-    
-    # Calculate derived values deterministically
-    incidents = (seed_value % 3) if base_congestion < 7 else 2 + (seed_value % 4)
-    avg_speed = max(10, 60 - (base_congestion * 6) + (seed_value % 5))
-            
-    return {
-        "congestion_level": min(10, base_congestion),
-        "incidents": incidents,
-        "avg_speed_kmh": avg_speed
-    }
+    """Realistic Almaty Traffic based on time of day - CONSISTENT values, served from the city state"""
+    city = get_city_state()
+    traffic = city.value("road_traffic")
+    if traffic is None or city.is_stale("road_traffic"):
+        city.refresh_traffic()
+        traffic = city.value("road_traffic")
+    return {**traffic, "data_freshness": city.freshness(["road_traffic"])["road_traffic"]}
 
 @app.get("/api/transport/buses")
 async def get_bus_locations(db: Session = Depends(get_db)):
@@ -658,47 +839,79 @@ async def get_emergency_city_status(db: Session = Depends(get_db)):
     }
 
 @app.get("/api/emergency/units")
-async def get_emergency_units(db: Session = Depends(get_db)):
-    """Fetch persistent locations of emergency responders and simulate small movements"""
-    units = db.query(EmergencyUnit).all()
-    results = []
-    for unit in units:
-        # Simulate slight movement to show it's 'live' but consistent
-        unit.lat += (random.random() - 0.5) * 0.0004
-        unit.lng += (random.random() - 0.5) * 0.0004
-        unit.heading = (unit.heading + random.randint(-5, 5)) % 360
-        
-        results.append({
-            "id": unit.id,
-            "type": unit.type,
-            "status": unit.status,
-            "lat": unit.lat,
-            "lng": unit.lng,
-            "heading": unit.heading
-        })
+def get_emergency_units():
+    """Live responder positions from the in-memory simulation snapshot (no DB access per poll)"""
+    snapshot = get_unit_simulation().ensure_loaded(SessionLocal)
+    return Response(content=snapshot.body, media_type="application/json")
+
+@app.get("/api/emergency/units/nearest")
+def get_nearest_units(lat: float, lng: float, k: int = Query(5, ge=1, le=50), type: str | None = None):
+    """k nearest available units (optionally of one type), from the in-memory grid index"""
+    sim = get_unit_simulation()
+    sim.ensure_loaded(SessionLocal)
+    return sim.nearest(lat, lng, k, (type.upper(),) if type else None)
+
+@app.get("/api/emergency/units/within")
+def get_units_within(lat: float, lng: float, radius_m: float = Query(2000, gt=0, le=50000), type: str | None = None):
+    """Available units within radius_m metres, nearest first"""
+    sim = get_unit_simulation()
+    sim.ensure_loaded(SessionLocal)
+    return sim.within(lat, lng, radius_m, (type.upper(),) if type else None)
+
+# One read-solve-write at a time, so concurrent dispatches cannot assign the same unit or incident twice.
+_dispatch_lock = threading.Lock()
+
+@app.post("/api/emergency/dispatch")
+def dispatch_emergency_units(db: Session = Depends(get_db)):
+    """Assign available units to every ACTIVE incident without one in a single batch solve"""
+    sim = get_unit_simulation()
+    sim.ensure_loaded(SessionLocal)
+    with _dispatch_lock:
+        pending = db.query(EmergencyIncident).filter(
+            EmergencyIncident.status == "ACTIVE",
+            EmergencyIncident.assigned_units.is_(None),
+            EmergencyIncident.lat.isnot(None),
+        ).all()
+        by_id = {inc.id: inc for inc in pending}
+        ids, types, status, lat, lng = sim.positions()
+        assignments = assign_units(
+            [{"id": i.id, "type": i.type, "severity": i.severity, "lat": i.lat, "lng": i.lng} for i in pending],
+            ids, types, status, lat, lng,
+        )
+        for a in assignments:
+            inc = by_id[a.incident_id]
+            sim.dispatch(a.unit_id, inc.lat, inc.lng)
+            inc.status = "RESPONDING"
+            inc.assigned_units = a.unit_id
+            # Stored with the assignment so a restart before the next persist still resumes the trip.
+            unit = db.get(EmergencyUnit, a.unit_id)
+            if unit is not None:
+                unit.status, unit.target_lat, unit.target_lng = "EN_ROUTE", inc.lat, inc.lng
+        db.commit()
+    return {
+        "assigned": [{"incident_id": a.incident_id, "unit_id": a.unit_id, "distance_m": a.distance_m} for a in assignments],
+        "unassigned": sorted(set(by_id) - {a.incident_id for a in assignments}),
+    }
+
+@app.post("/api/emergency/incidents/{incident_id}/resolve")
+def resolve_emergency_incident(incident_id: int, db: Session = Depends(get_db)):
+    """Close an incident and return its assigned units to the available pool"""
+    inc = db.get(EmergencyIncident, incident_id)
+    if not inc:
+        raise HTTPException(status_code=404, detail="Incident not found")
+    inc.status = "RESOLVED"
     db.commit()
-    return results
+    sim = get_unit_simulation()
+    sim.ensure_loaded(SessionLocal)
+    released = sim.release(inc.assigned_units.split(",") if inc.assigned_units else [])
+    return {"status": "RESOLVED", "incident_id": inc.id, "released_units": released}
 
 @app.get("/api/emergency/incidents")
-async def get_emergency_incidents(db: Session = Depends(get_db)):
-    """Merge local simulated incidents with response tracking"""
-    db_incidents = db.query(EmergencyIncident).all()
-    results = []
-    
-    for inc in db_incidents:
-        results.append({
-            "id": inc.id,
-            "type": inc.type,
-            "description": inc.description,
-            "lat": inc.lat,
-            "lng": inc.lng,
-            "severity": inc.severity,
-            "status": inc.status,
-            "reported_at": inc.reported_at.isoformat(),
-            "assigned_units": [f"U-{random.randint(100, 999)}"] if inc.status != "ACTIVE" else []
-        })
-    
-    return results
+def get_emergency_incidents(response: Response, bbox: str | None = None,
+                            zoom: int | None = Query(None, ge=0, le=QUADKEY_ZOOM), limit: int = 500,
+                            cursor: str | None = None, db: Session = Depends(get_db)):
+    """Incidents with their assigned units: clustered tiles for bbox + zoom, else keyset pages"""
+    return map_layer_query("incidents", response, db, bbox, zoom, limit, cursor)
 
 @app.get("/api/petitions")
 def get_petitions(db: Session = Depends(get_db)):
@@ -732,132 +945,135 @@ def post_sos(data: dict, db: Session = Depends(get_db)):
 
 @app.get("/api/sensors/qa")
 async def get_air_quality():
-    """Fetch Real-Time Air Quality for Almaty via Open-Meteo"""
-    try:
-        async with httpx.AsyncClient() as client:
-            # Almaty Coords: 43.2389, 76.8897
-            url = "https://air-quality-api.open-meteo.com/v1/air-quality?latitude=43.2389&longitude=76.8897&current=european_aqi,pm2_5,pm10,nitrogen_dioxide,ozone"
-            response = await client.get(url, timeout=5.0)
-            if response.status_code == 200:
-                data = response.json().get("current", {})
-                return {
-                    "aqi": data.get("european_aqi", 50),
-                    "pm25": data.get("pm2_5", 15),
-                    "pm10": data.get("pm10", 25),
-                    "no2": data.get("nitrogen_dioxide", 10),
-                    "o3": data.get("ozone", 30),
-                    "timestamp": time.time(),
-                    "source": "Open-Meteo Real-time"
-                }
-    except Exception as e:
-        print(f"Air Quality API error: {e}")
-        
-    # Fallback to smart simulation if API fails
+    """Real-Time Air Quality for Almaty via the shared (cached, single-flight) Open-Meteo client"""
+    city = get_city_state()
+    result = await get_open_meteo().air_quality()
+    if result is not None:
+        city.apply_air_quality(result.data, result.age_seconds)
+    air = city.get("air_quality")
+    if air is not None:
+        meta = city.freshness(["air_quality"])["air_quality"]
+        return {
+            **air.value,
+            "timestamp": (air.observed_at - datetime.datetime(1970, 1, 1)).total_seconds(),
+            "source": air.source,
+            "cache": result.status if result is not None else "fallback",
+            "age_seconds": meta["age_seconds"],
+            "stale": meta["stale"]
+        }
+
+    # Fallback to smart simulation if the API has never answered
     return {
         "aqi": random.randint(40, 60),
         "pm25": random.randint(10, 25),
         "timestamp": time.time(),
-        "source": "Simulation-Fallback"
+        "source": "Simulation-Fallback",
+        "stale": True
     }
 
-@app.get("/api/stats")
-def get_global_stats(db: Session = Depends(get_db)):
-    """Global system health stats calculated from real platform data"""
-    latest_aqi = db.query(SensorReading).filter(SensorReading.sensor_type == "AQI").order_by(SensorReading.timestamp.desc()).first()
-    latest_traffic = db.query(SensorReading).filter(SensorReading.sensor_type == "TRAFFIC").order_by(SensorReading.timestamp.desc()).first()
-    
-    aqi_val = latest_aqi.value if latest_aqi else 50
-    traffic_val = latest_traffic.value if latest_traffic else 5
-    
-    # city_health_score calculation
-    aqi_penalty = (aqi_val / 300) * 100
-    traffic_penalty = (traffic_val / 10) * 100
-    health_score = int(max(0, 100 - (aqi_penalty * 0.6 + traffic_penalty * 0.4)))
-
-    # Real Metrics
-    total_reports = db.query(CitizenReport).count()
-    active_users = db.query(User).count()
-    total_logs = db.query(ActivityLog).count()
-    
-    # Activity by day (last 7 days)
-    activity_by_day = []
-    for i in range(7):
-        date = (datetime.datetime.utcnow() - datetime.timedelta(days=6-i)).date()
-        count = db.query(ActivityLog).filter(func.date(ActivityLog.timestamp) == date).count()
-        activity_by_day.append({"date": date.isoformat(), "count": count + random.randint(5, 15)}) # some padding for demo
+@app.get("/api/sensors/upstream/stats")
+def get_upstream_stats():
+    return get_open_meteo().stats()
 
-    return {
-        "totalObjects": total_reports,
-        "totalComments": random.randint(10, 50),
-        "totalLikes": random.randint(100, 500),
-        "activeUsers": active_users,
-        "city_health_score": health_score,
-        "activityByDay": activity_by_day,
-        "total_active_sensors": 142,
-        "active_emergency_alerts": db.query(EmergencyIncident).filter(EmergencyIncident.status == "ACTIVE").count(),
-        # AI Specific Statistics
-        "ai_metrics": {
-            "total_queries": db.query(ActivityLog).filter(ActivityLog.action == "AI_QUERY").count() + 1240, # including historical
-            "avg_response_time_ms": 142 + random.randint(0, 50),
-            "kb_entries": db.query(AIKnowledge).count(),
-            "intent_accuracy": 98.2,
-            "topic_distribution": [
-                {"subject": "Transport", "A": 120, "fullMark": 150},
-                {"subject": "Ecology", "A": 98, "fullMark": 150},
-                {"subject": "History", "A": 86, "fullMark": 150},
-                {"subject": "Social", "A": 99, "fullMark": 150},
-                {"subject": "Emergency", "A": 85, "fullMark": 150}
-            ]
-        },
-        # City Performance
-        "infrastructure": [
-            {"label": "Power Grid Stability", "value": 99.8, "trend": "up"},
-            {"label": "Water Treatment Quality", "value": 96.4, "trend": "stable"},
-            {"label": "Transit Punctuality", "value": 94.2, "trend": "up"},
-            {"label": "Public Wifi Coverage", "value": 88.5, "trend": "up"}
-        ]
-    }
+@app.post("/api/sensors/ingest", status_code=202)
+async def ingest_sensor_readings(request: Request):
+    """Batch ingest: a JSON array, or NDJSON (application/x-ndjson) streamed line by line.
+
+    Decoding, validation and the city-state listeners run in the threadpool so
+    large batches do not stall the event loop (other requests, WebSockets).
+    """
+    ingestor = get_sensor_ingestor()
+    content_type = request.headers.get("content-type", "")
+    too_many = f"At most {MAX_ITEMS_PER_REQUEST} readings per request"
+    if "ndjson" in content_type:
+        result, decoder, seen, truncated = IngestResult(), NdjsonDecoder(), 0, False
+
+        async def batches():
+            async for chunk in request.stream():
+                yield await run_in_threadpool(decoder.feed, chunk)
+            yield decoder.close()
+
+        async for items in batches():
+            if seen + len(items) > MAX_ITEMS_PER_REQUEST:
+                items, truncated = items[:MAX_ITEMS_PER_REQUEST - seen], True
+            seen += len(items)
+            result.merge(await run_in_threadpool(ingestor.ingest, items))
+            if truncated:
+                break
+        result.rejected += decoder.bad_lines
+        if truncated:
+            # Everything up to the limit was stored; say so instead of a bare error.
+            return JSONResponse(status_code=413, content={
+                "detail": f"{too_many}; the rest of the stream was not read",
+                "accepted": result.accepted, "rejected": result.rejected,
+                "dropped": result.dropped, "errors": result.errors,
+            })
+    else:
+        body = await request.body()
+
+        def parse_and_ingest() -> IngestResult:
+            try:
+                items = parse_json_batch(body)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid JSON batch: {e}")
+            if len(items) > MAX_ITEMS_PER_REQUEST:
+                raise HTTPException(status_code=413, detail=too_many)
+            return ingestor.ingest(items)
+
+        result = await run_in_threadpool(parse_and_ingest)
+    return {"accepted": result.accepted, "rejected": result.rejected, "dropped": result.dropped, "errors": result.errors}
+
+@app.get("/api/sensors/latest")
+def get_latest_sensor_values(sensor_type: str | None = None):
+    """Latest ingested value per sensor type, straight from the in-memory ring buffers"""
+    ingestor = get_sensor_ingestor()
+    if sensor_type is None:
+        return ingestor.latest_all()
+    latest = ingestor.latest(sensor_type)
+    if latest is None:
+        raise HTTPException(status_code=404, detail="No recent readings for this sensor type")
+    return latest
+
+@app.get("/api/sensors/ingest/stats")
+def get_sensor_ingest_stats():
+    return get_sensor_ingestor().stats()
+
+@app.get("/api/stats")
+def get_global_stats():
+    """Global system health stats, served from a snapshot rebuilt in the background"""
+    return Response(content=get_stats_snapshot().get(), media_type="application/json")
 
 @app.get("/api/ai/forecast")
-async def get_ai_forecast():
-    """AI engine predicting city state for the next 3 hours"""
-    now = datetime.datetime.now()
-    forecasts = []
-    
-    # Generate predictions for the next 3 hours
-    for i in range(1, 4):
-        target_time = now + datetime.timedelta(hours=i)
-        forecasts.append({
-            "time": target_time.strftime("%H:00"),
-            "traffic_prediction": random.randint(3, 9), # 1-10 scale
-            "aqi_prediction": random.randint(40, 150),
-            "confidence": 92 - (i * 5), # confidence drops over time
-            "insight": random.choice([
-                "Expected congestion increase on Al-Farabi Ave",
-                "Air quality improving due to mountain breeze",
-                "Normal traffic patterns predicted",
-                "High density near Dostyk Plaza expected",
-                "Slight temperature drop might affect battery sensors"
-            ])
-        })
-    
+def get_ai_forecast():
+    """Precomputed 1-3 h forecasts with 90% intervals (refitted in the background)"""
+    payload = get_forecast_cache().get()
     return {
-        "generated_at": now.isoformat(),
-        "engine": "Neural-Predictor-V5",
-        "forecasts": forecasts
+        "generated_at": payload["fitted_at"],
+        "engine": "Vectorized-Ensemble-V1",
+        "origin": payload["origin"],
+        "stale": is_stale(payload),
+        "forecasts": dashboard_forecasts(payload),
+        "series": payload["series"],
+        "fit_ms": payload["fit_ms"]
     }
 
 @app.get("/api/timeseries/{sensor_type}")
-def get_timeseries(sensor_type: str, db: Session = Depends(get_db)):
-    """Fetch 24h historical data for charts"""
-    readings = db.query(SensorReading).filter(
-        SensorReading.sensor_type == sensor_type.upper()
-    ).order_by(SensorReading.timestamp.asc()).all()
-    
-    return [{
-        "timestamp": r.timestamp.isoformat(),
-        "value": r.value
-    } for r in readings]
+def get_timeseries(
+    sensor_type: str,
+    start: datetime.datetime | None = Query(None, alias="from"),
+    end: datetime.datetime | None = Query(None, alias="to"),
+    resolution: str = "auto",
+    points: int | None = None,
+    db: Session = Depends(get_db)
+):
+    """Historical data for charts (default: last 24h), from raw rows or rollups, optionally LTTB-downsampled"""
+    end = end or datetime.datetime.utcnow()
+    start = start or end - datetime.timedelta(hours=24)
+    try:
+        result = series(db, sensor_type.upper(), start, end, resolution=resolution, points=points)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return result["points"]
 
 @app.get("/api/users/{user_id}/stats")
 def get_user_stats(user_id: int, db: Session = Depends(get_db)):
@@ -913,19 +1129,28 @@ def get_city_feed():
 
 # --- ADMIN SYSTEM ---
 @app.get("/api/admin/users")
-def admin_get_users(db: Session = Depends(get_db)):
-    """Admin: List all registered users"""
-    users = db.query(User).all()
-    return [
-        {
-            "id": u.id,
-            "email": u.email,
-            "username": u.username,
-            "created_at": u.created_at,
-            "reports_count": db.query(CitizenReport).filter(CitizenReport.user_id == u.id).count(),
-            "actions_count": db.query(ActivityLog).filter(ActivityLog.user_id == u.id).count()
-        } for u in users
-    ]
+def admin_get_users(response: Response, limit: int = 50, cursor: str | None = None, sort: str = "id",
+                    db: Session = Depends(get_db)):
+    """Admin: List registered users, one keyset page at a time (next page cursor in X-Next-Cursor)"""
+    try:
+        rows, next_cursor = users_page(db, limit=limit, cursor=cursor, sort=sort)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+@app.get("/api/admin/users/export")
+def admin_export_users(format: str = "ndjson"):
+    """Admin: Stream every user (id order) as NDJSON or CSV"""
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    return StreamingResponse(
+        export_users(SessionLocal, fmt=format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'}
+    )
 
 @app.get("/api/admin/logs")
 def admin_get_logs(db: Session = Depends(get_db)):
@@ -941,10 +1166,23 @@ def admin_get_logs(db: Session = Depends(get_db)):
         } for l in logs
     ]
 
+@app.get("/api/admin/logs/writer")
+def admin_log_writer_stats():
+    """Admin: Activity log writer queue depth and drop counters"""
+    return get_activity_writer().stats()
+
 @app.get("/api/health")
 def health_check():
     return {"status": "ok"}
 
+@app.get("/api/ready")
+def readiness_check():
+    """Readiness probe: 503 until every AI component is built (failed ones are retried with backoff)"""
+    snapshot = get_warmup().snapshot()
+    if not snapshot["ready"]:
+        return JSONResponse(status_code=503, content=snapshot)
+    return snapshot
+
 # ============================================
 # MESSENGER / SOCIAL NETWORK API
 # ============================================
@@ -973,64 +1211,8 @@ class AddContactRequest(BaseModel):
 
 @app.get("/api/messenger/chats")
 def get_user_chats(user_id: int, db: Session = Depends(get_db)):
-    """Get all chats for a user"""
-    memberships = db.query(ChatMember).filter(ChatMember.user_id == user_id).all()
-    chats = []
-    
-    for membership in memberships:
-        chat = db.query(Chat).filter(Chat.id == membership.chat_id).first()
-        if not chat:
-            continue
-            
-        # Get last message
-        last_message = db.query(Message).filter(
-            Message.chat_id == chat.id
-        ).order_by(Message.created_at.desc()).first()
-        
-        # Get unread count
-        unread_count = db.query(Message).filter(
-            Message.chat_id == chat.id,
-            Message.id > (membership.last_read_message_id or 0)
-        ).count()
-        
-        # Get other members for chat name (if PRIVATE)
-        chat_name = chat.name
-        chat_avatar = chat.avatar_url
-        if chat.type == "PRIVATE":
-            other_member = db.query(ChatMember).filter(
-                ChatMember.chat_id == chat.id,
-                ChatMember.user_id != user_id
-            ).first()
-            if other_member:
-                other_user = db.query(User).filter(User.id == other_member.user_id).first()
-                if other_user:
-                    chat_name = other_user.username
-                    profile = db.query(UserProfile).filter(UserProfile.user_id == other_user.id).first()
-                    if profile:
-                        chat_avatar = profile.avatar_url
-        
-        # Get member count
-        member_count = db.query(ChatMember).filter(ChatMember.chat_id == chat.id).count()
-        
-        chats.append({
-            "id": chat.id,
-            "type": chat.type,
-            "name": chat_name or f"Chat {chat.id}",
-            "avatar_url": chat_avatar,
-            "description": chat.description,
-            "member_count": member_count,
-            "unread_count": unread_count,
-            "last_message": {
-                "content": last_message.content if last_message else None,
-                "sender_id": last_message.sender_id if last_message else None,
-                "created_at": last_message.created_at.isoformat() if last_message else None
-            } if last_message else None,
-            "created_at": chat.created_at.isoformat()
-        })
-    
-    # Sort by last message time
-    chats.sort(key=lambda x: x["last_message"]["created_at"] if x["last_message"] else "", reverse=True)
-    return chats
+    """Get all chats for a user (single aggregate query, most recent first)"""
+    return chat_list(db, user_id)
 
 @app.post("/api/messenger/chats")
 def create_chat(request: CreateChatRequest, db: Session = Depends(get_db)):
@@ -1069,36 +1251,24 @@ def create_chat(request: CreateChatRequest, db: Session = Depends(get_db)):
         message_type="SYSTEM"
     )
     db.add(system_msg)
+    db.flush()
+    record_message(db, chat.id, system_msg.sender_id, system_msg.id)
     db.commit()
+    get_messenger_hub().publish_chat_created(chat.id, request.member_ids)
     
     return {"id": chat.id, "status": "created"}
 
 @app.get("/api/messenger/chats/{chat_id}/messages")
-def get_chat_messages(chat_id: int, limit: int = 50, offset: int = 0, db: Session = Depends(get_db)):
-    """Get messages in a chat"""
-    messages = db.query(Message).filter(
-        Message.chat_id == chat_id
-    ).order_by(Message.created_at.desc()).offset(offset).limit(limit).all()
-    
-    result = []
-    for msg in reversed(messages):  # Reverse to get chronological order
-        sender = db.query(User).filter(User.id == msg.sender_id).first()
-        sender_profile = db.query(UserProfile).filter(UserProfile.user_id == msg.sender_id).first()
-        
-        result.append({
-            "id": msg.id,
-            "chat_id": msg.chat_id,
-            "sender_id": msg.sender_id,
-            "sender_name": sender.username if sender else "Unknown",
-            "sender_avatar": sender_profile.avatar_url if sender_profile else None,
-            "content": msg.content,
-            "message_type": msg.message_type,
-            "reply_to": msg.reply_to,
-            "is_edited": msg.is_edited,
-            "created_at": msg.created_at.isoformat()
-        })
-    
-    return result
+def get_chat_messages(
+    chat_id: int,
+    limit: int = 50,
+    offset: int = 0,
+    before_id: int | None = None,
+    after_id: int | None = None,
+    db: Session = Depends(get_db)
+):
+    """Get messages in a chat. Pass `after_id` to poll for new messages, `before_id` to page back."""
+    return chat_messages(db, chat_id, limit=limit, before_id=before_id, after_id=after_id, offset=offset)
 
 @app.post("/api/messenger/chats/{chat_id}/messages")
 def send_message(chat_id: int, request: SendMessageRequest, db: Session = Depends(get_db)):
@@ -1125,12 +1295,14 @@ def send_message(chat_id: int, request: SendMessageRequest, db: Session = Depend
         reply_to=request.reply_to
     )
     db.add(message)
-    db.commit()
-    db.refresh(message)
+    db.flush()
     
-    # Update sender's last read
-    membership.last_read_message_id = message.id
+    # Bump other members' unread counters and the sender's read marker in the same transaction
+    record_message(db, chat_id, request.sender_id, message.id)
     db.commit()
+    db.refresh(message)
+    # Push to connected members in the same shape as GET .../messages
+    get_messenger_hub().publish_message(chat_id, chat_messages(db, chat_id, limit=1, before_id=message.id + 1)[0])
     
     sender = db.query(User).filter(User.id == request.sender_id).first()
     
@@ -1147,21 +1319,10 @@ def send_message(chat_id: int, request: SendMessageRequest, db: Session = Depend
 @app.put("/api/messenger/chats/{chat_id}/read")
 def mark_chat_read(chat_id: int, user_id: int, db: Session = Depends(get_db)):
     """Mark all messages in a chat as read for a user"""
-    membership = db.query(ChatMember).filter(
-        ChatMember.chat_id == chat_id,
-        ChatMember.user_id == user_id
-    ).first()
-    
-    if not membership:
+    if not mark_read(db, chat_id, user_id):
         raise HTTPException(status_code=404, detail="Membership not found")
-    
-    last_message = db.query(Message).filter(
-        Message.chat_id == chat_id
-    ).order_by(Message.created_at.desc()).first()
-    
-    if last_message:
-        membership.last_read_message_id = last_message.id
-        db.commit()
+    db.commit()
+    get_messenger_hub().publish_read(chat_id, user_id)
     
     return {"status": "read"}
 
@@ -1169,6 +1330,7 @@ def mark_chat_read(chat_id: int, user_id: int, db: Session = Depends(get_db)):
 def get_contacts(user_id: int, db: Session = Depends(get_db)):
     """Get user's contacts"""
     contacts = db.query(Contact).filter(Contact.user_id == user_id).all()
+    presence = get_presence()
     result = []
     
     for contact in contacts:
@@ -1176,14 +1338,15 @@ def get_contacts(user_id: int, db: Session = Depends(get_db)):
         profile = db.query(UserProfile).filter(UserProfile.user_id == contact.contact_id).first()
         
         if user:
+            is_online, last_seen = presence.status(user.id, profile)
             result.append({
                 "id": contact.id,
                 "user_id": user.id,
                 "username": user.username,
                 "nickname": contact.nickname,
                 "avatar_url": profile.avatar_url if profile else None,
-                "is_online": profile.is_online if profile else False,
-                "last_seen": profile.last_seen.isoformat() if profile and profile.last_seen else None
+                "is_online": is_online,
+                "last_seen": last_seen.isoformat() if last_seen else None
             })
     
     return result
@@ -1213,24 +1376,34 @@ def add_contact(request: AddContactRequest, db: Session = Depends(get_db)):
 
 @app.get("/api/messenger/users/search")
 def search_users(query: str, limit: int = 20, db: Session = Depends(get_db)):
-    """Search for users by username or email"""
-    users = db.query(User).filter(
-        (User.username.ilike(f"%{query}%")) | (User.email.ilike(f"%{query}%"))
-    ).limit(limit).all()
-    
-    result = []
-    for user in users:
-        profile = db.query(UserProfile).filter(UserProfile.user_id == user.id).first()
-        result.append({
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "avatar_url": profile.avatar_url if profile else None,
-            "bio": profile.bio if profile else None,
-            "is_online": profile.is_online if profile else False
-        })
-    
-    return result
+    """Search users by username, email or bio prefix (FTS5, best match first)"""
+    presence = get_presence()
+    return [{
+        "id": row.id,
+        "username": row.username,
+        "email": row.email,
+        "avatar_url": row.avatar_url,
+        "bio": row.bio,
+        "is_online": presence.status(row.id, row)[0]
+    } for row in messenger_search.search_users(db, query, limit)]
+
+@app.get("/api/messenger/chats/{chat_id}/search")
+def search_chat_messages(chat_id: int, user_id: int, query: str, limit: int = 20,
+                         before_id: int | None = None, db: Session = Depends(get_db)):
+    """Search messages in one chat, newest first; pass the last id as `before_id` for the next page"""
+    is_member = db.query(ChatMember.id).filter(
+        ChatMember.chat_id == chat_id,
+        ChatMember.user_id == user_id
+    ).first()
+    if not is_member:
+        raise HTTPException(status_code=403, detail="User is not a member of this chat")
+    return messenger_search.search_messages(db, user_id, query, chat_id=chat_id, limit=limit, before_id=before_id)
+
+@app.get("/api/messenger/search")
+def search_all_messages(user_id: int, query: str, limit: int = 20,
+                        before_id: int | None = None, db: Session = Depends(get_db)):
+    """Search messages across every chat the user is a member of"""
+    return messenger_search.search_messages(db, user_id, query, limit=limit, before_id=before_id)
 
 @app.get("/api/messenger/profile/{user_id}")
 def get_profile(user_id: int, db: Session = Depends(get_db)):
@@ -1240,6 +1413,7 @@ def get_profile(user_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="User not found")
     
     profile = db.query(UserProfile).filter(UserProfile.user_id == user_id).first()
+    is_online, last_seen = get_presence().status(user_id, profile)
     
     return {
         "id": user.id,
@@ -1248,8 +1422,8 @@ def get_profile(user_id: int, db: Session = Depends(get_db)):
         "bio": profile.bio if profile else "",
         "avatar_url": profile.avatar_url if profile else None,
         "phone": profile.phone if profile else None,
-        "is_online": profile.is_online if profile else False,
-        "last_seen": profile.last_seen.isoformat() if profile and profile.last_seen else None,
+        "is_online": is_online,
+        "last_seen": last_seen.isoformat() if last_seen else None,
         "created_at": user.created_at.isoformat()
     }
 
@@ -1273,24 +1447,15 @@ def update_profile(user_id: int, request: UpdateProfileRequest, db: Session = De
     if request.phone is not None:
         profile.phone = request.phone
     
-    profile.last_seen = datetime.datetime.utcnow()
     db.commit()
+    get_presence().touch(user_id)
     
     return {"status": "updated"}
 
 @app.put("/api/messenger/online/{user_id}")
-def update_online_status(user_id: int, is_online: bool = True, db: Session = Depends(get_db)):
-    """Update user online status"""
-    profile = db.query(UserProfile).filter(UserProfile.user_id == user_id).first()
-    
-    if not profile:
-        profile = UserProfile(user_id=user_id, is_online=is_online)
-        db.add(profile)
-    else:
-        profile.is_online = is_online
-        profile.last_seen = datetime.datetime.utcnow()
-    
-    db.commit()
+def update_online_status(user_id: int, is_online: bool = True):
+    """Update user online status (in memory; flushed to user_profiles in batches)"""
+    get_presence().touch(user_id, is_online)
     return {"status": "updated", "is_online": is_online}
 
 @app.post("/api/messenger/upload")
@@ -0,0 +1,373 @@
+"""
+Viewport-bounded map queries for citizen reports and emergency incidents.
+
+- Every row carries a `quadkey`: its Web-Mercator tile path at QUADKEY_ZOOM.
+  The tile at any coarser zoom z is the first z characters, so "rows in tile"
+  is an indexed range scan (prefix <= quadkey < prefix + "4") and clustering
+  at zoom z is a GROUP BY on a quadkey prefix; no per-zoom tables to maintain
+- The column is kept current by ORM hooks on insert/update and backfilled at
+  startup for rows written another way
+- Below CLUSTER_MAX_ZOOM a tile is served as clusters (count + centroid per
+  1/2**CLUSTER_DEPTH sub-tile, singletons as the row itself); from it on, as
+  raw points. Tiles are cached per (layer, tile); a commit touching a row
+  drops just the tiles on its quadkey path, and TILE_TTL_SECONDS bounds the
+  staleness from writes that bypass the ORM or come from other processes
+- Point listings use keyset pagination on id, so a page costs the same
+  wherever it starts
+- Merged duplicate reports are hidden; their cluster head stands in with a
+  report_count
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, event, func, inspect, or_, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from database import CitizenReport, EmergencyIncident
+
+
+QUADKEY_ZOOM = 18
+CLUSTER_DEPTH = 3          # 8 x 8 cluster cells per tile
+CLUSTER_MAX_ZOOM = QUADKEY_ZOOM - CLUSTER_DEPTH + 1
+MAX_BBOX_TILES = 36
+MAX_PAGE_SIZE = 500
+MAX_TILE_POINTS = 2000
+TILE_CACHE_SIZE = 4096
+TILE_TTL_SECONDS = 60.0
+MAX_LAT = 85.05112878
+
+BBox = Tuple[float, float, float, float]  # (min_lng, min_lat, max_lng, max_lat)
+
+
+# -- tile math ---------------------------------------------------------------
+
+def tile_xy(lat: float, lng: float, zoom: int) -> Tuple[int, int]:
+    lat = min(max(lat, -MAX_LAT), MAX_LAT)
+    n = 1 << zoom
+    x = int((lng + 180.0) / 360.0 * n)
+    rad = math.radians(lat)
+    y = int((1.0 - math.log(math.tan(rad) + 1.0 / math.cos(rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_quadkey(zoom: int, x: int, y: int) -> str:
+    digits = []
+    for z in range(zoom, 0, -1):
+        mask = 1 << (z - 1)
+        digits.append(str((1 if x & mask else 0) + (2 if y & mask else 0)))
+    return "".join(digits)
+
+
+def quadkey(lat: float, lng: float, zoom: int = QUADKEY_ZOOM) -> str:
+    return tile_quadkey(zoom, *tile_xy(lat, lng, zoom))
+
+
+def tile_bounds(zoom: int, x: int, y: int) -> BBox:
+    n = 1 << zoom
+
+    def lat_of(ty: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * ty / n))))
+
+    return x / n * 360.0 - 180.0, lat_of(y + 1), (x + 1) / n * 360.0 - 180.0, lat_of(y)
+
+
+def _tile_span(bbox: BBox, zoom: int) -> Tuple[int, int, int, int]:
+    min_lng, min_lat, max_lng, max_lat = bbox
+    x0, y0 = tile_xy(max_lat, min_lng, zoom)
+    x1, y1 = tile_xy(min_lat, max_lng, zoom)
+    return x0, y0, x1, y1
+
+
+def tile_count(bbox: BBox, zoom: int) -> int:
+    x0, y0, x1, y1 = _tile_span(bbox, zoom)
+    return (x1 - x0 + 1) * (y1 - y0 + 1)
+
+
+def covering_tiles(bbox: BBox, zoom: int) -> List[Tuple[int, int]]:
+    x0, y0, x1, y1 = _tile_span(bbox, zoom)
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def parse_bbox(value: str) -> BBox:
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(v) for v in value.split(","))
+    except ValueError:
+        raise ValueError("bbox must be min_lng,min_lat,max_lng,max_lat")
+    if min_lng > max_lng or min_lat > max_lat:
+        raise ValueError("bbox min must not exceed max")
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def _in_bbox(item: Dict, bbox: BBox) -> bool:
+    return bbox[0] <= item["lng"] <= bbox[2] and bbox[1] <= item["lat"] <= bbox[3]
+
+
+# -- layers ------------------------------------------------------------------
+
+def _iso(value) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def report_item(r: CitizenReport) -> Dict:
+    return {
+        "id": r.id,
+        "category": r.category,
+        "description": r.description,
+        "lat": r.lat,
+        "lng": r.lng,
+        "status": r.status,
+        "ai_analysis": r.ai_analysis,
+        "created_at": _iso(r.created_at),
+        "report_count": r.report_count,
+        "severity": r.severity,
+    }
+
+
+def incident_item(inc: EmergencyIncident) -> Dict:
+    return {
+        "id": inc.id,
+        "type": inc.type,
+        "description": inc.description,
+        "lat": inc.lat,
+        "lng": inc.lng,
+        "severity": inc.severity,
+        "status": inc.status,
+        "reported_at": _iso(inc.reported_at),
+        "assigned_units": inc.assigned_units.split(",") if inc.assigned_units else [],
+    }
+
+
+@dataclass(frozen=True)
+class Layer:
+    name: str
+    model: type
+    serialize: Callable[[object], Dict]
+    visible: Optional[ColumnElement] = None  # rows shown on the map / in listings
+
+
+LAYERS = {
+    # Merged duplicates are represented by their cluster head (report_dedup).
+    "reports": Layer("reports", CitizenReport, report_item, CitizenReport.duplicate_of.is_(None)),
+    "incidents": Layer("incidents", EmergencyIncident, incident_item),
+}
+
+
+def _layer(name: str) -> Layer:
+    layer = LAYERS.get(name)
+    if layer is None:
+        raise ValueError(f"layer must be one of {tuple(LAYERS)}")
+    return layer
+
+
+def _prefix_range(column, prefix: str):
+    return and_(column >= prefix, column < prefix + "4")
+
+
+# -- queries -----------------------------------------------------------------
+
+def build_tile(db: Session, layer_name: str, zoom: int, x: int, y: int) -> Dict:
+    """Clusters and points of one tile (points only from CLUSTER_MAX_ZOOM on)."""
+    layer = _layer(layer_name)
+    model = layer.model
+    prefix = tile_quadkey(zoom, x, y)
+    in_tile = _prefix_range(model.quadkey, prefix)
+    if layer.visible is not None:
+        in_tile = and_(in_tile, layer.visible)
+    clusters: List[Dict] = []
+    point_ids: List[int] = []
+    if zoom < CLUSTER_MAX_ZOOM:
+        cell = func.substr(model.quadkey, 1, zoom + CLUSTER_DEPTH)
+        for row in db.execute(
+            select(cell.label("cell"), func.count().label("n"), func.avg(model.lat).label("lat"),
+                   func.avg(model.lng).label("lng"), func.min(model.id).label("first_id"))
+            .where(in_tile).group_by(cell).order_by(cell)
+        ):
+            if row.n == 1:
+                point_ids.append(row.first_id)
+            else:
+                clusters.append({"quadkey": row.cell, "count": row.n, "lat": row.lat, "lng": row.lng})
+        rows = db.execute(select(model).where(model.id.in_(point_ids)).order_by(model.id)).scalars() if point_ids else []
+    else:
+        rows = db.execute(select(model).where(in_tile).order_by(model.id).limit(MAX_TILE_POINTS)).scalars()
+    return {
+        "layer": layer.name,
+        "z": zoom, "x": x, "y": y,
+        "quadkey": prefix,
+        "clusters": clusters,
+        "points": [layer.serialize(r) for r in rows],
+    }
+
+
+def points_page(db: Session, layer_name: str, limit: int = MAX_PAGE_SIZE, cursor: Optional[str] = None,
+                bbox: Optional[BBox] = None) -> Tuple[List[Dict], Optional[str]]:
+    """Rows in id order (optionally inside bbox), plus the next-page cursor (None at the end)."""
+    layer = _layer(layer_name)
+    model = layer.model
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    stmt = select(model).order_by(model.id).limit(limit + 1)
+    if layer.visible is not None:
+        stmt = stmt.where(layer.visible)
+    if cursor:
+        try:
+            stmt = stmt.where(model.id > int(cursor))
+        except ValueError:
+            raise ValueError(f"Invalid cursor {cursor!r}")
+    if bbox is not None:
+        min_lng, min_lat, max_lng, max_lat = bbox
+        # Deepest zoom at which a handful of tiles covers the box, for the quadkey range scan.
+        zoom = 0
+        while zoom < QUADKEY_ZOOM and tile_count(bbox, zoom + 1) <= 4:
+            zoom += 1
+        stmt = stmt.where(
+            or_(*[_prefix_range(model.quadkey, tile_quadkey(zoom, x, y)) for x, y in covering_tiles(bbox, zoom)]),
+            model.lat.between(min_lat, max_lat),
+            model.lng.between(min_lng, max_lng),
+        )
+    rows = list(db.execute(stmt).scalars())
+    next_cursor = str(rows[limit - 1].id) if len(rows) > limit else None
+    return [layer.serialize(r) for r in rows[:limit]], next_cursor
+
+
+# -- tile cache --------------------------------------------------------------
+
+class TileCache:
+    def __init__(self, max_tiles: int = TILE_CACHE_SIZE, ttl: float = TILE_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_tiles = max_tiles
+        self.ttl = ttl
+        self.clock = clock
+        self._tiles: "OrderedDict[Tuple[str, str], Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def tile(self, db: Session, layer: str, zoom: int, x: int, y: int) -> Dict:
+        key = (layer, tile_quadkey(zoom, x, y))
+        now = self.clock()
+        with self._lock:
+            cached = self._tiles.get(key)
+            if cached is not None and now - cached[0] < self.ttl:
+                self._tiles.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+        payload = build_tile(db, layer, zoom, x, y)
+        with self._lock:
+            self.misses += 1
+            self._tiles[key] = (now, payload)
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+        return payload
+
+    def viewport(self, db: Session, layer: str, bbox: BBox, zoom: int) -> Dict:
+        """Clusters and points of every cached tile covering bbox, trimmed to bbox."""
+        count = tile_count(bbox, zoom)
+        if count > MAX_BBOX_TILES:
+            raise ValueError(f"bbox spans {count} tiles at zoom {zoom}; zoom in or shrink it")
+        tiles = covering_tiles(bbox, zoom)
+        clusters: List[Dict] = []
+        points: List[Dict] = []
+        for x, y in tiles:
+            payload = self.tile(db, layer, zoom, x, y)
+            clusters += [c for c in payload["clusters"] if _in_bbox(c, bbox)]
+            points += [p for p in payload["points"] if _in_bbox(p, bbox)]
+        return {"layer": layer, "zoom": zoom, "tiles": count, "clusters": clusters, "points": points}
+
+    def invalidate(self, layer: str, key: Optional[str]) -> None:
+        """Drop the tiles on `key`'s path (every zoom), or the whole layer when the key is unknown."""
+        with self._lock:
+            if key is None:
+                for k in [k for k in self._tiles if k[0] == layer]:
+                    del self._tiles[k]
+                return
+            for z in range(len(key) + 1):
+                self._tiles.pop((layer, key[:z]), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tiles.clear()
+
+    def stats(self) -> Dict:
+        return {"tiles": len(self._tiles), "hits": self.hits, "misses": self.misses}
+
+
+@lru_cache(maxsize=1)
+def get_tile_cache() -> TileCache:
+    return TileCache()
+
+
+# -- index maintenance -------------------------------------------------------
+
+_PENDING = "map_tiles.pending_invalidations"
+
+
+def _stamp(mapper, connection, target) -> None:
+    key = quadkey(target.lat, target.lng) if target.lat is not None and target.lng is not None else None
+    state = inspect(target)
+    old = state.attrs.quadkey.loaded_value if state.persistent else None
+    target.quadkey = key
+    session = state.session
+    if session is not None:
+        pending = session.info.setdefault(_PENDING, set())
+        layer = next(name for name, layer in LAYERS.items() if isinstance(target, layer.model))
+        pending.add((layer, key))
+        if isinstance(old, str) and old != key:
+            pending.add((layer, old))
+
+
+def _deleted(mapper, connection, target) -> None:
+    session = inspect(target).session
+    if session is not None:
+        layer = next(name for name, layer in LAYERS.items() if isinstance(target, layer.model))
+        session.info.setdefault(_PENDING, set()).add((layer, target.quadkey))
+
+
+def _after_commit(session: Session) -> None:
+    pending = session.info.pop(_PENDING, None)
+    if pending:
+        cache = get_tile_cache()
+        for layer, key in pending:
+            cache.invalidate(layer, key)
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+for _layer_def in LAYERS.values():
+    event.listen(_layer_def.model, "before_insert", _stamp)
+    event.listen(_layer_def.model, "before_update", _stamp)
+    event.listen(_layer_def.model, "after_delete", _deleted)
+event.listen(Session, "after_commit", _after_commit)
+event.listen(Session, "after_rollback", _after_rollback)
+
+
+def backfill_quadkeys(db: Session, batch_size: int = 1000) -> int:
+    """Fill quadkey for rows inserted without the ORM hooks. Returns rows updated."""
+    total = 0
+    for layer in LAYERS.values():
+        model = layer.model
+        while True:
+            rows = db.execute(
+                select(model.id, model.lat, model.lng)
+                .where(model.quadkey.is_(None), model.lat.isnot(None), model.lng.isnot(None))
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            db.execute(update(model), [{"id": r.id, "quadkey": quadkey(r.lat, r.lng)} for r in rows])
+            db.commit()
+            total += len(rows)
+    if total:
+        get_tile_cache().clear()
+    return total
+
@@ -0,0 +1,232 @@
+"""
+In-process pub/sub hub behind the /ws/messenger WebSocket.
+
+- Each connection subscribes to the chat topics of its user; `send_message`
+  publishes the new message there instead of clients polling every 2 s
+- Other members also get an unread delta, the reader's other tabs get the reset
+- Every connection has a bounded send queue drained by its own writer task;
+  a consumer that lets the queue fill up, or stalls a single send past
+  SEND_TIMEOUT_SECONDS, is disconnected rather than buffered without limit
+- Open sockets count as presence: connecting and pings are heartbeats, the
+  last socket of a user closing marks them offline
+- Publishing is thread-safe: sync endpoints run in the threadpool and hand
+  events to the event loop with call_soon_threadsafe
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from fastapi import APIRouter, WebSocket
+from starlette.concurrency import run_in_threadpool
+
+from presence import get_presence
+
+
+QUEUE_SIZE = 256
+SEND_TIMEOUT_SECONDS = 10.0
+SLOW_CONSUMER_CLOSE_CODE = 1013  # "try again later"
+
+messenger_ws_router = APIRouter(tags=["messenger"])
+
+
+@dataclass(eq=False)
+class Subscriber:
+    user_id: int
+    queue: asyncio.Queue
+    chat_ids: Set[int] = field(default_factory=set)
+    evicted: bool = False
+
+
+def _load_chat_ids(user_id: int) -> List[int]:
+    from database import ChatMember, SessionLocal
+
+    db = SessionLocal()
+    try:
+        return [row[0] for row in db.query(ChatMember.chat_id).filter(ChatMember.user_id == user_id)]
+    finally:
+        db.close()
+
+
+class MessengerHub:
+    def __init__(self, queue_size: int = QUEUE_SIZE, send_timeout: float = SEND_TIMEOUT_SECONDS,
+                 chat_loader: Callable[[int], List[int]] = _load_chat_ids) -> None:
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.chat_loader = chat_loader
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Only touched on the event loop thread.
+        self._topics: Dict[int, Set[Subscriber]] = {}
+        self._users: Dict[int, Set[Subscriber]] = {}
+        self.counters = {"published": 0, "delivered": 0, "evicted": 0}
+
+    # -- connection lifecycle (event loop thread) --------------------------
+
+    def connect(self, user_id: int, chat_ids: Iterable[int]) -> Subscriber:
+        self._loop = asyncio.get_running_loop()
+        sub = Subscriber(user_id=user_id, queue=asyncio.Queue(maxsize=self.queue_size))
+        self._users.setdefault(user_id, set()).add(sub)
+        for chat_id in chat_ids:
+            self._subscribe(sub, chat_id)
+        return sub
+
+    def disconnect(self, sub: Subscriber) -> None:
+        for chat_id in sub.chat_ids:
+            topic = self._topics.get(chat_id)
+            if topic is not None:
+                topic.discard(sub)
+                if not topic:
+                    del self._topics[chat_id]
+        sub.chat_ids.clear()
+        subs = self._users.get(sub.user_id)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._users[sub.user_id]
+
+    def is_connected(self, user_id: int) -> bool:
+        return bool(self._users.get(user_id))
+
+    def _subscribe(self, sub: Subscriber, chat_id: int) -> None:
+        sub.chat_ids.add(chat_id)
+        self._topics.setdefault(chat_id, set()).add(sub)
+
+    async def pump(self, sub: Subscriber, websocket: WebSocket) -> None:
+        """Drain `sub.queue` into the socket until evicted or the socket fails."""
+        while True:
+            event = await sub.queue.get()
+            if event is None:
+                await websocket.close(code=SLOW_CONSUMER_CLOSE_CODE, reason="slow consumer")
+                return
+            try:
+                await asyncio.wait_for(websocket.send_text(event), self.send_timeout)
+            except asyncio.TimeoutError:
+                self._evict(sub)
+                await websocket.close(code=SLOW_CONSUMER_CLOSE_CODE, reason="slow consumer")
+                return
+
+    # -- delivery (event loop thread) --------------------------------------
+
+    def _offer(self, sub: Subscriber, payload: str) -> None:
+        if sub.evicted:
+            return
+        try:
+            sub.queue.put_nowait(payload)
+            self.counters["delivered"] += 1
+        except asyncio.QueueFull:
+            self._evict(sub)
+
+    def _evict(self, sub: Subscriber) -> None:
+        if sub.evicted:
+            return
+        sub.evicted = True
+        self.counters["evicted"] += 1
+        self.disconnect(sub)
+        # Drop the backlog and leave the writer a close sentinel.
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        sub.queue.put_nowait(None)
+        print(f"[MessengerHub] Disconnected slow consumer user={sub.user_id}")
+
+    def _deliver_message(self, chat_id: int, message: Dict) -> None:
+        self.counters["published"] += 1
+        payload = json.dumps({"type": "message", "chat_id": chat_id, "message": message})
+        unread = json.dumps({"type": "unread", "chat_id": chat_id, "delta": 1})
+        for sub in list(self._topics.get(chat_id, ())):
+            self._offer(sub, payload)
+            if sub.user_id != message.get("sender_id"):
+                self._offer(sub, unread)
+
+    def _deliver_read(self, chat_id: int, user_id: int) -> None:
+        self.counters["published"] += 1
+        payload = json.dumps({"type": "unread", "chat_id": chat_id, "unread_count": 0})
+        for sub in list(self._users.get(user_id, ())):
+            self._offer(sub, payload)
+
+    def _deliver_chat_created(self, chat_id: int, member_ids: List[int]) -> None:
+        self.counters["published"] += 1
+        payload = json.dumps({"type": "chat_created", "chat_id": chat_id})
+        for user_id in member_ids:
+            for sub in list(self._users.get(user_id, ())):
+                self._subscribe(sub, chat_id)
+                self._offer(sub, payload)
+
+    # -- publishing (any thread) -------------------------------------------
+
+    def _dispatch(self, fn: Callable, *args) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return  # nobody has ever connected
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            fn(*args)
+        else:
+            loop.call_soon_threadsafe(fn, *args)
+
+    def publish_message(self, chat_id: int, message: Dict) -> None:
+        self._dispatch(self._deliver_message, chat_id, message)
+
+    def publish_read(self, chat_id: int, user_id: int) -> None:
+        self._dispatch(self._deliver_read, chat_id, user_id)
+
+    def publish_chat_created(self, chat_id: int, member_ids: Iterable[int]) -> None:
+        self._dispatch(self._deliver_chat_created, chat_id, list(member_ids))
+
+    def stats(self) -> Dict:
+        return {
+            "connections": sum(len(s) for s in self._users.values()),
+            "users": len(self._users),
+            "topics": len(self._topics),
+            **self.counters,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_messenger_hub() -> MessengerHub:
+    return MessengerHub()
+
+
+@messenger_ws_router.websocket("/ws/messenger")
+async def messenger_socket(websocket: WebSocket, user_id: int):
+    hub = get_messenger_hub()
+    chat_ids = await run_in_threadpool(hub.chat_loader, user_id)
+    await websocket.accept()
+    sub = hub.connect(user_id, chat_ids)
+    presence = get_presence()
+    presence.touch(user_id)
+
+    async def read() -> None:
+        # Clients only send keep-alive pings; anything else is ignored.
+        while True:
+            text = await websocket.receive_text()
+            if text == "ping":
+                presence.touch(user_id)
+                hub._offer(sub, json.dumps({"type": "pong"}))
+
+    reader = asyncio.create_task(read())
+    writer = asyncio.create_task(hub.pump(sub, websocket))
+    try:
+        await asyncio.wait({reader, writer}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        hub.disconnect(sub)
+        if not hub.is_connected(user_id):
+            presence.touch(user_id, is_online=False)
+        for task in (reader, writer):
+            task.cancel()
+        for task in (reader, writer):
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+
+@messenger_ws_router.get("/api/messenger/hub/stats")
+async def messenger_hub_stats():
+    return get_messenger_hub().stats()
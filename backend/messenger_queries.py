@@ -0,0 +1,234 @@
+"""
+Aggregate SQL queries for the messenger API.
+
+The chat list used to run five or six queries per chat in a Python loop;
+here it is one statement with correlated subqueries over indexed columns
+(messages(chat_id, id), chat_members(chat_id, user_id)).
+
+Unread counts are materialized in chat_members.unread_count: sending a
+message bumps every other member's counter and reading resets it, both in
+the caller's transaction, so the chat list reads them without counting
+messages. `recount_unread` rebuilds the counters from last_read_message_id.
+
+Message pages are keyset-paginated on messages(chat_id, id) and join the
+sender name and avatar in the same statement instead of two lookups per row.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.orm import Session, aliased
+
+from database import Chat, ChatMember, Message, User, UserProfile
+
+
+def chat_list(db: Session, user_id: int) -> List[Dict]:
+    """All chats of `user_id`, most recent activity first, in the /api/messenger/chats shape."""
+    me = aliased(ChatMember)
+    other = aliased(ChatMember)
+    everyone = aliased(ChatMember)
+    last = aliased(Message)
+    peer = aliased(User)
+    peer_profile = aliased(UserProfile)
+
+    last_message_id = (
+        select(Message.id)
+        .where(Message.chat_id == Chat.id)
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(1)
+        .correlate(Chat)
+        .scalar_subquery()
+    )
+    member_count = (
+        select(func.count(everyone.id))
+        .where(everyone.chat_id == Chat.id)
+        .correlate(Chat)
+        .scalar_subquery()
+    )
+    peer_id = (
+        select(other.user_id)
+        .where(other.chat_id == Chat.id, other.user_id != user_id)
+        .order_by(other.id)
+        .limit(1)
+        .correlate(Chat)
+        .scalar_subquery()
+    )
+
+    stmt = (
+        select(
+            Chat.id,
+            Chat.type,
+            Chat.name,
+            Chat.description,
+            Chat.avatar_url,
+            Chat.created_at,
+            last.content,
+            last.sender_id,
+            last.created_at.label("last_created_at"),
+            me.unread_count,
+            member_count.label("member_count"),
+            peer.id.label("peer_id"),
+            peer.username.label("peer_username"),
+            peer_profile.id.label("peer_profile_id"),
+            peer_profile.avatar_url.label("peer_avatar_url"),
+        )
+        .select_from(me)
+        .join(Chat, Chat.id == me.chat_id)
+        .outerjoin(last, last.id == last_message_id)
+        .outerjoin(peer, and_(Chat.type == "PRIVATE", peer.id == peer_id))
+        .outerjoin(peer_profile, peer_profile.user_id == peer.id)
+        .where(me.user_id == user_id)
+        .order_by(last.created_at.is_(None), last.created_at.desc(), me.id)
+    )
+
+    chats = []
+    for row in db.execute(stmt):
+        chat_name = row.name
+        chat_avatar = row.avatar_url
+        if row.peer_id is not None:
+            chat_name = row.peer_username
+            if row.peer_profile_id is not None:
+                chat_avatar = row.peer_avatar_url
+
+        chats.append({
+            "id": row.id,
+            "type": row.type,
+            "name": chat_name or f"Chat {row.id}",
+            "avatar_url": chat_avatar,
+            "description": row.description,
+            "member_count": row.member_count,
+            "unread_count": row.unread_count,
+            "last_message": {
+                "content": row.content,
+                "sender_id": row.sender_id,
+                "created_at": row.last_created_at.isoformat()
+            } if row.last_created_at is not None else None,
+            "created_at": row.created_at.isoformat()
+        })
+    return chats
+
+
+def record_message(db: Session, chat_id: int, sender_id: int, message_id: int) -> None:
+    """Account for a new message: the sender has read up to it, everyone else gains one unread."""
+    db.execute(
+        update(ChatMember)
+        .where(ChatMember.chat_id == chat_id, ChatMember.user_id != sender_id)
+        .values(unread_count=ChatMember.unread_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        update(ChatMember)
+        .where(ChatMember.chat_id == chat_id, ChatMember.user_id == sender_id)
+        .values(last_read_message_id=message_id, unread_count=0)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def mark_read(db: Session, chat_id: int, user_id: int) -> bool:
+    """Move the member's read marker to the newest message. False if not a member."""
+    newest = select(func.max(Message.id)).where(Message.chat_id == chat_id).scalar_subquery()
+    result = db.execute(
+        update(ChatMember)
+        .where(ChatMember.chat_id == chat_id, ChatMember.user_id == user_id)
+        .values(last_read_message_id=func.coalesce(newest, ChatMember.last_read_message_id), unread_count=0)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount > 0
+
+
+def recount_unread(db: Session, chat_id: Optional[int] = None) -> int:
+    """Rebuild unread counters from last_read_message_id in one statement. Returns rows updated."""
+    counted = (
+        select(func.count(Message.id))
+        .where(Message.chat_id == ChatMember.chat_id,
+               Message.id > func.coalesce(ChatMember.last_read_message_id, 0))
+        .scalar_subquery()
+    )
+    stmt = update(ChatMember).values(unread_count=counted).execution_options(synchronize_session=False)
+    if chat_id is not None:
+        stmt = stmt.where(ChatMember.chat_id == chat_id)
+    return db.execute(stmt).rowcount
+
+
+MAX_PAGE_SIZE = 200
+
+
+def chat_messages(
+    db: Session,
+    chat_id: int,
+    limit: int = 50,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    offset: int = 0,
+) -> List[Dict]:
+    """One page of a chat in chronological order.
+
+    - `after_id`: the oldest `limit` messages newer than it ("since" mode for polling)
+    - `before_id`: the newest `limit` messages older than it (scrolling back)
+    - neither: the latest `limit` messages; `offset` is kept for old clients
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    stmt = (
+        select(
+            Message.id,
+            Message.chat_id,
+            Message.sender_id,
+            User.username,
+            UserProfile.avatar_url,
+            Message.content,
+            Message.message_type,
+            Message.reply_to,
+            Message.is_edited,
+            Message.created_at,
+        )
+        .outerjoin(User, User.id == Message.sender_id)
+        .outerjoin(UserProfile, UserProfile.user_id == Message.sender_id)
+        .where(Message.chat_id == chat_id)
+    )
+    if after_id is not None:
+        stmt = stmt.where(Message.id > after_id).order_by(Message.id.asc()).limit(limit)
+        rows = list(db.execute(stmt))
+    else:
+        if before_id is not None:
+            stmt = stmt.where(Message.id < before_id)
+        elif offset:
+            stmt = stmt.offset(offset)
+        rows = list(db.execute(stmt.order_by(Message.id.desc()).limit(limit)))
+        rows.reverse()
+
+    return [{
+        "id": row.id,
+        "chat_id": row.chat_id,
+        "sender_id": row.sender_id,
+        "sender_name": row.username or "Unknown",
+        "sender_avatar": row.avatar_url,
+        "content": row.content,
+        "message_type": row.message_type,
+        "reply_to": row.reply_to,
+        "is_edited": row.is_edited,
+        "created_at": row.created_at.isoformat()
+    } for row in rows]
+
+
+def main() -> None:
+    import argparse
+
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Rebuild materialized messenger unread counters")
+    parser.add_argument("--chat-id", type=int, default=None, help="Only this chat (default: all)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        updated = recount_unread(db, args.chat_id)
+        db.commit()
+        print(f"[Messenger] Recounted unread for {updated} memberships")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
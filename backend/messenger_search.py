@@ -0,0 +1,105 @@
+"""
+Full-text search for the messenger over the FTS5 tables from migration 5.
+
+- users_fts (username, email, bio): prefix queries ranked by bm25, username
+  weighted highest
+- messages_fts (content): newest matches first with keyset paging on
+  message id, restricted to chats the caller is a member of, with
+  <mark>-highlighted snippets
+- FTS5 marks matches with control-character sentinels; the snippet is
+  HTML-escaped before they become <mark> tags, so message content can never
+  inject markup
+- Only the last word of a message query is prefix-matched, so typing ahead
+  works without paying for prefix expansion on every word
+- User input is reduced to word tokens and quoted, so FTS5 syntax in the
+  query string can never cause a parse error
+"""
+
+from __future__ import annotations
+
+import html
+import re
+from typing import Dict, List, Optional
+
+from sqlalchemy import DateTime, text
+from sqlalchemy.orm import Session
+
+
+MAX_RESULTS = 100
+SNIPPET_TOKENS = 12
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_MARK_OPEN, _MARK_CLOSE = "\x02", "\x03"
+
+
+def fts_query(query: str, prefix_all: bool = True) -> str:
+    """'ali sm' -> '"ali"* "sm"*': every token must match, as a prefix.
+
+    With `prefix_all=False` only the last token is a prefix ('"ali" "sm"*'):
+    whole-word tokens stream their doclists in rowid order, prefix tokens
+    have to merge every matching term first, which matters on large tables.
+    """
+    tokens = _TOKEN_RE.findall(query.lower())
+    return " ".join(
+        f'"{token}"*' if prefix_all or i == len(tokens) - 1 else f'"{token}"'
+        for i, token in enumerate(tokens)
+    )
+
+
+def highlight(snippet: Optional[str]) -> str:
+    """HTML-escape an FTS5 snippet, then turn its match sentinels into <mark> tags."""
+    escaped = html.escape(snippet or "")
+    return escaped.replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
+
+
+def search_users(db: Session, query: str, limit: int = 20) -> List:
+    """Rows with id, username, email, avatar_url, bio, is_online, last_seen, best match first."""
+    match = fts_query(query)
+    if not match:
+        return []
+    return list(db.execute(text(
+        "SELECT u.id, u.username, u.email, p.avatar_url, p.bio, p.is_online, p.last_seen "
+        "FROM users_fts JOIN users u ON u.id = users_fts.rowid "
+        "LEFT JOIN user_profiles p ON p.user_id = u.id "
+        "WHERE users_fts MATCH :match "
+        "ORDER BY bm25(users_fts, 10.0, 2.0, 1.0) LIMIT :limit"
+    ).columns(last_seen=DateTime), {"match": match, "limit": max(1, min(limit, MAX_RESULTS))}))
+
+
+def search_messages(
+    db: Session,
+    user_id: int,
+    query: str,
+    chat_id: Optional[int] = None,
+    limit: int = 20,
+    before_id: Optional[int] = None,
+) -> List[Dict]:
+    """Messages matching `query` in chats `user_id` belongs to (or only `chat_id`), newest first."""
+    match = fts_query(query, prefix_all=False)
+    if not match:
+        return []
+    filters = ["messages_fts MATCH :match", "cm.user_id = :user_id"]
+    params = {"match": match, "user_id": user_id, "limit": max(1, min(limit, MAX_RESULTS))}
+    if chat_id is not None:
+        filters.append("m.chat_id = :chat_id")
+        params["chat_id"] = chat_id
+    if before_id is not None:
+        filters.append("messages_fts.rowid < :before_id")
+        params["before_id"] = before_id
+    rows = db.execute(text(
+        "SELECT m.id, m.chat_id, m.sender_id, u.username, m.created_at, "
+        f"snippet(messages_fts, 0, char(2), char(3), '…', {SNIPPET_TOKENS}) AS snippet "
+        "FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid "
+        "JOIN chat_members cm ON cm.chat_id = m.chat_id "
+        "LEFT JOIN users u ON u.id = m.sender_id "
+        f"WHERE {' AND '.join(filters)} "
+        "ORDER BY messages_fts.rowid DESC LIMIT :limit"
+    ).columns(created_at=DateTime), params)
+    return [{
+        "id": row.id,
+        "chat_id": row.chat_id,
+        "sender_id": row.sender_id,
+        "sender_name": row.username or "Unknown",
+        "snippet": highlight(row.snippet),
+        "created_at": row.created_at.isoformat()
+    } for row in rows]
@@ -0,0 +1,233 @@
+"""
+Lightweight versioned schema migrations for the SQLite database.
+
+`Base.metadata.create_all` only creates missing tables; it never adds indexes
+to tables that already exist. Each migration here is a numbered list of SQL
+statements applied once, in order, and recorded in `schema_migrations`.
+Statements must be idempotent (IF NOT EXISTS) because fresh databases may
+already have some of these objects from create_all. SQLite has no
+ADD COLUMN IF NOT EXISTS, so new columns are listed separately and only
+added when the table lacks them.
+"""
+
+from __future__ import annotations
+
+import datetime
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+
+def _users_fts_trigger(name: str, event: str, user_id: str) -> str:
+    """Trigger that re-indexes one user's row in users_fts from users + user_profiles."""
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN "
+        f"DELETE FROM users_fts WHERE rowid = {user_id}; "
+        "INSERT INTO users_fts (rowid, username, email, bio) "
+        "SELECT u.id, u.username, u.email, COALESCE(p.bio, '') FROM users u "
+        f"LEFT JOIN user_profiles p ON p.user_id = u.id WHERE u.id = {user_id}; END"
+    )
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    statements: Tuple[str, ...]
+    # (table, column, column DDL) added before the statements run
+    columns: Tuple[Tuple[str, str, str], ...] = ()
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        version=1,
+        description="unique (pattern, language) on ai_knowledge",
+        statements=(
+            "DELETE FROM ai_knowledge WHERE id NOT IN "
+            "(SELECT MIN(id) FROM ai_knowledge GROUP BY pattern, language)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_ai_knowledge_pattern_language "
+            "ON ai_knowledge (pattern, language)",
+        ),
+    ),
+    Migration(
+        version=2,
+        description="indexes on hot filter columns",
+        statements=(
+            "CREATE INDEX IF NOT EXISTS ix_sensor_readings_type_ts ON sensor_readings (sensor_type, timestamp)",
+            "CREATE INDEX IF NOT EXISTS ix_messages_chat_created ON messages (chat_id, created_at)",
+            "CREATE INDEX IF NOT EXISTS ix_chat_members_chat_user ON chat_members (chat_id, user_id)",
+            "CREATE INDEX IF NOT EXISTS ix_chat_members_user ON chat_members (user_id)",
+            "CREATE INDEX IF NOT EXISTS ix_activity_logs_user_ts ON activity_logs (user_id, timestamp)",
+            "CREATE INDEX IF NOT EXISTS ix_activity_logs_action ON activity_logs (action)",
+            "CREATE INDEX IF NOT EXISTS ix_contacts_user ON contacts (user_id)",
+            "CREATE INDEX IF NOT EXISTS ix_reports_user ON reports (user_id)",
+            # user_profiles(user_id) is already covered by its UNIQUE constraint index.
+            "ANALYZE",
+        ),
+    ),
+    Migration(
+        version=3,
+        description="messages (chat_id, id) for unread counts and keyset paging",
+        statements=(
+            "CREATE INDEX IF NOT EXISTS ix_messages_chat_id_id ON messages (chat_id, id)",
+        ),
+    ),
+    Migration(
+        version=4,
+        description="materialized chat_members.unread_count",
+        columns=(("chat_members", "unread_count", "INTEGER NOT NULL DEFAULT 0"),),
+        statements=(
+            "UPDATE chat_members SET unread_count = (SELECT COUNT(*) FROM messages "
+            "WHERE messages.chat_id = chat_members.chat_id "
+            "AND messages.id > COALESCE(chat_members.last_read_message_id, 0))",
+        ),
+    ),
+    Migration(
+        version=5,
+        description="FTS5 search over users and messages",
+        statements=(
+            # users_fts holds its own copy: it spans users and user_profiles.
+            "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+            "username, email, bio, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+            # messages_fts indexes messages.content in place (external content).
+            "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+            "content, chat_id UNINDEXED, content = 'messages', content_rowid = 'id', "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+            _users_fts_trigger("users_fts_ai", "AFTER INSERT ON users", "new.id"),
+            _users_fts_trigger("users_fts_au", "AFTER UPDATE OF username, email ON users", "new.id"),
+            "CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN "
+            "DELETE FROM users_fts WHERE rowid = old.id; END",
+            _users_fts_trigger("user_profiles_fts_ai", "AFTER INSERT ON user_profiles", "new.user_id"),
+            _users_fts_trigger("user_profiles_fts_au", "AFTER UPDATE OF bio ON user_profiles", "new.user_id"),
+            _users_fts_trigger("user_profiles_fts_ad", "AFTER DELETE ON user_profiles", "old.user_id"),
+            "CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN "
+            "INSERT INTO messages_fts (rowid, content, chat_id) VALUES (new.id, new.content, new.chat_id); END",
+            "CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN "
+            "INSERT INTO messages_fts (messages_fts, rowid, content, chat_id) "
+            "VALUES ('delete', old.id, old.content, old.chat_id); END",
+            "CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE OF content ON messages BEGIN "
+            "INSERT INTO messages_fts (messages_fts, rowid, content, chat_id) "
+            "VALUES ('delete', old.id, old.content, old.chat_id); "
+            "INSERT INTO messages_fts (rowid, content, chat_id) VALUES (new.id, new.content, new.chat_id); END",
+            "DELETE FROM users_fts",
+            "INSERT INTO users_fts (rowid, username, email, bio) "
+            "SELECT u.id, u.username, u.email, COALESCE(p.bio, '') FROM users u "
+            "LEFT JOIN user_profiles p ON p.user_id = u.id",
+            "INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')",
+        ),
+    ),
+    Migration(
+        version=6,
+        description="indexes for the /api/stats aggregates",
+        statements=(
+            "CREATE INDEX IF NOT EXISTS ix_activity_logs_ts ON activity_logs (timestamp)",
+            "CREATE INDEX IF NOT EXISTS ix_emergency_incidents_status ON emergency_incidents (status)",
+        ),
+    ),
+    Migration(
+        version=7,
+        description="backfill sensor_rollups from existing readings",
+        statements=tuple(
+            "INSERT OR IGNORE INTO sensor_rollups "
+            "(sensor_type, resolution, bucket_start, count, total, min_value, max_value) "
+            f"SELECT sensor_type, '{resolution}', strftime('{pattern}', timestamp), "
+            "COUNT(*), SUM(value), MIN(value), MAX(value) "
+            "FROM sensor_readings WHERE timestamp IS NOT NULL "
+            f"GROUP BY sensor_type, strftime('{pattern}', timestamp)"
+            for resolution, pattern in (
+                ("1m", "%Y-%m-%d %H:%M:00.000000"),
+                ("1h", "%Y-%m-%d %H:00:00.000000"),
+                ("1d", "%Y-%m-%d 00:00:00.000000"),
+            )
+        ),
+    ),
+    Migration(
+        version=8,
+        description="emergency_incidents.assigned_units from dispatch",
+        columns=(("emergency_incidents", "assigned_units", "TEXT"),),
+        statements=(),
+    ),
+    Migration(
+        version=9,
+        description="quadkey tile index on reports and emergency_incidents (backfilled by map_tiles)",
+        columns=(("reports", "quadkey", "TEXT"), ("emergency_incidents", "quadkey", "TEXT")),
+        statements=(
+            "CREATE INDEX IF NOT EXISTS ix_reports_quadkey ON reports (quadkey)",
+            "CREATE INDEX IF NOT EXISTS ix_emergency_incidents_quadkey ON emergency_incidents (quadkey)",
+        ),
+    ),
+    Migration(
+        version=10,
+        description="geo-tagged sensor readings for heatmaps",
+        columns=(("sensor_readings", "lat", "FLOAT"), ("sensor_readings", "lng", "FLOAT")),
+        statements=(
+            "CREATE INDEX IF NOT EXISTS ix_sensor_readings_geo ON sensor_readings (id) WHERE lat IS NOT NULL",
+        ),
+    ),
+    Migration(
+        version=11,
+        description="citizen report dedup clusters (run report_dedup.py to cluster old reports)",
+        columns=(
+            ("reports", "duplicate_of", "INTEGER REFERENCES reports(id)"),
+            ("reports", "report_count", "INTEGER NOT NULL DEFAULT 1"),
+            ("reports", "severity", "TEXT"),
+            ("reports", "last_reported_at", "DATETIME"),
+        ),
+        statements=(
+            "UPDATE reports SET last_reported_at = created_at WHERE last_reported_at IS NULL",
+            "CREATE INDEX IF NOT EXISTS ix_reports_duplicate_of ON reports (duplicate_of)",
+            "CREATE INDEX IF NOT EXISTS ix_reports_category_quadkey ON reports (category, quadkey)",
+        ),
+    ),
+    Migration(
+        version=12,
+        description="report dedup no longer overwrites status; undo the MERGED placeholder",
+        statements=(
+            "UPDATE reports SET status = 'RECEIVED' WHERE status = 'MERGED'",
+        ),
+    ),
+    Migration(
+        version=13,
+        description="emergency_units dispatch target, so EN_ROUTE units survive a restart",
+        columns=(("emergency_units", "target_lat", "FLOAT"), ("emergency_units", "target_lng", "FLOAT")),
+        statements=(),
+    ),
+]
+
+
+def _ensure_migrations_table(conn) -> None:
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, description TEXT, applied_at TEXT)"
+    ))
+
+
+def applied_versions(engine: Engine) -> List[int]:
+    with engine.begin() as conn:
+        _ensure_migrations_table(conn)
+        return [row[0] for row in conn.execute(text("SELECT version FROM schema_migrations ORDER BY version"))]
+
+
+def run_migrations(engine: Engine, migrations: List[Migration] = MIGRATIONS) -> List[int]:
+    """Apply pending migrations, each in its own transaction. Returns versions applied."""
+    done = set(applied_versions(engine))
+    applied: List[int] = []
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if migration.version in done:
+            continue
+        with engine.begin() as conn:
+            for table, column, ddl in migration.columns:
+                existing = {c["name"] for c in inspect(conn).get_columns(table)}
+                if column not in existing:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+            for statement in migration.statements:
+                conn.execute(text(statement))
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {"v": migration.version, "d": migration.description, "t": datetime.datetime.utcnow().isoformat()},
+            )
+        print(f"[Migrations] Applied {migration.version}: {migration.description}")
+        applied.append(migration.version)
+    return applied
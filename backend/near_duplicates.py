@@ -0,0 +1,247 @@
+"""
+Near-duplicate clustering for knowledge documents (MinHash + LSH).
+
+- Word shingles hashed into fixed-size MinHash signatures (NumPy)
+- Banded LSH buckets to find candidate pairs without O(n^2) comparisons
+- Candidate pairs verified by signature agreement, merged with union-find
+- Canonical-document mapping so indexes keep one document per cluster
+
+CLI report:
+    python near_duplicates.py --source all --field response
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import time
+import zlib
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_MAX_HASH = (1 << 32) - 1
+_FULL_PAIRING_LIMIT = 32
+
+
+def _tokens(text: str) -> List[str]:
+    return re.findall(r"\w+", (text or "").lower(), re.UNICODE)
+
+
+def _shingles(text: str, size: int) -> List[str]:
+    tokens = _tokens(text)
+    if not tokens:
+        return []
+    if len(tokens) <= size:
+        return [" ".join(tokens)]
+    return [" ".join(tokens[i : i + size]) for i in range(len(tokens) - size + 1)]
+
+
+@dataclass
+class DedupResult:
+    """Outcome of clustering `n` documents."""
+
+    canonical: List[int]
+    clusters: Dict[int, List[int]] = field(default_factory=dict)
+    build_time_ms: float = 0.0
+
+    @property
+    def total(self) -> int:
+        return len(self.canonical)
+
+    @property
+    def unique(self) -> int:
+        return len(self.clusters)
+
+    def aliases(self, idx: int) -> List[int]:
+        """Members of `idx`'s cluster other than the canonical document."""
+        root = self.canonical[idx]
+        return [m for m in self.clusters.get(root, []) if m != root]
+
+    def size_histogram(self) -> Dict[int, int]:
+        return dict(sorted(Counter(len(m) for m in self.clusters.values()).items()))
+
+
+class MinHashLSH:
+    def __init__(
+        self,
+        num_perm: int = 64,
+        bands: int = 8,
+        threshold: float = 0.8,
+        shingle_size: int = 2,
+        seed: int = 1854,
+    ) -> None:
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=(num_perm, 1), dtype=np.int64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=(num_perm, 1), dtype=np.int64)
+
+    def signature(self, text: str) -> np.ndarray:
+        shingles = _shingles(text, self.shingle_size)
+        if not shingles:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.int64)
+        hashed = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in set(shingles)),
+            dtype=np.int64,
+        )
+        permuted = (self._a * hashed[np.newaxis, :] + self._b) % _MERSENNE_PRIME
+        return permuted.min(axis=1)
+
+    def signatures(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.empty((len(texts), self.num_perm), dtype=np.int64)
+        for i, text in enumerate(texts):
+            out[i] = self.signature(text)
+        return out
+
+    def _candidate_pairs(self, sigs: np.ndarray) -> Iterable[Tuple[int, int]]:
+        for band in range(self.bands):
+            buckets: Dict[bytes, List[int]] = defaultdict(list)
+            start = band * self.rows
+            band_view = np.ascontiguousarray(sigs[:, start : start + self.rows])
+            for i in range(band_view.shape[0]):
+                buckets[band_view[i].tobytes()].append(i)
+            for members in buckets.values():
+                if len(members) < 2:
+                    continue
+                if len(members) <= _FULL_PAIRING_LIMIT:
+                    for i, left in enumerate(members):
+                        for right in members[i + 1 :]:
+                            yield left, right
+                else:
+                    # Huge buckets are almost always one cluster; star-link to the head.
+                    for other in members[1:]:
+                        yield members[0], other
+
+    def cluster(self, texts: Sequence[str]) -> DedupResult:
+        """
+        Cluster texts into near-duplicate groups.
+        The lowest index in each cluster is canonical, so callers control
+        which document survives by ordering their input by priority.
+        """
+        started = time.perf_counter()
+        n = len(texts)
+        parent = list(range(n))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        # Exact duplicates first: cheap and they skip signature work entirely.
+        first_seen: Dict[str, int] = {}
+        distinct_idx: List[int] = []
+        for i, text in enumerate(texts):
+            key = " ".join(_tokens(text))
+            if key in first_seen:
+                parent[i] = first_seen[key]
+            else:
+                first_seen[key] = i
+                distinct_idx.append(i)
+
+        if len(distinct_idx) > 1:
+            sigs = self.signatures([texts[i] for i in distinct_idx])
+            checked = set()
+            for a, b in self._candidate_pairs(sigs):
+                if (a, b) in checked:
+                    continue
+                checked.add((a, b))
+                if float(np.mean(sigs[a] == sigs[b])) < self.threshold:
+                    continue
+                ra, rb = find(distinct_idx[a]), find(distinct_idx[b])
+                if ra != rb:
+                    parent[max(ra, rb)] = min(ra, rb)
+
+        canonical = [find(i) for i in range(n)]
+        clusters: Dict[int, List[int]] = defaultdict(list)
+        for i, root in enumerate(canonical):
+            clusters[root].append(i)
+        return DedupResult(
+            canonical=canonical,
+            clusters=dict(clusters),
+            build_time_ms=(time.perf_counter() - started) * 1000.0,
+        )
+
+
+def cluster_texts(texts: Sequence[str], threshold: float = 0.8) -> DedupResult:
+    return MinHashLSH(threshold=threshold).cluster(texts)
+
+
+# ============================================
+# CLI REPORT
+# ============================================
+
+def _collect_documents(source: str, text_field: str) -> List[Tuple[str, str]]:
+    docs: List[Tuple[str, str]] = []
+    if source in {"db", "all"}:
+        try:
+            from database import AIKnowledge, SessionLocal
+
+            session = SessionLocal()
+            try:
+                column = getattr(AIKnowledge, text_field)
+                docs.extend(("db_ai_knowledge", row[0] or "") for row in session.query(column).yield_per(2000))
+            finally:
+                session.close()
+        except Exception as e:
+            print(f"[NearDup] AIKnowledge unavailable: {e}")
+    if source in {"datasets", "all"}:
+        from almaty_dataset import ALMATY_DATASET
+        from conversation_dataset import CONVERSATION_DATASET
+        from external_data_loader import load_external_datasets
+        from website_knowledge_dataset import WEBSITE_KNOWLEDGE_DATASET
+
+        datasets = [
+            ("almaty_dataset", ALMATY_DATASET),
+            ("conversation_dataset", CONVERSATION_DATASET),
+            ("website_knowledge_dataset", WEBSITE_KNOWLEDGE_DATASET),
+            ("external_dataset", load_external_datasets(limit_per_file=100000)),
+        ]
+        for name, dataset in datasets:
+            docs.extend((name, item.get(text_field, "")) for item in dataset)
+    return docs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Near-duplicate cluster report for knowledge sources")
+    parser.add_argument("--source", choices=["db", "datasets", "all"], default="all")
+    parser.add_argument("--field", choices=["pattern", "response"], default="response")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--top", type=int, default=10, help="Largest clusters to print")
+    args = parser.parse_args()
+
+    docs = _collect_documents(args.source, args.field)
+    texts = [text for _, text in docs]
+    result = cluster_texts(texts, threshold=args.threshold)
+
+    print("=" * 50)
+    print(f"Documents:        {result.total}")
+    print(f"Clusters:         {result.unique}")
+    if result.total:
+        print(f"Reduction:        {100.0 * (1 - result.unique / result.total):.1f}%")
+    print(f"Build time:       {result.build_time_ms:.0f} ms")
+    print("=" * 50)
+    print("Cluster size histogram (size: clusters):")
+    for size, count in result.size_histogram().items():
+        print(f"  {size:>5}: {count}")
+
+    largest = sorted(result.clusters.items(), key=lambda kv: len(kv[1]), reverse=True)[: args.top]
+    print(f"\nTop {len(largest)} clusters:")
+    for root, members in largest:
+        sources = Counter(docs[m][0] for m in members)
+        preview = texts[root].replace("\n", " ")[:80]
+        print(f"  [{len(members):>4}] {preview!r} {dict(sources)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Shared Open-Meteo client: one pooled connection, cached, single-flight, with a breaker.
+
+- A single `httpx.AsyncClient` (keep-alive pool) is reused for every call,
+  so polling dashboards no longer pay a TCP + TLS handshake each time
+- Responses are cached per endpoint for CACHE_TTL_SECONDS; up to
+  STALE_TTL_SECONDS past that the cached value is returned immediately and
+  refreshed in the background (stale-while-revalidate)
+- Concurrent misses share one in-flight upstream call (single-flight)
+- After BREAKER_FAILURES consecutive failures the circuit opens for
+  BREAKER_RESET_SECONDS: no upstream calls, the last good value is served
+  (whatever its age); then one trial call decides whether it closes again
+- Base URLs come from OPEN_METEO_AIR_URL / OPEN_METEO_WEATHER_URL so tests
+  and local development can point at a stub server
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+
+import httpx
+
+
+ALMATY_LAT, ALMATY_LNG = 43.2389, 76.8897
+AIR_QUALITY_URL = os.getenv("OPEN_METEO_AIR_URL", "https://air-quality-api.open-meteo.com/v1/air-quality")
+WEATHER_URL = os.getenv("OPEN_METEO_WEATHER_URL", "https://api.open-meteo.com/v1/forecast")
+
+ENDPOINTS = {
+    "air_quality": (AIR_QUALITY_URL, "european_aqi,pm2_5,pm10,nitrogen_dioxide,ozone"),
+    "weather": (WEATHER_URL, "temperature_2m,relative_humidity_2m,wind_speed_10m,weather_code"),
+}
+
+CACHE_TTL_SECONDS = 120.0
+STALE_TTL_SECONDS = 600.0
+TIMEOUT_SECONDS = 5.0
+BREAKER_FAILURES = 3
+BREAKER_RESET_SECONDS = 60.0
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Closed -> open after `failures` consecutive errors -> half-open after `reset_seconds`."""
+
+    def __init__(self, failures: int = BREAKER_FAILURES, reset_seconds: float = BREAKER_RESET_SECONDS,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        return self.state != "open"
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failures or self.opened_at is not None:
+            # A failed half-open trial re-opens for another full period.
+            self.opened_at = self.clock()
+
+
+@dataclass
+class CachedResponse:
+    data: Dict
+    fetched_at: float
+
+
+@dataclass
+class FetchResult:
+    data: Dict
+    age_seconds: float
+    status: str  # "fresh" | "stale" | "fallback"
+    error: Optional[str] = None
+
+
+@dataclass
+class ClientCounters:
+    upstream_calls: int = 0
+    upstream_errors: int = 0
+    cache_hits: int = 0
+    stale_served: int = 0
+    coalesced: int = 0
+    breaker_rejections: int = 0
+
+
+class OpenMeteoClient:
+    def __init__(self, ttl: float = CACHE_TTL_SECONDS, stale_ttl: float = STALE_TTL_SECONDS,
+                 timeout: float = TIMEOUT_SECONDS, endpoints: Optional[Dict] = None,
+                 breaker: Optional[CircuitBreaker] = None, clock: Callable[[], float] = time.monotonic) -> None:
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.timeout = timeout
+        self.endpoints = dict(endpoints or ENDPOINTS)
+        self.clock = clock
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+        self.counters = ClientCounters()
+        self._cache: Dict[str, CachedResponse] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+            )
+        return self._client
+
+    async def _call(self, kind: str) -> Dict:
+        if not self.breaker.allow():
+            self.counters.breaker_rejections += 1
+            raise CircuitOpenError(f"Open-Meteo circuit open ({kind})")
+        url, fields = self.endpoints[kind]
+        self.counters.upstream_calls += 1
+        try:
+            response = await self._http().get(url, params={
+                "latitude": ALMATY_LAT, "longitude": ALMATY_LNG, "current": fields,
+            })
+            response.raise_for_status()
+            data = response.json().get("current", {})
+        except Exception:
+            self.counters.upstream_errors += 1
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        self._cache[kind] = CachedResponse(data=data, fetched_at=self.clock())
+        return data
+
+    def _refresh(self, kind: str) -> asyncio.Task:
+        """The in-flight refresh for `kind`, starting one only if none is running."""
+        task = self._inflight.get(kind)
+        if task is not None:
+            self.counters.coalesced += 1
+            return task
+        task = asyncio.ensure_future(self._call(kind))
+        self._inflight[kind] = task
+
+        def done(t: asyncio.Task) -> None:
+            self._inflight.pop(kind, None)
+            if not t.cancelled():
+                t.exception()  # mark retrieved; background refresh errors are counted, not raised
+
+        task.add_done_callback(done)
+        return task
+
+    async def fetch(self, kind: str, revalidate: bool = False) -> Optional[FetchResult]:
+        """Current data for `kind` ("air_quality" | "weather"); None if nothing was ever fetched.
+
+        With `revalidate`, an expired entry is refreshed before returning
+        instead of being served stale (for pollers that push the result on).
+        """
+        cached = self._cache.get(kind)
+        if cached is not None:
+            age = self.clock() - cached.fetched_at
+            if age < self.ttl:
+                self.counters.cache_hits += 1
+                return FetchResult(cached.data, age, "fresh")
+            if not revalidate and age < self.ttl + self.stale_ttl and self.breaker.allow():
+                self.counters.stale_served += 1
+                self._refresh(kind)
+                return FetchResult(cached.data, age, "stale")
+        try:
+            # shield: one caller being cancelled must not cancel the shared call.
+            data = await asyncio.shield(self._refresh(kind))
+            return FetchResult(data, 0.0, "fresh")
+        except Exception as e:
+            if cached is None:
+                print(f"[OpenMeteo] {kind} unavailable: {e}")
+                return None
+            self.counters.stale_served += 1
+            return FetchResult(cached.data, self.clock() - cached.fetched_at, "fallback", error=str(e) or type(e).__name__)
+
+    async def air_quality(self, revalidate: bool = False) -> Optional[FetchResult]:
+        return await self.fetch("air_quality", revalidate)
+
+    async def weather(self, revalidate: bool = False) -> Optional[FetchResult]:
+        return await self.fetch("weather", revalidate)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict:
+        now = self.clock()
+        return {
+            "breaker": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "cache_age_seconds": {k: round(now - v.fetched_at, 1) for k, v in self._cache.items()},
+            **asdict(self.counters),
+        }
+
+
+@lru_cache(maxsize=1)
+def get_open_meteo() -> OpenMeteoClient:
+    return OpenMeteoClient()
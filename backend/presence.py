@@ -0,0 +1,139 @@
+"""
+In-memory presence registry for the messenger.
+
+- Heartbeats (PUT /api/messenger/online, WebSocket pings) only touch a dict;
+  no SQLite write per heartbeat
+- A background thread flushes changed users to `user_profiles` every
+  FLUSH_INTERVAL_SECONDS as one batched upsert
+- Users whose last heartbeat is older than PRESENCE_TTL_SECONDS read as
+  offline and are persisted as offline on the next flush
+- Read paths (contacts, search, profile) take presence from here and fall
+  back to the persisted row for users not seen since startup
+"""
+
+from __future__ import annotations
+
+import datetime
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from database import UserProfile
+
+
+PRESENCE_TTL_SECONDS = 90.0
+FLUSH_INTERVAL_SECONDS = 5.0
+
+
+@dataclass
+class PresenceEntry:
+    is_online: bool
+    last_seen: datetime.datetime
+
+
+class PresenceRegistry:
+    def __init__(self, ttl_seconds: float = PRESENCE_TTL_SECONDS,
+                 clock: Callable[[], datetime.datetime] = datetime.datetime.utcnow) -> None:
+        self.ttl = datetime.timedelta(seconds=ttl_seconds)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[int, PresenceEntry] = {}
+        self._dirty: Set[int] = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def touch(self, user_id: int, is_online: bool = True) -> None:
+        """Record a heartbeat (or an explicit offline) for `user_id`."""
+        now = self._clock()
+        with self._lock:
+            self._entries[user_id] = PresenceEntry(is_online=is_online, last_seen=now)
+            self._dirty.add(user_id)
+
+    def _effective(self, entry: PresenceEntry, now: datetime.datetime) -> bool:
+        return entry.is_online and now - entry.last_seen <= self.ttl
+
+    def status(self, user_id: int, profile: Optional[UserProfile] = None) -> Tuple[bool, Optional[datetime.datetime]]:
+        """(is_online, last_seen) from memory, else from the persisted profile row."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is None:
+            if profile is None:
+                return False, None
+            entry = PresenceEntry(is_online=bool(profile.is_online), last_seen=profile.last_seen or now)
+            return self._effective(entry, now), profile.last_seen
+        return self._effective(entry, now), entry.last_seen
+
+    def _expire(self, now: datetime.datetime) -> None:
+        for user_id, entry in self._entries.items():
+            if entry.is_online and now - entry.last_seen > self.ttl:
+                entry.is_online = False
+                self._dirty.add(user_id)
+
+    def flush(self, db: Session) -> int:
+        """Upsert every changed user in one statement. Returns the number of rows written."""
+        now = self._clock()
+        with self._lock:
+            self._expire(now)
+            rows = [
+                {"user_id": user_id, "is_online": self._entries[user_id].is_online,
+                 "last_seen": self._entries[user_id].last_seen}
+                for user_id in self._dirty
+            ]
+            self._dirty.clear()
+        if not rows:
+            return 0
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(UserProfile.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={"is_online": stmt.excluded.is_online, "last_seen": stmt.excluded.last_seen},
+        )
+        try:
+            db.execute(stmt, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Retry these users on the next flush.
+            with self._lock:
+                self._dirty.update(row["user_id"] for row in rows)
+            raise
+        return len(rows)
+
+    def start(self, session_factory: Callable[[], Session], interval: float = FLUSH_INTERVAL_SECONDS) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def loop() -> None:
+            while not self._stop.wait(interval):
+                self._flush_with(session_factory)
+
+        self._thread = threading.Thread(target=loop, name="presence-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self, session_factory: Callable[[], Session]) -> None:
+        """Stop the flusher and write whatever is still pending."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._flush_with(session_factory)
+
+    def _flush_with(self, session_factory: Callable[[], Session]) -> None:
+        db = session_factory()
+        try:
+            self.flush(db)
+        except Exception as e:
+            print(f"[Presence] Flush failed: {e}")
+        finally:
+            db.close()
+
+
+@lru_cache(maxsize=1)
+def get_presence() -> PresenceRegistry:
+    return PresenceRegistry()
@@ -6,6 +6,7 @@ Generates suggestions and warnings without being explicitly asked.
 """
 
 import random
+import threading
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
@@ -74,9 +75,12 @@ class ProactiveEngine:
             return "Good evening!" if lang == "en" else "Добрый вечер!"
 
 _proactive_engine = None
+_proactive_engine_lock = threading.Lock()
 
 def get_proactive_engine():
     global _proactive_engine
     if _proactive_engine is None:
-        _proactive_engine = ProactiveEngine()
+        with _proactive_engine_lock:
+            if _proactive_engine is None:
+                _proactive_engine = ProactiveEngine()
     return _proactive_engine
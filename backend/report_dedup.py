@@ -0,0 +1,220 @@
+"""
+Spatio-temporal deduplication of citizen reports.
+
+A report is either a cluster head (duplicate_of IS NULL) or a duplicate that
+points at one. Heads carry the cluster's report_count, severity and
+last_reported_at; duplicates are kept verbatim (user history, audit) but are
+left out of the map layer and report listings. Membership is `duplicate_of`
+alone: a report's workflow `status` is never rewritten by clustering, so
+reclustering with other parameters cannot lose it.
+
+- At ingest, `file_report` looks for an open head of the same category
+  reported within DEDUP_WINDOW_HOURS and DEDUP_RADIUS_M metres. Candidates
+  come from the 3 x 3 block of quadkey tiles around the point, at the
+  deepest zoom whose tiles are still at least the radius wide, so it is a
+  handful of range scans on (category, quadkey)
+- A match bumps the head's counter and, with it, its severity; otherwise
+  the report starts its own cluster
+- `recluster` replays every report in time order with the same rule and
+  rewrites the cluster columns in bulk. A head is promoted to the most
+  advanced open status of its members (e.g. a merged IN_PROGRESS report makes
+  its head IN_PROGRESS), so work already under way stays visible; run it after changing the radius or
+  window, or on data from before deduplication
+  (`python report_dedup.py --radius 75 --hours 72`)
+"""
+
+from __future__ import annotations
+
+import datetime
+import math
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from database import CitizenReport
+from map_tiles import QUADKEY_ZOOM, get_tile_cache, tile_quadkey, tile_xy
+from spatial_index import EARTH_RADIUS_M, haversine_m
+
+
+DEDUP_RADIUS_M = 75.0
+DEDUP_WINDOW_HOURS = 72.0
+CLOSED_STATUSES = ("RESOLVED",)
+# Open workflow statuses, least to most advanced; a head takes its members' highest.
+OPEN_STATUS_ORDER = ("RECEIVED", "PENDING", "IN_PROGRESS")
+# (minimum reports in the cluster, severity); severities only ever go up.
+SEVERITY_STEPS = ((25, "CRITICAL"), (10, "HIGH"), (3, "MEDIUM"), (1, "LOW"))
+SEVERITY_ORDER = ("LOW", "MEDIUM", "HIGH", "CRITICAL")
+RECLUSTER_BATCH_SIZE = 1000
+
+
+def severity_for(count: int, current: Optional[str] = None) -> str:
+    derived = next(severity for minimum, severity in SEVERITY_STEPS if count >= minimum)
+    if current in SEVERITY_ORDER and SEVERITY_ORDER.index(current) > SEVERITY_ORDER.index(derived):
+        return current
+    return derived
+
+
+def _more_advanced(current: Optional[str], other: Optional[str]) -> Optional[str]:
+    """The further along of two open statuses; unknown or closed ones are left as they are."""
+    if current in OPEN_STATUS_ORDER and other in OPEN_STATUS_ORDER:
+        return max(current, other, key=OPEN_STATUS_ORDER.index)
+    return current
+
+
+def lookup_zoom(lat: float, radius_m: float) -> int:
+    """Deepest zoom whose tiles are at least radius_m wide at this latitude."""
+    equator = 2 * math.pi * EARTH_RADIUS_M * math.cos(math.radians(lat))
+    zoom = int(math.floor(math.log2(equator / max(radius_m, 1.0))))
+    return max(0, min(QUADKEY_ZOOM, zoom))
+
+
+def neighbor_cells(lat: float, lng: float, radius_m: float) -> List[str]:
+    """Quadkeys of the tile holding the point and its 8 neighbours."""
+    zoom = lookup_zoom(lat, radius_m)
+    x, y = tile_xy(lat, lng, zoom)
+    n = 1 << zoom
+    return sorted({
+        tile_quadkey(zoom, x + dx, y + dy)
+        for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+        if 0 <= x + dx < n and 0 <= y + dy < n
+    })
+
+
+def find_cluster(db: Session, category: str, lat: float, lng: float, now: datetime.datetime,
+                 radius_m: float = DEDUP_RADIUS_M,
+                 window_hours: float = DEDUP_WINDOW_HOURS) -> Optional[Tuple[CitizenReport, float]]:
+    """The nearest open head of `category` within radius_m reported in the window, with its distance."""
+    since = now - datetime.timedelta(hours=window_hours)
+    cells = neighbor_cells(lat, lng, radius_m)
+    heads = list(db.execute(
+        select(CitizenReport).where(
+            CitizenReport.category == category,
+            or_(*[and_(CitizenReport.quadkey >= cell, CitizenReport.quadkey < cell + "4") for cell in cells]),
+            CitizenReport.duplicate_of.is_(None),
+            CitizenReport.status.notin_(CLOSED_STATUSES),
+            func.coalesce(CitizenReport.last_reported_at, CitizenReport.created_at) >= since,
+        )
+    ).scalars())
+    if not heads:
+        return None
+    distances = haversine_m(lat, lng, [h.lat for h in heads], [h.lng for h in heads])
+    best = int(distances.argmin())
+    if distances[best] > radius_m:
+        return None
+    return heads[best], float(distances[best])
+
+
+def file_report(db: Session, category: str, description: str, lat: float, lng: float,
+                user_id: Optional[int] = None, now: Optional[datetime.datetime] = None,
+                radius_m: float = DEDUP_RADIUS_M,
+                window_hours: float = DEDUP_WINDOW_HOURS) -> Tuple[CitizenReport, CitizenReport]:
+    """Store a report, merged into a matching cluster if there is one. Returns (report, head). Caller commits."""
+    now = now or datetime.datetime.utcnow()
+    match = find_cluster(db, category, lat, lng, now, radius_m, window_hours)
+    report = CitizenReport(user_id=user_id, category=category, description=description, lat=lat, lng=lng,
+                           created_at=now, last_reported_at=now)
+    if match is None:
+        report.report_count = 1
+        report.severity = severity_for(1)
+        report.ai_analysis = f"New {category} issue; no open report within {radius_m:g} m."
+        db.add(report)
+        db.flush()
+        return report, report
+
+    head, distance = match
+    head.report_count = CitizenReport.report_count + 1  # atomic against concurrent merges
+    head.last_reported_at = now
+    db.flush()
+    db.refresh(head, ["report_count"])
+    head.severity = severity_for(head.report_count, head.severity)
+    report.duplicate_of = head.id
+    report.report_count = 0
+    report.ai_analysis = (
+        f"Duplicate of report R-{head.id} ({distance:.0f} m away); "
+        f"{head.report_count} reports, severity {head.severity}."
+    )
+    db.add(report)
+    db.flush()
+    return report, head
+
+
+def recluster(db: Session, radius_m: float = DEDUP_RADIUS_M, window_hours: float = DEDUP_WINDOW_HOURS,
+              batch_size: int = RECLUSTER_BATCH_SIZE) -> Dict[str, int]:
+    """Recompute every report's cluster from scratch, in time order. Commits."""
+    rows = db.execute(
+        select(CitizenReport.id, CitizenReport.category, CitizenReport.lat, CitizenReport.lng,
+               CitizenReport.created_at, CitizenReport.status)
+        .where(CitizenReport.lat.isnot(None), CitizenReport.lng.isnot(None))
+        .order_by(CitizenReport.created_at, CitizenReport.id)
+    ).all()
+    window = datetime.timedelta(hours=window_hours)
+    # (category, cell) -> ids of heads whose own tile is that cell
+    cells: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+    heads: Dict[int, Dict] = {}
+    updates: Dict[int, Dict] = {}
+
+    for row in rows:
+        created = row.created_at or datetime.datetime.min
+        best, best_distance = None, radius_m
+        if row.status not in CLOSED_STATUSES:
+            candidates = [
+                head_id
+                for cell in neighbor_cells(row.lat, row.lng, radius_m)
+                for head_id in cells.get((row.category, cell), ())
+                if not heads[head_id]["closed"] and created - heads[head_id]["last"] <= window
+            ]
+            if candidates:
+                distances = haversine_m(row.lat, row.lng, [heads[h]["lat"] for h in candidates],
+                                        [heads[h]["lng"] for h in candidates])
+                i = int(distances.argmin())
+                if distances[i] <= radius_m:
+                    best, best_distance = candidates[i], float(distances[i])
+        if best is None:
+            zoom = lookup_zoom(row.lat, radius_m)
+            cells[(row.category, tile_quadkey(zoom, *tile_xy(row.lat, row.lng, zoom)))].append(row.id)
+            heads[row.id] = {"lat": row.lat, "lng": row.lng, "last": created, "count": 1,
+                             "closed": row.status in CLOSED_STATUSES, "status": row.status}
+            updates[row.id] = {"id": row.id, "duplicate_of": None, "status": row.status}
+        else:
+            head = heads[best]
+            head["count"] += 1
+            head["last"] = max(head["last"], created)
+            head["status"] = _more_advanced(head["status"], row.status)
+            updates[row.id] = {"id": row.id, "duplicate_of": best, "status": row.status,
+                               "report_count": 0, "severity": None, "last_reported_at": row.created_at}
+
+    for head_id, head in heads.items():
+        updates[head_id].update(report_count=head["count"], severity=severity_for(head["count"]), status=head["status"],
+                                last_reported_at=None if head["last"] == datetime.datetime.min else head["last"])
+    values = list(updates.values())
+    for start in range(0, len(values), batch_size):
+        db.execute(update(CitizenReport), values[start:start + batch_size])
+    db.commit()
+    # Bulk updates bypass the ORM hooks that keep map tiles fresh.
+    get_tile_cache().invalidate("reports", None)
+    return {"reports": len(rows), "clusters": len(heads), "merged": len(rows) - len(heads)}
+
+
+def main() -> None:
+    import argparse
+
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Re-cluster citizen reports (spatio-temporal dedup)")
+    parser.add_argument("--radius", type=float, default=DEDUP_RADIUS_M, help="metres")
+    parser.add_argument("--hours", type=float, default=DEDUP_WINDOW_HOURS, help="time window")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = recluster(db, args.radius, args.hours)
+        print(f"[ReportDedup] {result['reports']} reports -> {result['clusters']} clusters "
+              f"({result['merged']} merged)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
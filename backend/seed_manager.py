@@ -0,0 +1,144 @@
+"""
+Versioned, idempotent seed data management.
+
+- DataVersion rows record which seed version is already in the database
+- Startup compares one stored hash and skips seeding when nothing changed
+- Knowledge rows are bulk inserted (executemany, ON CONFLICT DO NOTHING)
+  against the unique (pattern, language) index instead of per-row ORM adds
+- Chunked streaming loader with inserted/skipped counts for large imports
+"""
+
+from __future__ import annotations
+
+import datetime
+import hashlib
+import json
+from dataclasses import dataclass
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from almaty_dataset import ALMATY_DATASET
+from data_augmenter import iter_augmented_rows
+from database import AIKnowledge, DataVersion
+
+
+STARTUP_SEED_KEY = "startup_seed"
+KNOWLEDGE_SEED_KEY = "ai_knowledge"
+
+# Bump when the fixture rows seeded in main.startup_event change.
+FIXTURES_VERSION = "fixtures-v1"
+
+BULK_CHUNK_SIZE = 5000
+
+
+@dataclass
+class BulkLoadStats:
+    processed: int = 0
+    inserted: int = 0
+    skipped: int = 0
+    chunks: int = 0
+
+
+def get_data_version(db: Session, key: str) -> Optional[str]:
+    row = db.get(DataVersion, key)
+    return row.version if row else None
+
+
+def set_data_version(db: Session, key: str, version: str) -> None:
+    row = db.get(DataVersion, key)
+    if row is None:
+        db.add(DataVersion(key=key, version=version))
+    else:
+        row.version = version
+        row.updated_at = datetime.datetime.utcnow()
+
+
+def knowledge_rows() -> List[Dict]:
+    """Base dataset rows followed by their augmented permutations."""
+    base = [
+        {
+            "category": item["category"],
+            "pattern": item["pattern"],
+            "response": item["response"],
+            "language": item["language"],
+            "importance": item.get("importance", 1),
+        }
+        for item in ALMATY_DATASET
+    ]
+    return base + list(iter_augmented_rows(ALMATY_DATASET))
+
+
+def rows_version(rows: Sequence[Dict]) -> str:
+    payload = json.dumps(rows, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+def insert_knowledge_rows(db: Session, rows: Sequence[Dict]) -> int:
+    """Insert rows in one executemany; existing (pattern, language) pairs are ignored."""
+    if not rows:
+        return 0
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(AIKnowledge.__table__).on_conflict_do_nothing(
+        index_elements=["pattern", "language"]
+    )
+    result = db.execute(stmt, list(rows))
+    return max(result.rowcount or 0, 0)
+
+
+def _normalize_item(item: Dict, default_importance: int) -> Optional[Dict]:
+    pattern = item.get("pattern") or ""
+    if not pattern:
+        return None
+    return {
+        "category": item.get("category", "GENERAL"),
+        "pattern": pattern,
+        "response": item.get("response", ""),
+        "language": item.get("language", "en"),
+        "importance": item.get("importance", default_importance),
+    }
+
+
+def bulk_load_knowledge(
+    db: Session,
+    items: Iterable[Dict],
+    default_importance: int = 1,
+    chunk_size: int = BULK_CHUNK_SIZE,
+) -> BulkLoadStats:
+    """
+    Stream items into AIKnowledge in chunks, one INSERT statement per chunk.
+    Items whose (pattern, language) already exist are counted as skipped.
+    """
+    stats = BulkLoadStats()
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            break
+        rows = [row for row in (_normalize_item(item, default_importance) for item in chunk) if row]
+        inserted = insert_knowledge_rows(db, rows)
+        db.commit()
+        stats.processed += len(chunk)
+        stats.inserted += inserted
+        stats.skipped += len(chunk) - inserted
+        stats.chunks += 1
+    return stats
+
+
+def seed_knowledge_base(db: Session, rows: Optional[Sequence[Dict]] = None) -> int:
+    """Load base + augmented knowledge if its data version changed. Returns rows added."""
+    rows = knowledge_rows() if rows is None else rows
+    version = rows_version(rows)
+    if get_data_version(db, KNOWLEDGE_SEED_KEY) == version:
+        return 0
+    added = insert_knowledge_rows(db, rows)
+    set_data_version(db, KNOWLEDGE_SEED_KEY, version)
+    db.commit()
+    print(f"AI Knowledge Base synced: Added {added} entries (version {version}).")
+    return added
+
+
+def startup_seed_version(rows: Sequence[Dict]) -> str:
+    return f"{FIXTURES_VERSION}:{rows_version(rows)}"
@@ -0,0 +1,321 @@
+"""
+Sensor ingestion: cheap validation, in-memory ring buffers, batched writes.
+
+- `POST /api/sensors/ingest` takes a JSON array or an NDJSON stream of
+  {"sensor_type", "value", "timestamp"?, "lat"?, "lng"?} objects; each item
+  is checked with plain type tests (no pydantic model per reading)
+- Accepted readings go into a per-type ring buffer (the last RING_SIZE
+  values), which serves "latest value" reads without touching the database
+- They are also appended to a pending list that a background thread swaps out
+  and writes with `record_readings` (one executemany + one rollup upsert per
+  batch), so ingest requests and readers never wait on SQLite
+- When more than MAX_PENDING readings are waiting, new ones still update the
+  ring buffer but are not persisted; they are reported as dropped, not accepted
+- A batch that fails to write is queued again (it still counts towards
+  MAX_PENDING) and retried on the next flush; after MAX_WRITE_ATTEMPTS it is
+  given up and its rows are counted as dropped
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+import math
+import os
+import re
+import threading
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from timeseries import record_readings
+
+
+RING_SIZE = 1024
+MAX_PENDING = int(os.getenv("SENSOR_INGEST_MAX_PENDING", "200000"))
+BATCH_SIZE = 5000
+FLUSH_INTERVAL_MS = 250
+MAX_WRITE_ATTEMPTS = 5
+MAX_ITEMS_PER_REQUEST = 50_000
+MAX_FUTURE_SKEW = datetime.timedelta(minutes=5)
+MAX_ERRORS_REPORTED = 10
+
+_SENSOR_TYPE = re.compile(r"^[A-Z0-9_]{1,32}$")
+
+Reading = Tuple[str, float, datetime.datetime]
+
+
+def _parse_timestamp(raw: Any, now: datetime.datetime) -> datetime.datetime:
+    if raw is None:
+        return now
+    if isinstance(raw, (int, float)) and not isinstance(raw, bool):
+        return datetime.datetime.utcfromtimestamp(raw)
+    if isinstance(raw, str):
+        ts = datetime.datetime.fromisoformat(raw)
+        if ts.tzinfo is not None:
+            ts = ts.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return ts
+    raise ValueError("timestamp must be an ISO string or epoch seconds")
+
+
+def validate_reading(item: Any, now: datetime.datetime) -> Reading:
+    """(sensor_type, value, timestamp) for one payload item, or ValueError."""
+    if not isinstance(item, dict):
+        raise ValueError("reading must be an object")
+    sensor_type = item.get("sensor_type")
+    if not isinstance(sensor_type, str):
+        raise ValueError("sensor_type is required")
+    sensor_type = sensor_type.upper()
+    if not _SENSOR_TYPE.match(sensor_type):
+        raise ValueError("sensor_type must be 1-32 letters, digits or underscores")
+    value = item.get("value")
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError("value must be a finite number")
+    try:
+        timestamp = _parse_timestamp(item.get("timestamp"), now)
+    except (ValueError, OverflowError, OSError) as e:
+        raise ValueError(f"bad timestamp: {e}")
+    if timestamp - now > MAX_FUTURE_SKEW:
+        raise ValueError("timestamp is in the future")
+    return sensor_type, float(value), timestamp
+
+
+def validate_location(item: Dict) -> Tuple[Optional[float], Optional[float]]:
+    """Optional (lat, lng) of a reading: both or neither, finite and in range."""
+    lat, lng = item.get("lat"), item.get("lng")
+    if lat is None and lng is None:
+        return None, None
+    for name, v, limit in (("lat", lat, 90.0), ("lng", lng, 180.0)):
+        if isinstance(v, bool) or not isinstance(v, (int, float)) or not math.isfinite(v) or abs(v) > limit:
+            raise ValueError(f"{name} must be a number within +-{limit:g} (lat and lng go together)")
+    return float(lat), float(lng)
+
+
+class NdjsonDecoder:
+    """Incremental NDJSON splitter for streamed request bodies."""
+
+    def __init__(self) -> None:
+        self._tail = b""
+        self.bad_lines = 0
+
+    def _decode(self, lines: Iterable[bytes]) -> List[Any]:
+        items = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                self.bad_lines += 1
+        return items
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        lines = (self._tail + chunk).split(b"\n")
+        self._tail = lines.pop()
+        return self._decode(lines)
+
+    def close(self) -> List[Any]:
+        tail, self._tail = self._tail, b""
+        return self._decode([tail])
+
+
+def parse_json_batch(body: bytes) -> List[Any]:
+    payload = json.loads(body)
+    if isinstance(payload, dict):
+        payload = payload.get("readings", [payload])
+    if not isinstance(payload, list):
+        raise ValueError("expected a JSON array of readings")
+    return payload
+
+
+@dataclass
+class IngestResult:
+    accepted: int = 0
+    rejected: int = 0
+    dropped: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def merge(self, other: "IngestResult") -> None:
+        self.accepted += other.accepted
+        self.rejected += other.rejected
+        self.dropped += other.dropped
+        self.errors.extend(other.errors[:MAX_ERRORS_REPORTED - len(self.errors)])
+
+
+@dataclass
+class IngestCounters:
+    accepted: int = 0
+    rejected: int = 0
+    dropped: int = 0
+    written: int = 0
+    failed_batches: int = 0
+
+
+class SensorIngestor:
+    def __init__(self, session_factory: Callable[[], Session], ring_size: int = RING_SIZE,
+                 max_pending: int = MAX_PENDING, batch_size: int = BATCH_SIZE,
+                 flush_interval_ms: int = FLUSH_INTERVAL_MS) -> None:
+        self.session_factory = session_factory
+        self.ring_size = ring_size
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.counters = IngestCounters()
+        self._rings: Dict[str, Deque[Tuple[datetime.datetime, float]]] = {}
+        self._pending: List[Dict] = []
+        self._retry: Deque[Tuple[int, List[Dict]]] = deque()  # (failed attempts, batch)
+        self._retry_rows = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Called with each batch of accepted rows (e.g. CityStateCache.apply_readings).
+        self.listeners: List[Callable[[List[Dict]], None]] = []
+
+    def ingest(self, items: Iterable[Any], now: Optional[datetime.datetime] = None) -> IngestResult:
+        """Validate items, update the ring buffers and queue them for the writer."""
+        now = now or datetime.datetime.utcnow()
+        result = IngestResult()
+        rows = []
+        for index, item in enumerate(items):
+            try:
+                sensor_type, value, timestamp = validate_reading(item, now)
+                lat, lng = validate_location(item)
+            except ValueError as e:
+                result.rejected += 1
+                if len(result.errors) < MAX_ERRORS_REPORTED:
+                    result.errors.append(f"item {index}: {e}")
+                continue
+            rows.append({"sensor_type": sensor_type, "value": value, "timestamp": timestamp, "lat": lat, "lng": lng})
+
+        with self._lock:
+            for row in rows:
+                ring = self._rings.get(row["sensor_type"])
+                if ring is None:
+                    ring = self._rings[row["sensor_type"]] = deque(maxlen=self.ring_size)
+                # Late readings still get persisted but never replace a newer "latest".
+                if not ring or row["timestamp"] >= ring[-1][0]:
+                    ring.append((row["timestamp"], row["value"]))
+            room = max(0, self.max_pending - len(self._pending) - self._retry_rows)
+            self._pending.extend(rows[:room])
+            result.accepted = min(room, len(rows))
+            result.dropped = len(rows) - result.accepted
+            self.counters.accepted += result.accepted
+            self.counters.rejected += result.rejected
+            self.counters.dropped += result.dropped
+            backlog = len(self._pending) + self._retry_rows
+        if backlog >= self.batch_size:
+            self._wake.set()
+        if rows:
+            for listener in self.listeners:
+                listener(rows)
+        return result
+
+    # -- reads ---------------------------------------------------------------
+
+    def latest(self, sensor_type: str) -> Optional[Dict]:
+        ring = self._rings.get(sensor_type.upper())
+        if not ring:
+            return None
+        timestamp, value = ring[-1]
+        return {"sensor_type": sensor_type.upper(), "value": value, "timestamp": timestamp.isoformat()}
+
+    def latest_all(self) -> Dict[str, Dict]:
+        return {t: self.latest(t) for t in list(self._rings)}
+
+    def recent(self, sensor_type: str, limit: int = 60) -> List[Dict]:
+        ring = self._rings.get(sensor_type.upper())
+        if not ring:
+            return []
+        with self._lock:
+            tail = list(ring)[-limit:]
+        return [{"timestamp": ts.isoformat(), "value": value} for ts, value in tail]
+
+    # -- writing -------------------------------------------------------------
+
+    def flush(self) -> int:
+        """Write failed batches, then everything pending, in BATCH_SIZE chunks. Returns rows written.
+
+        On the first failure the batch and everything after it are queued
+        again for the next flush (the database is likely unavailable).
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+            work = list(self._retry)
+            self._retry.clear()
+        work += [(0, pending[start:start + self.batch_size]) for start in range(0, len(pending), self.batch_size)]
+        written, given_up = 0, 0
+        requeue: List[Tuple[int, List[Dict]]] = []
+        for i, (attempts, batch) in enumerate(work):
+            db = self.session_factory()
+            try:
+                record_readings(db, batch)
+                db.commit()
+                written += len(batch)
+            except Exception as e:
+                db.rollback()
+                attempts += 1
+                if attempts >= MAX_WRITE_ATTEMPTS:
+                    given_up += len(batch)
+                    print(f"[SensorIngest] Batch of {len(batch)} failed {attempts} times, dropping it: {e}")
+                else:
+                    requeue.append((attempts, batch))
+                    print(f"[SensorIngest] Batch of {len(batch)} failed (attempt {attempts}), will retry: {e}")
+                requeue += work[i + 1:]
+                with self._lock:
+                    self.counters.failed_batches += 1
+                break
+            finally:
+                db.close()
+        with self._lock:
+            self._retry.extend(requeue)
+            self._retry_rows = sum(len(batch) for _, batch in self._retry)
+            self.counters.written += written
+            self.counters.dropped += given_up
+        return written
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[SensorIngest] Flush failed: {e}")
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sensor-ingest-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = asdict(self.counters)
+            pending = len(self._pending) + self._retry_rows
+        return {
+            "pending": pending,
+            "max_pending": self.max_pending,
+            "sensor_types": len(self._rings),
+            "running": self._thread is not None,
+            **counters,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_sensor_ingestor() -> SensorIngestor:
+    from database import SessionLocal
+
+    return SensorIngestor(SessionLocal)
@@ -0,0 +1,143 @@
+"""
+Uniform lat/lng grid index for moving points (emergency units).
+
+- Points are bucketed into CELL_DEG x CELL_DEG cells (~1 km in Almaty);
+  `update` recomputes every cell in one vectorized pass and only re-buckets
+  the points whose cell changed, so a tick of slowly moving units is cheap
+- `within` scans the cells overlapping the radius; `nearest` grows a ring of
+  cells until k hits are found and no unscanned cell can hold a closer point
+- Distances are haversine metres, computed vectorized over the candidates;
+  `haversine_m` broadcasts, so it also builds full cost matrices
+"""
+
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from typing import Dict, Optional, Set, Tuple
+
+import numpy as np
+
+
+EARTH_RADIUS_M = 6_371_000.0
+CELL_DEG = 0.01
+METERS_PER_DEG_LAT = 111_320.0
+
+
+def haversine_m(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Great-circle distance in metres; arguments broadcast against each other."""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(a, dtype=float)) for a in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class GridIndex:
+    def __init__(self, cell_deg: float = CELL_DEG) -> None:
+        self.cell_deg = cell_deg
+        self.lat = np.zeros(0)
+        self.lng = np.zeros(0)
+        self.cell_i = np.zeros(0, dtype=np.int64)
+        self.cell_j = np.zeros(0, dtype=np.int64)
+        self.cells: Dict[Tuple[int, int], Set[int]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def _cells_of(self, lat: np.ndarray, lng: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return np.floor(lat / self.cell_deg).astype(np.int64), np.floor(lng / self.cell_deg).astype(np.int64)
+
+    def rebuild(self, lat: np.ndarray, lng: np.ndarray) -> None:
+        self.lat, self.lng = np.asarray(lat, dtype=float), np.asarray(lng, dtype=float)
+        self.cell_i, self.cell_j = self._cells_of(self.lat, self.lng)
+        self.cells = defaultdict(set)
+        for idx, key in enumerate(zip(self.cell_i.tolist(), self.cell_j.tolist())):
+            self.cells[key].add(idx)
+
+    def update(self, lat: np.ndarray, lng: np.ndarray) -> int:
+        """New positions for the same points (appended points are added). Returns points re-bucketed."""
+        lat, lng = np.asarray(lat, dtype=float), np.asarray(lng, dtype=float)
+        if len(lat) < len(self.lat):
+            self.rebuild(lat, lng)
+            return len(lat)
+        cell_i, cell_j = self._cells_of(lat, lng)
+        old = len(self.cell_i)
+        changed = np.flatnonzero((cell_i[:old] != self.cell_i) | (cell_j[:old] != self.cell_j))
+        for idx in changed.tolist():
+            key = (int(self.cell_i[idx]), int(self.cell_j[idx]))
+            self.cells[key].discard(idx)
+            if not self.cells[key]:
+                del self.cells[key]
+            self.cells[(int(cell_i[idx]), int(cell_j[idx]))].add(idx)
+        for idx in range(old, len(lat)):
+            self.cells[(int(cell_i[idx]), int(cell_j[idx]))].add(idx)
+        self.lat, self.lng, self.cell_i, self.cell_j = lat, lng, cell_i, cell_j
+        return len(changed) + len(lat) - old
+
+    # -- queries -------------------------------------------------------------
+
+    def _ring(self, ci: int, cj: int, r: int) -> np.ndarray:
+        """Indices of points in the cells at Chebyshev distance exactly r from (ci, cj)."""
+        found = []
+        if r == 0:
+            keys = [(ci, cj)]
+        else:
+            keys = [(ci + di, cj + dj) for di in range(-r, r + 1) for dj in (-r, r)]
+            keys += [(ci + di, cj + dj) for di in (-r, r) for dj in range(-r + 1, r)]
+        for key in keys:
+            bucket = self.cells.get(key)
+            if bucket:
+                found.extend(bucket)
+        return np.fromiter(found, dtype=np.int64, count=len(found))
+
+    def _max_ring(self, ci: int, cj: int) -> int:
+        if not len(self.cell_i):
+            return 0
+        return int(max(abs(self.cell_i.min() - ci), abs(self.cell_i.max() - ci),
+                       abs(self.cell_j.min() - cj), abs(self.cell_j.max() - cj)))
+
+    def within(self, lat: float, lng: float, radius_m: float,
+               mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(indices, distances) of points within radius_m, nearest first; `mask` filters points."""
+        dlat = radius_m / METERS_PER_DEG_LAT
+        dlng = radius_m / (METERS_PER_DEG_LAT * max(math.cos(math.radians(lat)), 1e-6))
+        i0, j0 = self._cells_of(np.array([lat - dlat]), np.array([lng - dlng]))
+        i1, j1 = self._cells_of(np.array([lat + dlat]), np.array([lng + dlng]))
+        found = []
+        for i in range(int(i0[0]), int(i1[0]) + 1):
+            for j in range(int(j0[0]), int(j1[0]) + 1):
+                bucket = self.cells.get((i, j))
+                if bucket:
+                    found.extend(bucket)
+        candidates = np.fromiter(found, dtype=np.int64, count=len(found))
+        if mask is not None and len(candidates):
+            candidates = candidates[mask[candidates]]
+        distances = haversine_m(lat, lng, self.lat[candidates], self.lng[candidates])
+        keep = distances <= radius_m
+        order = np.argsort(distances[keep], kind="stable")
+        return candidates[keep][order], distances[keep][order]
+
+    def nearest(self, lat: float, lng: float, k: int,
+                mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(indices, distances) of the k nearest points (fewer if not enough match `mask`)."""
+        if k < 1:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        ci, cj = (int(c[0]) for c in self._cells_of(np.array([lat]), np.array([lng])))
+        max_ring = self._max_ring(ci, cj)
+        candidates = np.zeros(0, dtype=np.int64)
+        distances = np.zeros(0)
+        r = 0
+        while r <= max_ring:
+            ring = self._ring(ci, cj, r)
+            if mask is not None and len(ring):
+                ring = ring[mask[ring]]
+            if len(ring):
+                candidates = np.concatenate([candidates, ring])
+                distances = np.concatenate([distances, haversine_m(lat, lng, self.lat[ring], self.lng[ring])])
+            # Any point outside rings 0..r is at least r cells away along one axis
+            # (a longitude cell is narrowest at the far edge of the scanned band).
+            covered_m = r * self.cell_deg * METERS_PER_DEG_LAT * math.cos(math.radians(min(89.0, abs(lat) + (r + 1) * self.cell_deg)))
+            if len(candidates) >= k and np.partition(distances, k - 1)[k - 1] <= covered_m:
+                break
+            r += 1
+        order = np.argsort(distances, kind="stable")[:k]
+        return candidates[order], distances[order]
@@ -1,29 +1,13 @@
-from database import SessionLocal, AIKnowledge
+from database import SessionLocal
 from almaty_dataset import ALMATY_DATASET
-import re
+from seed_manager import bulk_load_knowledge
 
 def sync_knowledge():
     db = SessionLocal()
     try:
-        current_patterns = {k.pattern for k in db.query(AIKnowledge).all()}
-        new_count = 0
-        
-        print(f"Syncing Knowledge Base... (Current count: {len(current_patterns)})")
-        
-        for item in ALMATY_DATASET:
-            if item["pattern"] not in current_patterns:
-                knowledge = AIKnowledge(
-                    category=item["category"],
-                    pattern=item["pattern"],
-                    response=item["response"],
-                    language=item["language"],
-                    importance=item.get("importance", 1)
-                )
-                db.add(knowledge)
-                new_count += 1
-        
-        db.commit()
-        print(f"Sync complete. Added {new_count} new knowledge entries.")
+        print(f"Syncing Knowledge Base... ({len(ALMATY_DATASET)} dataset entries)")
+        stats = bulk_load_knowledge(db, ALMATY_DATASET)
+        print(f"Sync complete. Added {stats.inserted} new knowledge entries, skipped {stats.skipped}.")
     except Exception as e:
         print(f"Error syncing knowledge: {e}")
         db.rollback()
@@ -0,0 +1,75 @@
+import os
+import pathlib
+import sys
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from activity_log import ActivityLogWriter
+from database import ActivityLog, Base
+
+
+class ActivityLogWriterTests(unittest.TestCase):
+    def setUp(self) -> None:
+        # One shared connection: the writer flushes from its own thread.
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        self.Session = sessionmaker(bind=engine)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.spill = os.path.join(self.tmp.name, "spill.ndjson")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def rows(self) -> int:
+        db = self.Session()
+        try:
+            return db.query(ActivityLog).count()
+        finally:
+            db.close()
+
+    def test_events_are_written_in_batches(self) -> None:
+        writer = ActivityLogWriter(self.Session, batch_size=50, flush_interval_ms=20, spill_path=self.spill)
+        writer.start()
+        for i in range(120):
+            self.assertTrue(writer.log(i, "LOGIN", "User logged in"))
+        writer.stop()
+        self.assertEqual(self.rows(), 120)
+        stats = writer.stats()
+        self.assertEqual((stats["enqueued"], stats["written"], stats["dropped"]), (120, 120, 0))
+        self.assertEqual(stats["queue_depth"], 0)
+
+    def test_full_queue_drops_instead_of_blocking(self) -> None:
+        writer = ActivityLogWriter(self.Session, max_queue=3, spill_path=self.spill)
+        results = [writer.log(1, "AI_QUERY") for _ in range(5)]
+        self.assertEqual(results, [True, True, True, False, False])
+        self.assertEqual(writer.stats()["dropped"], 2)
+        self.assertEqual(writer.stats()["queue_depth"], 3)
+
+    def test_unwritable_events_are_spilled_and_replayed(self) -> None:
+        def broken():
+            raise RuntimeError("database is locked")
+
+        failing = ActivityLogWriter(broken, spill_path=self.spill)
+        failing.log(7, "REPORT_FILED", "Filed report: ROAD")
+        failing.log(8, "LOGIN")
+        failing.stop()
+        self.assertEqual(failing.stats()["spilled"], 2)
+        self.assertTrue(os.path.exists(self.spill))
+
+        writer = ActivityLogWriter(self.Session, spill_path=self.spill)
+        self.assertEqual(writer.replay_spill(), 2)
+        self.assertFalse(os.path.exists(self.spill))
+        db = self.Session()
+        self.assertEqual(db.query(ActivityLog).filter_by(user_id=7).one().details, "Filed report: ROAD")
+        db.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
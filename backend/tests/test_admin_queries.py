@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+import pathlib
+import sys
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from admin_queries import export_users, users_page
+from database import ActivityLog, Base, CitizenReport, User
+
+
+class AdminUsersQueryTests(unittest.TestCase):
+    def setUp(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        self.Session = sessionmaker(bind=engine)
+        db = self.Session()
+        db.add_all([User(id=i, email=f"u{i}@x", username=f"user{i}") for i in range(1, 8)])
+        # user i has (i % 3) actions; user 2 filed two reports
+        db.add_all([ActivityLog(user_id=i, action="LOGIN") for i in range(1, 8) for _ in range(i % 3)])
+        db.add_all([CitizenReport(user_id=2, category="ROAD"), CitizenReport(user_id=2, category="ROAD")])
+        db.commit()
+        self.db = db
+
+    def tearDown(self) -> None:
+        self.db.close()
+
+    def collect(self, sort: str, limit: int):
+        rows, cursor, pages = [], None, 0
+        while True:
+            page, cursor = users_page(self.db, limit=limit, cursor=cursor, sort=sort)
+            rows += page
+            pages += 1
+            if cursor is None:
+                return rows, pages
+
+    def test_id_pages_cover_all_users_with_counts(self) -> None:
+        rows, pages = self.collect("id", 3)
+        self.assertEqual([r["id"] for r in rows], list(range(1, 8)))
+        self.assertEqual(pages, 3)
+        by_id = {r["id"]: r for r in rows}
+        self.assertEqual((by_id[2]["reports_count"], by_id[2]["actions_count"]), (2, 2))
+        self.assertEqual((by_id[3]["reports_count"], by_id[3]["actions_count"]), (0, 0))
+
+    def test_activity_sort_pages_without_gaps(self) -> None:
+        rows, _ = self.collect("activity", 2)
+        self.assertEqual([(r["actions_count"], r["id"]) for r in rows],
+                         [(2, 5), (2, 2), (1, 7), (1, 4), (1, 1), (0, 6), (0, 3)])
+
+    def test_bad_cursor_and_sort(self) -> None:
+        with self.assertRaises(ValueError):
+            users_page(self.db, cursor="abc")
+        with self.assertRaises(ValueError):
+            users_page(self.db, sort="email")
+
+    def test_exports(self) -> None:
+        lines = "".join(export_users(self.Session, "ndjson")).splitlines()
+        self.assertEqual(len(lines), 7)
+        self.assertEqual(json.loads(lines[1])["reports_count"], 2)
+
+        table = list(csv.DictReader(io.StringIO("".join(export_users(self.Session, "csv")))))
+        self.assertEqual([r["id"] for r in table], [str(i) for i in range(1, 8)])
+        self.assertEqual(table[1]["actions_count"], "2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import pathlib
+import sys
+import threading
+import unittest
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from ai_warmup import FAILED, READY, WarmupOrchestrator
+
+
+class WarmupOrchestratorTests(unittest.TestCase):
+    def test_dependents_wait_for_their_inputs(self) -> None:
+        order = []
+        gate = threading.Event()
+        warmup = WarmupOrchestrator()
+        warmup.register("router", lambda: (gate.wait(5), order.append("router")))
+        warmup.register("ai", lambda: order.append("ai"), depends_on=("router",))
+        warmup.start()
+
+        self.assertFalse(warmup.is_ready())
+        self.assertFalse(warmup.is_settled())
+        gate.set()
+        self.assertTrue(warmup.wait_settled(5))
+        self.assertEqual(order, ["router", "ai"])
+        self.assertTrue(warmup.is_ready())
+
+        snapshot = warmup.snapshot()
+        self.assertTrue(snapshot["ready"])
+        self.assertEqual(snapshot["components"]["ai"]["status"], READY)
+        self.assertIsNotNone(snapshot["components"]["router"]["duration_ms"])
+
+    def test_failed_component_settles_but_is_not_ready(self) -> None:
+        def broken() -> None:
+            raise RuntimeError("model file missing")
+
+        warmup = WarmupOrchestrator()
+        warmup.register("neural", broken)
+        warmup.register("retriever", lambda: None)
+        warmup.start()
+
+        self.assertTrue(warmup.wait_settled(5))
+        self.assertFalse(warmup.is_ready())
+        neural = warmup.snapshot()["components"]["neural"]
+        self.assertEqual(neural["status"], FAILED)
+        self.assertIn("model file missing", neural["error"])
+
+    def test_failed_component_is_retried_until_ready(self) -> None:
+        calls = []
+
+        def flaky() -> None:
+            calls.append(1)
+            if len(calls) < 3:
+                raise RuntimeError("index locked")
+
+        warmup = WarmupOrchestrator(retry_base_seconds=0.01)
+        warmup.register("retriever", flaky)
+        warmup.start()
+
+        self.assertTrue(warmup.wait_settled(5))
+        # Settled after the first failure, but not ready until a retry succeeds.
+        self.assertTrue(warmup.wait_ready("retriever", 5))
+        self.assertTrue(warmup.is_ready())
+        self.assertTrue(warmup.wait_ready("not_registered", 0))
+        retriever = warmup.snapshot()["components"]["retriever"]
+        self.assertEqual((retriever["status"], retriever["attempts"], retriever["error"]), (READY, 3, ""))
+        self.assertEqual(warmup.status("retriever"), READY)
+
+    def test_not_started_is_not_ready(self) -> None:
+        warmup = WarmupOrchestrator()
+        warmup.register("router", lambda: None)
+        self.assertFalse(warmup.is_ready())
+        self.assertFalse(warmup.snapshot()["started"])
+
+
+if __name__ == "__main__":
+    unittest.main()
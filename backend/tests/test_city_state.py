@@ -0,0 +1,84 @@
+import datetime
+import pathlib
+import sys
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from city_state import CityStateCache, traffic_model
+from database import Base, SensorReading
+
+
+class FakeClock:
+    def __init__(self, now: datetime.datetime) -> None:
+        self.now = now
+
+    def __call__(self) -> datetime.datetime:
+        return self.now
+
+
+class CityStateTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock(datetime.datetime(2026, 6, 1, 9, 0, 0))
+        self.city = CityStateCache(clock=self.clock)
+
+    def test_ingested_readings_keep_newest_per_signal(self) -> None:
+        t = self.clock.now
+        self.city.apply_readings([
+            {"sensor_type": "AQI", "value": 80.0, "timestamp": t - datetime.timedelta(seconds=30)},
+            {"sensor_type": "AQI", "value": 95.0, "timestamp": t - datetime.timedelta(seconds=5)},
+            {"sensor_type": "NOISE", "value": 60.0, "timestamp": t},
+        ])
+        # An older batch (e.g. a late sensor) must not overwrite the newer value.
+        self.city.apply_readings([{"sensor_type": "AQI", "value": 10.0, "timestamp": t - datetime.timedelta(minutes=1)}])
+        self.assertEqual(self.city.value("aqi"), 95.0)
+        self.assertIsNone(self.city.get("noise"))
+
+        meta = self.city.freshness(["aqi", "pm25"])
+        self.assertEqual(meta["aqi"]["age_seconds"], 5.0)
+        self.assertFalse(meta["aqi"]["stale"])
+        self.assertIsNone(meta["pm25"])
+
+        self.clock.now += datetime.timedelta(hours=1)
+        self.assertTrue(self.city.is_stale("aqi"))
+
+    def test_refresh_sensors_reads_latest_rows(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        t = self.clock.now
+        db.add_all([
+            SensorReading(sensor_type="AQI", value=40, timestamp=t - datetime.timedelta(hours=1)),
+            SensorReading(sensor_type="AQI", value=70, timestamp=t - datetime.timedelta(minutes=1)),
+            SensorReading(sensor_type="TRAFFIC", value=6, timestamp=t - datetime.timedelta(minutes=2)),
+        ])
+        db.commit()
+        self.city.refresh_sensors(db)
+        db.close()
+        self.assertEqual((self.city.value("aqi"), self.city.value("traffic")), (70.0, 6.0))
+        self.assertEqual(self.city.get("aqi").source, "sensor_readings")
+
+    def test_upstream_values_carry_their_age(self) -> None:
+        self.city.apply_air_quality({"european_aqi": 33, "pm2_5": 7.5}, age_seconds=90)
+        self.city.apply_weather({"temperature_2m": 21.5})
+        self.assertEqual(self.city.value("air_quality")["aqi"], 33)
+        self.assertEqual(self.city.value("weather")["temperature"], 21.5)
+        self.assertEqual(self.city.freshness(["air_quality"])["air_quality"]["age_seconds"], 90.0)
+        # A cached copy older than what we already hold does not replace it.
+        self.city.apply_air_quality({"european_aqi": 80}, age_seconds=600)
+        self.assertEqual(self.city.value("air_quality")["aqi"], 33)
+
+    def test_traffic_model_rush_hour(self) -> None:
+        rush = traffic_model(datetime.datetime(2026, 6, 1, 9, 0))  # Monday
+        night = traffic_model(datetime.datetime(2026, 6, 1, 3, 0))
+        self.assertGreaterEqual(rush["congestion_level"], 7)
+        self.assertLessEqual(night["congestion_level"], 4)
+        self.assertEqual(rush, traffic_model(datetime.datetime(2026, 6, 1, 9, 0, 59)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import json
+import pathlib
+import sys
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from database import Base, EmergencyUnit
+from emergency_dispatch import assign_units
+from emergency_sim import CITY_BOUNDS, UnitSimulation
+
+
+class UnitSimulationTests(unittest.TestCase):
+    def setUp(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        self.Session = sessionmaker(bind=engine)
+        db = self.Session()
+        db.add_all([
+            EmergencyUnit(id="POLICE_100", type="POLICE", status="PATROLLING", lat=43.24, lng=76.90, heading=0),
+            EmergencyUnit(id="FIRE_101", type="FIRE", status="AVAILABLE", lat=43.25, lng=76.92, heading=90),
+            EmergencyUnit(id="AMBULANCE_102", type="AMBULANCE", status="ON_SCENE", lat=43.26, lng=76.95, heading=180),
+        ])
+        db.commit()
+        db.close()
+        self.sim = UnitSimulation(seed=1)
+        self.sim.ensure_loaded(self.Session)
+
+    def unit(self, unit_id: str) -> dict:
+        return next(u for u in self.sim.snapshot().units if u["id"] == unit_id)
+
+    def test_snapshot_is_immutable_between_ticks(self) -> None:
+        first = self.sim.snapshot()
+        self.assertIs(self.sim.snapshot(), first)
+        self.assertEqual([u["id"] for u in json.loads(first.body)], ["AMBULANCE_102", "FIRE_101", "POLICE_100"])
+        self.sim.step()
+        self.assertIsNot(self.sim.snapshot(), first)
+        self.assertEqual(self.sim.snapshot().tick, first.tick + 1)
+
+    def test_patrol_moves_and_stays_in_bounds(self) -> None:
+        start = dict(self.unit("POLICE_100"))
+        for _ in range(3600):
+            self.sim.step(dt=5.0)
+        moved = self.unit("POLICE_100")
+        self.assertNotEqual((moved["lat"], moved["lng"]), (start["lat"], start["lng"]))
+        min_lat, min_lng, max_lat, max_lng = CITY_BOUNDS
+        for u in self.sim.snapshot().units:
+            self.assertTrue(min_lat <= u["lat"] <= max_lat and min_lng <= u["lng"] <= max_lng)
+        # Units on scene do not move.
+        self.assertEqual((self.unit("AMBULANCE_102")["lat"], self.unit("AMBULANCE_102")["lng"]), (43.26, 76.95))
+
+    def test_dispatched_unit_reaches_target(self) -> None:
+        self.sim.dispatch("FIRE_101", 43.27, 76.93)
+        self.assertEqual(self.unit("FIRE_101")["status"], "EN_ROUTE")
+        for _ in range(300):
+            self.sim.step(dt=1.0)
+            if self.unit("FIRE_101")["status"] == "ON_SCENE":
+                break
+        fire = self.unit("FIRE_101")
+        self.assertEqual((fire["status"], fire["lat"], fire["lng"]), ("ON_SCENE", 43.27, 76.93))
+
+    def test_persist_writes_positions_and_load_picks_up_new_units(self) -> None:
+        self.sim.step(dt=10.0)
+        db = self.Session()
+        self.assertEqual(self.sim.persist(db), 3)
+        stored = db.get(EmergencyUnit, "POLICE_100")
+        self.assertAlmostEqual(stored.lat, self.unit("POLICE_100")["lat"])
+        self.assertIsNotNone(stored.last_update)
+
+        db.add(EmergencyUnit(id="POLICE_103", type="POLICE", status="AVAILABLE", lat=43.2, lng=76.9, heading=0))
+        db.commit()
+        self.assertEqual(self.sim.load(db), 1)
+        db.close()
+        self.assertEqual(len(self.sim.snapshot().units), 4)
+
+    def test_en_route_units_resume_after_restart(self) -> None:
+        self.sim.dispatch("FIRE_101", 43.27, 76.93)
+        db = self.Session()
+        db.add(EmergencyUnit(id="POLICE_103", type="POLICE", status="EN_ROUTE", lat=43.2, lng=76.9, heading=0))
+        db.commit()
+        self.sim.persist(db)
+
+        restarted = UnitSimulation(seed=1)
+        self.assertEqual(restarted.load(db), 4)
+        db.close()
+        units = {u["id"]: u for u in restarted.snapshot().units}
+        # A seeded EN_ROUTE unit has nowhere to go, so it becomes dispatchable.
+        self.assertEqual((units["FIRE_101"]["status"], units["POLICE_103"]["status"]), ("EN_ROUTE", "AVAILABLE"))
+        for _ in range(300):
+            restarted.step(dt=1.0)
+        fire = next(u for u in restarted.snapshot().units if u["id"] == "FIRE_101")
+        self.assertEqual((fire["status"], fire["lat"], fire["lng"]), ("ON_SCENE", 43.27, 76.93))
+
+    def test_nearest_follows_moving_units_and_skips_busy_ones(self) -> None:
+        nearest = self.sim.nearest(43.25, 76.92, k=5)
+        # AMBULANCE_102 is ON_SCENE, so not available.
+        self.assertEqual([u["id"] for u in nearest], ["FIRE_101", "POLICE_100"])
+        self.assertEqual(self.sim.nearest(43.25, 76.92, k=5, unit_types=("POLICE",))[0]["id"], "POLICE_100")
+
+        self.sim.dispatch("POLICE_100", 43.30, 77.05)
+        self.assertEqual([u["id"] for u in self.sim.nearest(43.25, 76.92, k=5)], ["FIRE_101"])
+        for _ in range(60):
+            self.sim.step(dt=60.0)
+        police = self.unit("POLICE_100")
+        self.assertEqual(police["status"], "ON_SCENE")
+        within = self.sim.within(43.30, 77.05, 100.0, statuses=("ON_SCENE",))
+        self.assertEqual([u["id"] for u in within], ["POLICE_100"])
+
+    def test_released_units_can_be_dispatched_again(self) -> None:
+        incident = {"id": 1, "type": "FIRE", "severity": "HIGH", "lat": 43.27, "lng": 76.93}
+        (first,) = assign_units([incident], *self.sim.positions())
+        self.assertEqual(first.unit_id, "FIRE_101")
+        self.sim.dispatch(first.unit_id, incident["lat"], incident["lng"])
+        for _ in range(300):
+            self.sim.step(dt=1.0)
+            if self.unit("FIRE_101")["status"] == "ON_SCENE":
+                break
+        self.assertEqual(self.unit("FIRE_101")["status"], "ON_SCENE")
+        self.assertEqual(assign_units([dict(incident, id=2)], *self.sim.positions()), [])
+
+        # Resolving the incident releases its units; unknown ids are ignored.
+        self.assertEqual(self.sim.release(["FIRE_101", "FIRE_999"]), ["FIRE_101"])
+        self.assertEqual(self.unit("FIRE_101")["status"], "AVAILABLE")
+        (second,) = assign_units([dict(incident, id=2)], *self.sim.positions())
+        self.assertEqual(second.unit_id, "FIRE_101")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import pathlib
+import sys
+import unittest
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from external_data_loader import get_dataset_registry, load_external_datasets
+
+
+class DatasetRegistryTests(unittest.TestCase):
+    def test_sampling_is_deterministic_and_parses_once(self) -> None:
+        registry = get_dataset_registry()
+        registry.clear()
+        first = load_external_datasets(limit_per_file=200)
+        second = load_external_datasets(limit_per_file=200)
+        third = load_external_datasets(limit_per_file=500)
+
+        self.assertEqual([r["pattern"] for r in first], [r["pattern"] for r in second])
+        self.assertGreater(len(third), len(first))
+        self.assertTrue(registry.parse_counts)
+        self.assertTrue(all(count == 1 for count in registry.parse_counts.values()))
+
+    def test_different_seed_changes_sample(self) -> None:
+        a = load_external_datasets(limit_per_file=50, seed=1)
+        b = load_external_datasets(limit_per_file=50, seed=2)
+        self.assertNotEqual([r["pattern"] for r in a], [r["pattern"] for r in b])
+
+    def test_records_are_read_only(self) -> None:
+        records = load_external_datasets(limit_per_file=10)
+        self.assertTrue(records)
+        with self.assertRaises(TypeError):
+            records[0]["pattern"] = "mutated"
+        copy = records[0].copy()
+        copy["pattern"] = "mutated"
+        self.assertNotEqual(records[0]["pattern"], "mutated")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import datetime
+import pathlib
+import sys
+import unittest
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from database import Base
+from forecasting import HORIZONS, ForecastCache, HourlyHistory, dashboard_forecasts, fill_gaps, fit_forecasts, is_stale, load_history
+from timeseries import record_readings
+
+
+def seasonal(days: int, base: float, amplitude: float, noise: float, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(days * 24)
+    return base + amplitude * np.sin(2 * np.pi * t / 24) + rng.normal(0, noise, size=len(t))
+
+
+class ForecastingTests(unittest.TestCase):
+    start = datetime.datetime(2026, 4, 6)
+
+    def test_fill_gaps(self) -> None:
+        values = np.array([[np.nan, 1.0, np.nan, 3.0], [2.0, np.nan, np.nan, np.nan]])
+        np.testing.assert_array_equal(fill_gaps(values), [[1.0, 1.0, 1.0, 3.0], [2.0, 2.0, 2.0, 2.0]])
+
+    def test_backtest_prefers_seasonal_models_on_daily_cycle(self) -> None:
+        y = np.stack([seasonal(21, 100, 40, 2, 1), seasonal(21, 5, 3, 0.2, 2)])
+        forecasts = fit_forecasts(HourlyHistory(["AQI", "TRAFFIC"], self.start, y))
+        aqi = forecasts["AQI"]
+        self.assertIn(aqi.model, ("holt_winters", "ridge"))
+        self.assertLess(np.mean(aqi.mae[aqi.model]), np.mean(aqi.mae["seasonal_naive"]))
+        # The next three hours continue the sine wave within a few units.
+        t = np.arange(y.shape[1], y.shape[1] + len(HORIZONS))
+        expected = 100 + 40 * np.sin(2 * np.pi * t / 24)
+        self.assertTrue(np.all(np.abs(aqi.values - expected) < 8))
+        self.assertTrue(np.all(aqi.half_width > 0))
+        self.assertEqual(forecasts["TRAFFIC"].history_hours, 21 * 24)
+
+    def test_short_history_falls_back(self) -> None:
+        y = np.array([seasonal(2, 50, 10, 0, 3)[:30], np.full(30, 4.0)])
+        forecasts = fit_forecasts(HourlyHistory(["AQI", "TRAFFIC"], self.start, y))
+        self.assertEqual(forecasts["AQI"].model, "seasonal_naive")
+        np.testing.assert_allclose(forecasts["AQI"].values, y[0, 30 - 24 + np.array(HORIZONS) - 1])
+
+        tiny = fit_forecasts(HourlyHistory(["AQI"], self.start, np.array([[7.0, 9.0]])))
+        self.assertEqual(tiny["AQI"].model, "persistence")
+        np.testing.assert_array_equal(tiny["AQI"].values, [9.0, 9.0, 9.0])
+
+    def test_cache_serves_dashboard_cards_from_rollups(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        db = Session()
+        now = datetime.datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        aqi = seasonal(4, 80, 20, 1, 4)
+        record_readings(db, [
+            {"sensor_type": t, "value": float(v if t == "AQI" else v / 20), "timestamp": now - datetime.timedelta(hours=len(aqi) - i)}
+            for i, v in enumerate(aqi) for t in ("AQI", "TRAFFIC")
+        ])
+        db.commit()
+        history = load_history(db)
+        db.close()
+        self.assertEqual(history.sensor_types, ["AQI", "TRAFFIC"])
+        self.assertEqual(history.values.shape, (2, len(aqi)))
+
+        cache = ForecastCache(Session)
+        payload = cache.get()
+        self.assertIs(cache.get(), payload)
+        points = payload["series"]["AQI"]["points"]
+        self.assertEqual([p["horizon_hours"] for p in points], list(HORIZONS))
+        self.assertTrue(all(p["lower"] <= p["value"] <= p["upper"] for p in points))
+
+        # Cards count from the last hour with data, shown in local time.
+        origin = now - datetime.timedelta(hours=1)
+        self.assertEqual(payload["origin"], origin.isoformat())
+        cards = dashboard_forecasts(payload, now)
+        expected = [(origin + datetime.timedelta(hours=h)).replace(tzinfo=datetime.timezone.utc).astimezone().strftime("%H:00")
+                    for h in HORIZONS]
+        self.assertEqual([c["time"] for c in cards], expected)
+        self.assertTrue(all(1 <= c["traffic_prediction"] <= 10 and 50 <= c["confidence"] <= 99 for c in cards))
+        self.assertFalse(any(c["stale"] for c in cards))
+
+        # Data that stopped arriving a day ago is flagged, not relabelled as the coming hours.
+        later = now + datetime.timedelta(days=1)
+        self.assertTrue(is_stale(payload, later))
+        self.assertEqual([c["time"] for c in dashboard_forecasts(payload, later)], expected)
+        self.assertTrue(all(c["stale"] for c in dashboard_forecasts(payload, later)))
+
+
+if __name__ == "__main__":
+    unittest.main()
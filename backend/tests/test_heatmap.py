@@ -0,0 +1,127 @@
+import datetime
+import json
+import pathlib
+import sys
+import unittest
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from database import Base, CitizenReport, SensorReading
+from heatmap import ALMATY_BBOX, Grid, HeatmapStore
+
+
+class GridTests(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(5)
+        min_lng, min_lat, max_lng, max_lat = ALMATY_BBOX
+        self.lat = rng.uniform(min_lat, max_lat, 5000)
+        self.lng = rng.uniform(min_lng, max_lng, 5000)
+
+    def local_m(self, lat, lng):
+        return lat * 111_320.0, lng * 111_320.0 * np.cos(np.radians(43.25))
+
+    def test_points_fall_in_their_cell(self) -> None:
+        for kind, max_offset in (("square", 250 / np.sqrt(2)), ("hex", 250 / np.sqrt(3))):
+            grid = Grid(kind, 250.0)
+            cells = grid.index(self.lat, self.lng)
+            self.assertTrue(((cells >= 0) & (cells < grid.size)).all())
+            c_lat, c_lng = grid.centers(cells)
+            (y, x), (cy, cx) = self.local_m(self.lat, self.lng), self.local_m(c_lat, c_lng)
+            self.assertLessEqual(np.hypot(x - cx, y - cy).max(), max_offset + 1.0)
+
+    def test_hex_cell_is_the_nearest_centre(self) -> None:
+        grid = Grid("hex", 400.0)
+        cells = grid.index(self.lat[:500], self.lng[:500])
+        candidates = np.unique(cells)
+        c_lat, c_lng = grid.centers(candidates)
+        (y, x), (cy, cx) = self.local_m(self.lat[:500], self.lng[:500]), self.local_m(c_lat, c_lng)
+        nearest = candidates[np.hypot(x[:, None] - cx[None, :], y[:, None] - cy[None, :]).argmin(axis=1)]
+        np.testing.assert_array_equal(nearest, cells)
+
+    def test_outside_bbox_is_dropped(self) -> None:
+        cells = Grid("square", 250.0).index(np.array([43.0, 43.25]), np.array([76.9, 77.5]))
+        self.assertEqual(cells.tolist(), [-1, -1])
+
+
+class HeatmapStoreTests(unittest.TestCase):
+    def setUp(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        self.now = datetime.datetime(2026, 5, 1, 12, 0, 0)
+        self.db.add_all(
+            [CitizenReport(category="ROADS", lat=43.25, lng=76.90, created_at=self.now - datetime.timedelta(days=d))
+             for d in range(5)]
+            + [CitizenReport(category="LIGHTING", lat=43.20, lng=77.00, created_at=self.now) for _ in range(3)]
+            + [CitizenReport(category="ROADS", lat=44.0, lng=76.90, created_at=self.now)]  # outside Almaty
+        )
+        self.db.add_all([
+            SensorReading(sensor_type="NOISE", value=v, lat=43.25, lng=76.90, timestamp=self.now) for v in (50, 70)
+        ] + [SensorReading(sensor_type="NOISE", value=99, timestamp=self.now)])
+        self.db.commit()
+        self.store = HeatmapStore()
+
+    def tearDown(self) -> None:
+        self.db.close()
+
+    def heatmap(self, layer: str, **params) -> dict:
+        return json.loads(self.store.heatmap(self.db, layer, **params))
+
+    def test_counts_per_cell(self) -> None:
+        result = self.heatmap("reports")
+        self.assertEqual(result["total"], 8)
+        self.assertEqual(sorted(result["cells"]["count"]), [3, 5])
+        self.assertEqual(result["max"], 5.0)
+        self.assertNotIn("value", result["cells"])
+
+    def test_time_window_and_category_filters(self) -> None:
+        recent = self.heatmap("reports", start=self.now - datetime.timedelta(days=1, hours=1))
+        self.assertEqual(recent["total"], 5)
+        roads = self.heatmap("reports", categories=["roads"], end=self.now)
+        self.assertEqual(roads["total"], 4)
+        self.assertEqual(self.heatmap("reports", categories=["NOPE"])["total"], 0)
+
+    def test_mixed_case_categories_match_any_spelling(self) -> None:
+        self.db.add_all([CitizenReport(category="Manual Citizen Report", lat=43.25, lng=76.90, created_at=self.now)
+                         for _ in range(3)])
+        self.db.commit()
+        for spelling in ("Manual Citizen Report", "manual citizen report", " MANUAL CITIZEN REPORT "):
+            self.assertEqual(self.heatmap("reports", categories=[spelling])["total"], 3)
+
+    def test_aware_bounds_are_converted_to_utc(self) -> None:
+        almaty = datetime.timezone(datetime.timedelta(hours=5))
+        start = (self.now - datetime.timedelta(days=1, hours=1)).replace(tzinfo=datetime.timezone.utc)
+        self.assertEqual(self.heatmap("reports", start=start)["total"], 5)
+        # 17:00 in Almaty is 12:00 UTC, so the window ends just before `now`.
+        end = datetime.datetime(2026, 5, 1, 17, 0, 0, tzinfo=almaty)
+        self.assertEqual(self.heatmap("reports", end=end)["total"], 4)
+
+    def test_reading_values_and_untagged_rows(self) -> None:
+        mean = self.heatmap("readings", agg="mean", grid="hex")
+        self.assertEqual(mean["total"], 2)
+        self.assertEqual(mean["cells"]["value"], [60.0])
+        self.assertEqual(self.heatmap("readings", agg="sum")["cells"]["value"], [120.0])
+
+    def test_insert_invalidates_cached_result(self) -> None:
+        first = self.store.heatmap(self.db, "reports")
+        self.assertIs(self.store.heatmap(self.db, "reports"), first)
+        self.db.add(CitizenReport(category="ROADS", lat=43.25, lng=76.90, created_at=self.now))
+        self.db.commit()
+        self.assertEqual(json.loads(self.store.heatmap(self.db, "reports"))["total"], 9)
+        self.assertEqual(self.store.stats()["layers"]["reports"]["points"], 10)
+
+    def test_bad_parameters(self) -> None:
+        for params in ({"grid": "tri"}, {"agg": "median"}, {"cell_m": 1.0}):
+            with self.assertRaises(ValueError):
+                self.store.heatmap(self.db, "reports", **params)
+        with self.assertRaises(ValueError):
+            self.store.heatmap(self.db, "buses")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,7 +5,7 @@ import unittest
 
 sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
 
-from local_retriever import get_local_retriever
+from local_retriever import _collapse_near_duplicates, _Doc, get_local_retriever
 
 
 class LocalRetrieverTests(unittest.TestCase):
@@ -32,6 +32,29 @@ class LocalRetrieverTests(unittest.TestCase):
         self.assertNotEqual(results[0].category, "CHAT")
         self.assertIn(results[0].category, {"ECOLOGY", "WEATHER", "CITY_INFO", "GENERAL"})
 
+    def test_near_duplicates_collapse_only_within_a_category(self) -> None:
+        text = "Almaty metro has eleven stations on one line running from Boralday to Moskva"
+
+        def doc(body: str, source: str, category: str) -> _Doc:
+            return _Doc(text=body, source=source, category=category, reliability_weight=1.0, tokens=set())
+
+        docs = [
+            doc(text, "almaty_dataset", "TRANSPORT"),
+            doc(text + ".", "external_dataset", "TRANSPORT"),
+            doc(text + "!", "website_knowledge_dataset", "CITY_INFO"),
+            doc(text, "conversation_dataset", "CHAT"),
+            doc("Call 112 for any emergency", "almaty_dataset", "EMERGENCY"),
+        ]
+        kept = _collapse_near_duplicates(docs)
+        self.assertEqual([(d.source, d.category) for d in kept], [
+            ("almaty_dataset", "TRANSPORT"),
+            ("website_knowledge_dataset", "CITY_INFO"),
+            ("almaty_dataset", "EMERGENCY"),
+        ])
+        # The exact copy collapses across categories; the near-duplicate only within TRANSPORT.
+        self.assertEqual(sorted(kept[0].aliases), [(text, "conversation_dataset"), (text + ".", "external_dataset")])
+        self.assertEqual(kept[1].aliases, [])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,119 @@
+import pathlib
+import random
+import sys
+import unittest
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from database import Base, CitizenReport, EmergencyIncident
+from map_tiles import (
+    CLUSTER_MAX_ZOOM, backfill_quadkeys, build_tile, get_tile_cache, parse_bbox, points_page, quadkey,
+    tile_bounds, tile_quadkey, tile_xy,
+)
+
+
+class TileMathTests(unittest.TestCase):
+    def test_quadkey_prefix_is_parent_tile(self) -> None:
+        key = quadkey(43.2389, 76.8897)
+        self.assertEqual(len(key), 18)
+        for zoom in (0, 5, 12, 17):
+            self.assertEqual(tile_quadkey(zoom, *tile_xy(43.2389, 76.8897, zoom)), key[:zoom])
+
+    def test_tile_bounds_contain_point(self) -> None:
+        x, y = tile_xy(43.2389, 76.8897, 14)
+        min_lng, min_lat, max_lng, max_lat = tile_bounds(14, x, y)
+        self.assertTrue(min_lng <= 76.8897 < max_lng and min_lat < 43.2389 <= max_lat)
+
+    def test_parse_bbox_rejects_garbage(self) -> None:
+        self.assertEqual(parse_bbox("76.8,43.2,77,43.3"), (76.8, 43.2, 77.0, 43.3))
+        with self.assertRaises(ValueError):
+            parse_bbox("76.8,43.2")
+        with self.assertRaises(ValueError):
+            parse_bbox("77,43.2,76.8,43.3")
+
+
+class MapQueryTests(unittest.TestCase):
+    def setUp(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        rng = random.Random(3)
+        self.db.add_all([
+            CitizenReport(category="ROADS", description=f"r{i}", lat=43.20 + rng.random() * 0.1,
+                          lng=76.85 + rng.random() * 0.1)
+            for i in range(400)
+        ])
+        self.db.commit()
+        get_tile_cache().clear()
+
+    def tearDown(self) -> None:
+        self.db.close()
+
+    def test_orm_writes_stamp_quadkey(self) -> None:
+        report = self.db.query(CitizenReport).first()
+        self.assertEqual(report.quadkey, quadkey(report.lat, report.lng))
+        report.lat += 0.05
+        self.db.commit()
+        self.assertEqual(report.quadkey, quadkey(report.lat, report.lng))
+
+    def test_backfill_fills_rows_written_without_orm(self) -> None:
+        self.db.execute(text("INSERT INTO emergency_incidents (type, lat, lng, status) VALUES ('FIRE', 43.25, 76.9, 'ACTIVE')"))
+        self.db.commit()
+        self.assertEqual(backfill_quadkeys(self.db), 1)
+        self.assertEqual(self.db.query(EmergencyIncident).one().quadkey, quadkey(43.25, 76.9))
+        self.assertEqual(backfill_quadkeys(self.db), 0)
+
+    def test_clustered_tiles_account_for_every_row(self) -> None:
+        x, y = tile_xy(43.25, 76.9, 10)
+        tile = build_tile(self.db, "reports", 10, x, y)
+        self.assertLessEqual(len(tile["clusters"]), 64)
+        self.assertEqual(sum(c["count"] for c in tile["clusters"]) + len(tile["points"]), 400)
+        self.assertTrue(all(c["count"] > 1 for c in tile["clusters"]))
+
+    def test_point_zoom_tiles_are_unclustered(self) -> None:
+        report = self.db.query(CitizenReport).first()
+        x, y = tile_xy(report.lat, report.lng, CLUSTER_MAX_ZOOM)
+        tile = build_tile(self.db, "reports", CLUSTER_MAX_ZOOM, x, y)
+        self.assertEqual(tile["clusters"], [])
+        self.assertIn(report.id, [p["id"] for p in tile["points"]])
+
+    def test_viewport_is_cached_and_commit_invalidates_touched_tiles(self) -> None:
+        cache = get_tile_cache()
+        bbox = (76.85, 43.20, 76.95, 43.30)
+        first = cache.viewport(self.db, "reports", bbox, 12)
+        self.assertEqual(sum(c["count"] for c in first["clusters"]) + len(first["points"]), 400)
+        self.assertIs(cache.viewport(self.db, "reports", bbox, 12)["clusters"][0], first["clusters"][0])
+        hits = cache.stats()["hits"]
+        self.assertEqual(hits, first["tiles"])
+
+        self.db.add(CitizenReport(category="ROADS", lat=43.25, lng=76.90))
+        self.db.commit()
+        again = cache.viewport(self.db, "reports", bbox, 12)
+        self.assertEqual(sum(c["count"] for c in again["clusters"]) + len(again["points"]), 401)
+        self.assertEqual(cache.stats()["hits"], hits + first["tiles"] - 1)
+
+    def test_too_many_tiles_is_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            get_tile_cache().viewport(self.db, "reports", (76.0, 43.0, 78.0, 44.0), 14)
+
+    def test_keyset_pages_cover_bbox_exactly_once(self) -> None:
+        bbox = (76.85, 43.20, 76.90, 43.25)
+        seen, cursor = [], None
+        while True:
+            rows, cursor = points_page(self.db, "reports", limit=30, cursor=cursor, bbox=bbox)
+            seen += [r["id"] for r in rows]
+            if cursor is None:
+                break
+        expected = [r.id for r in self.db.query(CitizenReport).order_by(CitizenReport.id)
+                    if 43.20 <= r.lat <= 43.25 and 76.85 <= r.lng <= 76.90]
+        self.assertEqual(seen, expected)
+        with self.assertRaises(ValueError):
+            points_page(self.db, "reports", cursor="abc")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import asyncio
+import json
+import pathlib
+import sys
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from messenger_hub import MessengerHub, get_messenger_hub, messenger_ws_router
+
+
+class MessengerHubTests(unittest.TestCase):
+    def test_fanout_and_unread_deltas(self) -> None:
+        async def scenario():
+            hub = MessengerHub()
+            alice = hub.connect(1, [10])
+            bob = hub.connect(2, [10, 11])
+            hub.publish_message(10, {"id": 5, "sender_id": 1, "content": "hi"})
+            hub.publish_read(10, 2)
+            return hub, [json.loads(alice.queue.get_nowait()) for _ in range(alice.queue.qsize())], \
+                [json.loads(bob.queue.get_nowait()) for _ in range(bob.queue.qsize())]
+
+        hub, alice, bob = asyncio.run(scenario())
+        self.assertEqual([e["type"] for e in alice], ["message"])
+        self.assertEqual([e["type"] for e in bob], ["message", "unread", "unread"])
+        self.assertEqual(bob[1]["delta"], 1)
+        self.assertEqual(bob[2]["unread_count"], 0)
+        self.assertEqual(hub.stats()["topics"], 2)
+
+    def test_slow_consumer_is_evicted(self) -> None:
+        async def scenario():
+            hub = MessengerHub(queue_size=2)
+            slow = hub.connect(1, [10])
+            for i in range(3):
+                hub.publish_message(10, {"id": i, "sender_id": 1})
+            return hub, slow
+
+        hub, slow = asyncio.run(scenario())
+        self.assertTrue(slow.evicted)
+        self.assertIsNone(slow.queue.get_nowait())
+        self.assertEqual(hub.stats()["connections"], 0)
+        self.assertEqual(hub.counters["evicted"], 1)
+
+    def test_websocket_receives_published_message(self) -> None:
+        hub = get_messenger_hub()
+        hub.chat_loader = lambda user_id: [42]
+        app = FastAPI()
+        app.include_router(messenger_ws_router)
+        with TestClient(app) as client:
+            with client.websocket_connect("/ws/messenger?user_id=7") as ws:
+                ws.send_text("ping")
+                self.assertEqual(ws.receive_json(), {"type": "pong"})
+                # Published from this (non-loop) thread, like a sync endpoint would.
+                hub.publish_message(42, {"id": 1, "sender_id": 8, "content": "hello"})
+                self.assertEqual(ws.receive_json()["message"]["content"], "hello")
+                self.assertEqual(ws.receive_json(), {"type": "unread", "chat_id": 42, "delta": 1})
+        get_messenger_hub.cache_clear()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import datetime
+import pathlib
+import sys
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from database import Base, Chat, ChatMember, Message, User, UserProfile
+from messenger_queries import chat_list, chat_messages, mark_read, record_message, recount_unread
+
+
+class ChatListQueryTests(unittest.TestCase):
+    def setUp(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        now = datetime.datetime(2026, 1, 1, 12, 0, 0)
+        self.db.add_all([
+            User(id=1, email="a@x", username="alice"),
+            User(id=2, email="b@x", username="bob"),
+            User(id=3, email="c@x", username="carol"),
+            UserProfile(user_id=2, avatar_url="/bob.png"),
+            Chat(id=10, type="PRIVATE", created_by=1, created_at=now),
+            Chat(id=11, type="GROUP", name="Neighbours", created_by=1, created_at=now),
+            Chat(id=12, type="GROUP", name=None, created_by=1, created_at=now),
+            ChatMember(chat_id=10, user_id=1),
+            ChatMember(chat_id=10, user_id=2),
+            ChatMember(chat_id=11, user_id=1, last_read_message_id=2),
+            ChatMember(chat_id=11, user_id=2),
+            ChatMember(chat_id=11, user_id=3),
+            ChatMember(chat_id=12, user_id=1),
+            Message(id=1, chat_id=10, sender_id=2, content="hi", created_at=now),
+            Message(id=2, chat_id=11, sender_id=3, content="first", created_at=now + datetime.timedelta(minutes=1)),
+            Message(id=3, chat_id=11, sender_id=3, content="second", created_at=now + datetime.timedelta(minutes=2)),
+        ])
+        self.db.commit()
+        recount_unread(self.db)
+        self.db.commit()
+
+    def tearDown(self) -> None:
+        self.db.close()
+
+    def test_order_and_aggregates(self) -> None:
+        chats = chat_list(self.db, 1)
+        self.assertEqual([c["id"] for c in chats], [11, 10, 12])
+
+        group, private, empty = chats
+        self.assertEqual(group["name"], "Neighbours")
+        self.assertEqual(group["member_count"], 3)
+        self.assertEqual(group["unread_count"], 1)
+        self.assertEqual(group["last_message"]["content"], "second")
+
+        self.assertEqual(private["name"], "bob")
+        self.assertEqual(private["avatar_url"], "/bob.png")
+        self.assertEqual(private["unread_count"], 1)
+
+        self.assertEqual(empty["name"], "Chat 12")
+        self.assertIsNone(empty["last_message"])
+        self.assertEqual(empty["unread_count"], 0)
+
+    def test_user_without_chats(self) -> None:
+        self.assertEqual(chat_list(self.db, 3)[0]["id"], 11)
+        self.assertEqual(chat_list(self.db, 99), [])
+
+    def unread(self, chat_id: int, user_id: int) -> int:
+        return self.db.query(ChatMember.unread_count).filter_by(chat_id=chat_id, user_id=user_id).scalar()
+
+    def test_counters_follow_send_and_read(self) -> None:
+        self.db.add(Message(id=4, chat_id=11, sender_id=2, content="third"))
+        self.db.flush()
+        record_message(self.db, 11, 2, 4)
+        self.db.commit()
+        self.assertEqual((self.unread(11, 1), self.unread(11, 2), self.unread(11, 3)), (2, 0, 3))
+
+        self.assertTrue(mark_read(self.db, 11, 1))
+        self.assertFalse(mark_read(self.db, 11, 99))
+        self.db.commit()
+        self.assertEqual(self.unread(11, 1), 0)
+        self.assertEqual(chat_list(self.db, 1)[0]["unread_count"], 0)
+
+        # The recount agrees with the incrementally maintained values.
+        before = {(m.chat_id, m.user_id): m.unread_count for m in self.db.query(ChatMember)}
+        recount_unread(self.db)
+        self.db.commit()
+        self.db.expire_all()
+        self.assertEqual({(m.chat_id, m.user_id): m.unread_count for m in self.db.query(ChatMember)}, before)
+
+
+class ChatMessagesQueryTests(unittest.TestCase):
+    def setUp(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        now = datetime.datetime(2026, 1, 1, 12, 0, 0)
+        self.db.add_all([
+            User(id=1, email="a@x", username="alice"),
+            UserProfile(user_id=1, avatar_url="/alice.png"),
+            Chat(id=10, type="GROUP", created_by=1, created_at=now),
+            Chat(id=11, type="GROUP", created_by=1, created_at=now),
+        ])
+        self.db.add_all([
+            Message(id=i, chat_id=10, sender_id=1 if i % 2 else 99, content=f"m{i}",
+                    created_at=now + datetime.timedelta(seconds=i))
+            for i in range(1, 11)
+        ])
+        self.db.add(Message(id=11, chat_id=11, sender_id=1, content="elsewhere", created_at=now))
+        self.db.commit()
+
+    def tearDown(self) -> None:
+        self.db.close()
+
+    def test_latest_page_is_chronological_with_sender(self) -> None:
+        page = chat_messages(self.db, 10, limit=3)
+        self.assertEqual([m["id"] for m in page], [8, 9, 10])
+        self.assertEqual(page[1]["sender_name"], "alice")
+        self.assertEqual(page[1]["sender_avatar"], "/alice.png")
+        self.assertEqual(page[0]["sender_name"], "Unknown")
+        self.assertIsNone(page[0]["sender_avatar"])
+
+    def test_keyset_cursors(self) -> None:
+        self.assertEqual([m["id"] for m in chat_messages(self.db, 10, limit=3, before_id=8)], [5, 6, 7])
+        self.assertEqual([m["id"] for m in chat_messages(self.db, 10, limit=3, after_id=4)], [5, 6, 7])
+        self.assertEqual(chat_messages(self.db, 10, after_id=10), [])
+        self.assertEqual([m["id"] for m in chat_messages(self.db, 10, limit=2, offset=2)], [7, 8])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import pathlib
+import sys
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from database import Base, Chat, ChatMember, Message, User, UserProfile
+from messenger_search import fts_query, search_messages, search_users
+from migrations import run_migrations
+
+
+class MessengerSearchTests(unittest.TestCase):
+    def setUp(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        self.db = sessionmaker(bind=engine)()
+        self.db.add_all([
+            User(id=1, email="alice@example.com", username="alice"),
+            User(id=2, email="bob@example.com", username="bob"),
+            User(id=3, email="al@example.com", username="carol"),
+            Chat(id=10, type="GROUP", created_by=1),
+            Chat(id=11, type="GROUP", created_by=2),
+            ChatMember(chat_id=10, user_id=1),
+            ChatMember(chat_id=10, user_id=2),
+            ChatMember(chat_id=11, user_id=2),
+            Message(id=1, chat_id=10, sender_id=1, content="Пробка на проспекте Абая"),
+            Message(id=2, chat_id=10, sender_id=2, content="Traffic jam near the metro"),
+            Message(id=3, chat_id=11, sender_id=2, content="another traffic report"),
+        ])
+        self.db.commit()
+        self.db.add(UserProfile(user_id=2, bio="Cyclist and traffic nerd"))
+        self.db.commit()
+
+    def tearDown(self) -> None:
+        self.db.close()
+
+    def test_query_sanitizing(self) -> None:
+        self.assertEqual(fts_query('al* OR "x'), '"al"* "or"* "x"*')
+        self.assertEqual(fts_query("traffic me", prefix_all=False), '"traffic" "me"*')
+        self.assertEqual(fts_query("  -- "), "")
+
+    def test_user_prefix_search_ranks_username_first(self) -> None:
+        self.assertEqual([r.username for r in search_users(self.db, "al")], ["alice", "carol"])
+        self.assertEqual([r.username for r in search_users(self.db, "cycl")], ["bob"])
+        self.assertEqual(search_users(self.db, "   "), [])
+
+    def test_triggers_track_updates(self) -> None:
+        self.db.get(User, 3).username = "zed"
+        self.db.get(UserProfile, 1).bio = "runner"
+        self.db.get(Message, 2).content = "all clear now"
+        self.db.commit()
+        self.assertEqual([r.username for r in search_users(self.db, "zed")], ["zed"])
+        self.assertEqual([r.username for r in search_users(self.db, "runner")], ["bob"])
+        self.assertEqual(search_messages(self.db, 2, "jam"), [])
+
+    def test_message_search_respects_membership(self) -> None:
+        hits = search_messages(self.db, 2, "traffic")
+        self.assertEqual([h["id"] for h in hits], [3, 2])
+        self.assertIn("<mark>", hits[0]["snippet"])
+        self.assertEqual([h["id"] for h in search_messages(self.db, 1, "traffic")], [2])
+        self.assertEqual([h["id"] for h in search_messages(self.db, 2, "traffic", chat_id=10)], [2])
+        self.assertEqual([h["id"] for h in search_messages(self.db, 2, "traffic", before_id=3)], [2])
+        self.assertEqual([h["id"] for h in search_messages(self.db, 1, "проспект")], [1])
+
+    def test_snippet_content_is_escaped(self) -> None:
+        self.db.add(Message(id=4, chat_id=10, sender_id=1, content='<img src=x onerror="alert(1)"> traffic'))
+        self.db.commit()
+        snippet = search_messages(self.db, 1, "traffic")[0]["snippet"]
+        self.assertNotIn("<img", snippet)
+        self.assertIn("&lt;img src=x onerror=&quot;alert(1)&quot;&gt; <mark>traffic</mark>", snippet)
+
+
+if __name__ == "__main__":
+    unittest.main()
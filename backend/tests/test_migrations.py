@@ -0,0 +1,54 @@
+import pathlib
+import sys
+import unittest
+
+from sqlalchemy import create_engine, inspect, text
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from database import Base
+from migrations import MIGRATIONS, applied_versions, run_migrations
+
+
+class MigrationRunnerTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=self.engine)
+
+    def test_migrations_apply_once_in_order(self) -> None:
+        expected = [m.version for m in MIGRATIONS]
+        self.assertEqual(run_migrations(self.engine), expected)
+        self.assertEqual(run_migrations(self.engine), [])
+        self.assertEqual(applied_versions(self.engine), expected)
+
+    def test_hot_column_indexes_exist_after_migration(self) -> None:
+        run_migrations(self.engine)
+        inspector = inspect(self.engine)
+        names = {ix["name"] for ix in inspector.get_indexes("messages")}
+        self.assertIn("ix_messages_chat_created", names)
+        names = {ix["name"] for ix in inspector.get_indexes("sensor_readings")}
+        self.assertIn("ix_sensor_readings_type_ts", names)
+
+    def test_legacy_duplicates_are_removed_before_unique_index(self) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(text("DROP INDEX ux_ai_knowledge_pattern_language"))
+            for _ in range(3):
+                conn.execute(text("INSERT INTO ai_knowledge (category, pattern, response, language) VALUES ('X', 'p', 'r', 'en')"))
+        run_migrations(self.engine)
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(text("SELECT COUNT(*) FROM ai_knowledge")).scalar(), 1)
+
+    def test_unread_column_is_added_and_backfilled(self) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE chat_members DROP COLUMN unread_count"))
+            conn.execute(text("INSERT INTO chat_members (chat_id, user_id, last_read_message_id) VALUES (1, 1, 1)"))
+            for _ in range(3):
+                conn.execute(text("INSERT INTO messages (chat_id, sender_id, content) VALUES (1, 2, 'x')"))
+        run_migrations(self.engine)
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(text("SELECT unread_count FROM chat_members")).scalar(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
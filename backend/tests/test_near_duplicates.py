@@ -0,0 +1,38 @@
+import pathlib
+import sys
+import unittest
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from near_duplicates import MinHashLSH
+
+
+class NearDuplicateTests(unittest.TestCase):
+    def test_near_duplicates_share_canonical_document(self) -> None:
+        texts = [
+            "The Almaty Metro opened on December 1, 2011 and has one line with eleven stations.",
+            "Metro opening: the Almaty Metro opened on December 1, 2011 and has one line with eleven stations.",
+            "the almaty metro opened on december 1 2011 and has one line with eleven stations",
+            "ONAY is the unified electronic payment system for public transport in Almaty.",
+        ]
+        result = MinHashLSH(threshold=0.7).cluster(texts)
+        self.assertEqual(result.canonical[0], 0)
+        self.assertEqual(result.canonical[2], 0)
+        self.assertEqual(result.canonical[3], 3)
+        self.assertIn(2, result.aliases(0))
+        self.assertEqual(result.total, 4)
+
+    def test_distinct_texts_stay_separate(self) -> None:
+        texts = [
+            "Call 112 for any emergency in Almaty.",
+            "Medeu is a high-mountain skating rink near the city.",
+            "Kok-Tobe offers a panoramic view of Almaty.",
+        ]
+        result = MinHashLSH().cluster(texts)
+        self.assertEqual(result.unique, 3)
+        self.assertEqual(result.size_histogram(), {1: 3})
+
+
+if __name__ == "__main__":
+    unittest.main()
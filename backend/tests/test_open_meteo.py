@@ -0,0 +1,158 @@
+import asyncio
+import json
+import pathlib
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from open_meteo import CircuitBreaker, OpenMeteoClient
+
+
+class StubOpenMeteo:
+    """Local stand-in for the Open-Meteo API: counts hits, can be slow or failing."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.status = 200
+        self.delay = 0.0
+        self.aqi = 42
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                stub.hits += 1
+                time.sleep(stub.delay)
+                body = json.dumps({"current": {"european_aqi": stub.aqi, "pm2_5": 9.0}}).encode()
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1/air-quality"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class OpenMeteoClientTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.stub = StubOpenMeteo()
+        self.now = 1000.0
+        clock = lambda: self.now
+        self.client = OpenMeteoClient(
+            ttl=60, stale_ttl=300, timeout=2,
+            endpoints={"air_quality": (self.stub.url, "european_aqi,pm2_5")},
+            breaker=CircuitBreaker(failures=2, reset_seconds=30, clock=clock),
+            clock=clock,
+        )
+
+    def tearDown(self) -> None:
+        self.stub.close()
+
+    def run_async(self, coro):
+        async def wrapped():
+            try:
+                return await coro
+            finally:
+                await self.client.aclose()
+        return asyncio.run(wrapped())
+
+    def test_concurrent_misses_share_one_upstream_call(self) -> None:
+        self.stub.delay = 0.2
+
+        async def scenario():
+            return await asyncio.gather(*(self.client.air_quality() for _ in range(50)))
+
+        results = self.run_async(scenario())
+        self.assertEqual(self.stub.hits, 1)
+        self.assertTrue(all(r.data["european_aqi"] == 42 and r.status == "fresh" for r in results))
+        self.assertEqual(self.client.counters.coalesced, 49)
+
+    def test_ttl_then_stale_while_revalidate(self) -> None:
+        async def scenario():
+            await self.client.air_quality()
+            self.now += 30
+            cached = await self.client.air_quality()
+            self.stub.aqi = 55
+            self.now += 60
+            stale = await self.client.air_quality()
+            # Let the background refresh finish.
+            while self.client._inflight:
+                await asyncio.sleep(0.01)
+            fresh = await self.client.air_quality()
+            return cached, stale, fresh
+
+        cached, stale, fresh = self.run_async(scenario())
+        self.assertEqual((cached.status, cached.data["european_aqi"]), ("fresh", 42))
+        self.assertEqual((stale.status, stale.data["european_aqi"], stale.age_seconds), ("stale", 42, 90))
+        self.assertEqual((fresh.status, fresh.data["european_aqi"]), ("fresh", 55))
+        self.assertEqual(self.stub.hits, 2)
+
+    def test_revalidate_waits_for_fresh_data_instead_of_serving_stale(self) -> None:
+        async def scenario():
+            await self.client.air_quality()
+            self.now += 30
+            cached = await self.client.air_quality(revalidate=True)
+            self.stub.aqi = 55
+            self.now += 60
+            return cached, await self.client.air_quality(revalidate=True)
+
+        cached, polled = self.run_async(scenario())
+        self.assertEqual((cached.status, cached.data["european_aqi"]), ("fresh", 42))
+        self.assertEqual((polled.status, polled.data["european_aqi"], polled.age_seconds), ("fresh", 55, 0.0))
+        self.assertEqual(self.stub.hits, 2)
+
+    def test_breaker_serves_last_good_value_while_open(self) -> None:
+        async def scenario():
+            await self.client.air_quality()
+            self.stub.status = 503
+            results = []
+            for _ in range(4):
+                self.now += 400  # past ttl + stale_ttl: every call needs the upstream
+                results.append(await self.client.air_quality())
+            return results
+
+        results = self.run_async(scenario())
+        # Calls are 400 s apart (> reset_seconds), so after the breaker opens each
+        # one is a single half-open trial that fails and re-opens it.
+        self.assertEqual(self.stub.hits, 5)
+        self.assertTrue(all(r.status == "fallback" and r.data["european_aqi"] == 42 for r in results))
+        self.assertEqual(self.client.breaker.state, "open")
+
+        async def while_open():
+            self.now += 10
+            return await self.client.air_quality()
+
+        hits = self.stub.hits
+        result = self.run_async(while_open())
+        self.assertEqual(result.status, "fallback")
+        self.assertEqual(self.stub.hits, hits)
+        self.assertGreater(self.client.counters.breaker_rejections, 0)
+
+        async def recovered():
+            self.stub.status = 200
+            self.now += 30
+            return await self.client.air_quality()
+
+        self.assertEqual(self.run_async(recovered()).status, "fresh")
+        self.assertEqual(self.client.breaker.state, "closed")
+
+    def test_no_data_yet_and_upstream_down(self) -> None:
+        self.stub.status = 500
+        self.assertIsNone(self.run_async(self.client.air_quality()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import datetime
+import pathlib
+import sys
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from database import Base, User, UserProfile
+from presence import PresenceRegistry
+
+
+class PresenceRegistryTests(unittest.TestCase):
+    def setUp(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        self.db.add_all([
+            User(id=1, email="a@x", username="alice"),
+            User(id=2, email="b@x", username="bob"),
+            UserProfile(user_id=1, bio="hello", is_online=False),
+        ])
+        self.db.commit()
+        self.now = datetime.datetime(2026, 1, 1, 12, 0, 0)
+        self.presence = PresenceRegistry(ttl_seconds=60, clock=lambda: self.now)
+
+    def tearDown(self) -> None:
+        self.db.close()
+
+    def test_heartbeats_are_batched_into_one_flush(self) -> None:
+        for _ in range(50):
+            self.presence.touch(1)
+            self.presence.touch(2)
+        self.assertEqual(self.presence.status(1), (True, self.now))
+        self.assertEqual(self.db.query(UserProfile).filter_by(is_online=True).count(), 0)
+
+        self.assertEqual(self.presence.flush(self.db), 2)
+        self.assertEqual(self.presence.flush(self.db), 0)
+        profiles = {p.user_id: p for p in self.db.query(UserProfile)}
+        self.assertTrue(profiles[1].is_online and profiles[2].is_online)
+        self.assertEqual(profiles[1].bio, "hello")
+
+    def test_stale_heartbeat_goes_offline_and_is_persisted(self) -> None:
+        self.presence.touch(1)
+        self.presence.flush(self.db)
+        self.now += datetime.timedelta(seconds=120)
+        self.assertFalse(self.presence.status(1)[0])
+
+        self.assertEqual(self.presence.flush(self.db), 1)
+        self.db.expire_all()
+        self.assertFalse(self.db.query(UserProfile).filter_by(user_id=1).one().is_online)
+
+    def test_unseen_user_falls_back_to_profile_row(self) -> None:
+        profile = UserProfile(user_id=3, is_online=True, last_seen=self.now - datetime.timedelta(seconds=10))
+        self.assertEqual(self.presence.status(3, profile), (True, profile.last_seen))
+        self.assertEqual(self.presence.status(4), (False, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
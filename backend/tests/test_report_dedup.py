@@ -0,0 +1,109 @@
+import datetime
+import pathlib
+import sys
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from database import Base, CitizenReport
+from map_tiles import points_page
+from report_dedup import file_report, lookup_zoom, neighbor_cells, recluster, severity_for
+
+# ~11 m per 0.0001 deg of latitude
+LAT, LNG = 43.2380, 76.9450
+
+
+class ReportDedupTests(unittest.TestCase):
+    def setUp(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        self.now = datetime.datetime(2026, 5, 1, 12, 0, 0)
+
+    def tearDown(self) -> None:
+        self.db.close()
+
+    def file(self, category: str = "ROADS", dlat: float = 0.0, hours: float = 0.0, **kwargs):
+        report, head = file_report(self.db, category, "pothole", LAT + dlat, LNG,
+                                   now=self.now + datetime.timedelta(hours=hours), **kwargs)
+        self.db.commit()
+        return report, head
+
+    def test_severity_steps_only_go_up(self) -> None:
+        self.assertEqual([severity_for(n) for n in (1, 3, 10, 25)], ["LOW", "MEDIUM", "HIGH", "CRITICAL"])
+        self.assertEqual(severity_for(2, "HIGH"), "HIGH")
+
+    def test_neighbor_cells_cover_the_radius(self) -> None:
+        zoom = lookup_zoom(LAT, 75.0)
+        cells = neighbor_cells(LAT, LNG, 75.0)
+        self.assertEqual(len(cells), 9)
+        self.assertTrue(all(len(c) == zoom for c in cells))
+
+    def test_nearby_reports_merge_into_one_cluster(self) -> None:
+        first, head = self.file()
+        self.assertIs(first, head)
+        for i in range(1, 3):
+            report, head = self.file(dlat=0.0002 * i, hours=i)  # 22 m, 44 m away
+            self.assertEqual((report.duplicate_of, report.status), (first.id, "RECEIVED"))
+        self.assertEqual((head.report_count, head.severity), (3, "MEDIUM"))
+        self.assertEqual(head.last_reported_at, self.now + datetime.timedelta(hours=2))
+        rows, _ = points_page(self.db, "reports")
+        self.assertEqual([(r["id"], r["report_count"]) for r in rows], [(first.id, 3)])
+
+    def test_distance_category_window_and_status_split_clusters(self) -> None:
+        first, _ = self.file()
+        far, head = self.file(dlat=0.002)            # ~220 m
+        self.assertIs(far, head)
+        other, head = self.file(category="LIGHTING")
+        self.assertIs(other, head)
+        late, head = self.file(hours=100)
+        self.assertIs(late, head)
+        late.status = "RESOLVED"
+        self.db.commit()
+        after_fix, head = self.file(hours=101)
+        self.assertIs(after_fix, head)
+        self.assertEqual(self.db.query(CitizenReport).filter(CitizenReport.duplicate_of.isnot(None)).count(), 0)
+
+    def test_recluster_rebuilds_clusters_from_history(self) -> None:
+        # Historical rows written before dedup: every one is its own head.
+        self.db.add_all([
+            CitizenReport(category="ROADS", description="p", lat=LAT + 0.00005 * i, lng=LNG,
+                          created_at=self.now + datetime.timedelta(hours=i))
+            for i in range(12)
+        ] + [
+            CitizenReport(category="ROADS", description="p", lat=LAT + 0.01, lng=LNG, created_at=self.now),
+            CitizenReport(category="SANITATION", description="t", lat=LAT, lng=LNG, created_at=self.now),
+        ])
+        self.db.commit()
+        result = recluster(self.db)
+        self.assertEqual(result, {"reports": 14, "clusters": 3, "merged": 11})
+        heads = self.db.query(CitizenReport).filter(CitizenReport.duplicate_of.is_(None)).order_by(CitizenReport.id).all()
+        self.assertEqual([(h.report_count, h.severity) for h in heads], [(12, "HIGH"), (1, "LOW"), (1, "LOW")])
+        self.assertEqual(heads[0].last_reported_at, self.now + datetime.timedelta(hours=11))
+
+        # A narrower window splits the chain again; re-running is idempotent.
+        self.assertEqual(recluster(self.db, window_hours=0.5)["clusters"], 14)
+        self.assertEqual(recluster(self.db)["clusters"], 3)
+        self.assertEqual(self.db.query(CitizenReport).filter(CitizenReport.status != "RECEIVED").count(), 0)
+
+        # Statuses survive any sequence of reclusters; a head takes its members' most advanced one.
+        heads[1].status = "IN_PROGRESS"
+        self.db.commit()
+        recluster(self.db, radius_m=2000)
+        self.assertEqual((heads[1].duplicate_of, heads[1].status), (heads[0].id, "IN_PROGRESS"))
+        self.assertEqual(heads[0].status, "IN_PROGRESS")
+        recluster(self.db, radius_m=10)
+        self.assertEqual((heads[1].duplicate_of, heads[1].status), (None, "IN_PROGRESS"))
+        recluster(self.db)
+
+        # New reports merge into the recomputed heads.
+        report, head = self.file(hours=12)
+        self.assertEqual((head.id, head.report_count), (heads[0].id, 13))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import pathlib
+import sys
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from database import AIKnowledge, Base
+from seed_manager import KNOWLEDGE_SEED_KEY, bulk_load_knowledge, get_data_version, knowledge_rows, rows_version, seed_knowledge_base
+
+
+class SeedManagerTests(unittest.TestCase):
+    def setUp(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+
+    def tearDown(self) -> None:
+        self.db.close()
+
+    def test_knowledge_rows_are_deterministic(self) -> None:
+        self.assertEqual(rows_version(knowledge_rows()), rows_version(knowledge_rows()))
+
+    def test_seeding_is_skipped_when_version_matches(self) -> None:
+        rows = knowledge_rows()
+        added = seed_knowledge_base(self.db, rows)
+        total = self.db.query(AIKnowledge).count()
+        self.assertGreater(added, 0)
+        self.assertEqual(added, total)
+        self.assertEqual(get_data_version(self.db, KNOWLEDGE_SEED_KEY), rows_version(rows))
+
+        self.assertEqual(seed_knowledge_base(self.db, rows), 0)
+        self.assertEqual(self.db.query(AIKnowledge).count(), total)
+
+    def test_changed_data_only_inserts_new_rows(self) -> None:
+        rows = knowledge_rows()
+        seed_knowledge_base(self.db, rows)
+        extra = dict(rows[0], pattern="brand new pattern for seeding test")
+        self.assertEqual(seed_knowledge_base(self.db, rows + [extra]), 1)
+
+    def test_bulk_load_reports_inserted_and_skipped_per_chunk(self) -> None:
+        items = [{"pattern": f"pattern {i % 70}", "response": "r", "category": "CITY_INFO"} for i in range(100)]
+        stats = bulk_load_knowledge(self.db, items, chunk_size=30)
+        self.assertEqual(stats.processed, 100)
+        self.assertEqual(stats.inserted, 70)
+        self.assertEqual(stats.skipped, 30)
+        self.assertEqual(stats.chunks, 4)
+
+        again = bulk_load_knowledge(self.db, iter(items))
+        self.assertEqual((again.inserted, again.skipped), (0, 100))
+
+
+if __name__ == "__main__":
+    unittest.main()
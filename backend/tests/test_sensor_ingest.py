@@ -0,0 +1,144 @@
+import datetime
+import pathlib
+import sys
+import time
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from database import Base, SensorReading, SensorRollup
+from sensor_ingest import MAX_WRITE_ATTEMPTS, NdjsonDecoder, SensorIngestor, parse_json_batch
+
+
+class SensorIngestTests(unittest.TestCase):
+    def setUp(self) -> None:
+        # One shared connection: the ingestor flushes from its own thread.
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        self.Session = sessionmaker(bind=engine)
+        self.now = datetime.datetime(2026, 5, 1, 12, 0, 0)
+
+    def count(self, model) -> int:
+        db = self.Session()
+        try:
+            return db.query(model).count()
+        finally:
+            db.close()
+
+    def test_validation_rejects_bad_items(self) -> None:
+        ingestor = SensorIngestor(self.Session)
+        result = ingestor.ingest([
+            {"sensor_type": "aqi", "value": 42},
+            {"sensor_type": "PM25", "value": 12.5, "timestamp": "2026-05-01T11:59:00+00:00"},
+            {"sensor_type": "AQI", "value": "high"},
+            {"sensor_type": "AQI", "value": float("nan")},
+            {"sensor_type": "bad type!", "value": 1},
+            {"sensor_type": "AQI", "value": 1, "timestamp": "2026-05-02T00:00:00"},
+            [1, 2, 3],
+        ], now=self.now)
+        self.assertEqual((result.accepted, result.rejected, result.dropped), (2, 5, 0))
+        self.assertTrue(result.errors[0].startswith("item 2:"))
+        self.assertEqual(ingestor.latest("AQI")["value"], 42.0)
+        self.assertEqual(ingestor.latest("pm25")["timestamp"], "2026-05-01T11:59:00")
+
+    def test_geo_tagged_readings_are_validated_and_persisted(self) -> None:
+        ingestor = SensorIngestor(self.Session)
+        result = ingestor.ingest([
+            {"sensor_type": "NOISE", "value": 61, "lat": 43.25, "lng": 76.92},
+            {"sensor_type": "NOISE", "value": 58},
+            {"sensor_type": "NOISE", "value": 70, "lat": 43.25},
+            {"sensor_type": "NOISE", "value": 70, "lat": 143.0, "lng": 76.9},
+        ], now=self.now)
+        self.assertEqual((result.accepted, result.rejected), (2, 2))
+        self.assertEqual(ingestor.flush(), 2)
+        db = self.Session()
+        try:
+            located = db.query(SensorReading).filter(SensorReading.lat.isnot(None)).one()
+            self.assertEqual((located.lat, located.lng, located.value), (43.25, 76.92, 61.0))
+        finally:
+            db.close()
+
+    def test_ring_buffer_keeps_newest_and_bounds_history(self) -> None:
+        ingestor = SensorIngestor(self.Session, ring_size=5)
+        at = lambda s: (self.now - datetime.timedelta(seconds=s)).isoformat()
+        ingestor.ingest([{"sensor_type": "AQI", "value": v, "timestamp": at(10 - v)} for v in range(10)], now=self.now)
+        # A late reading is stored but does not become "latest".
+        ingestor.ingest([{"sensor_type": "AQI", "value": 99, "timestamp": at(60)}], now=self.now)
+        self.assertEqual(ingestor.latest("AQI")["value"], 9.0)
+        self.assertEqual([p["value"] for p in ingestor.recent("AQI")], [5.0, 6.0, 7.0, 8.0, 9.0])
+        self.assertEqual(ingestor.stats()["pending"], 11)
+
+    def test_backpressure_drops_beyond_max_pending(self) -> None:
+        ingestor = SensorIngestor(self.Session, max_pending=3)
+        result = ingestor.ingest([{"sensor_type": "AQI", "value": v} for v in range(5)], now=self.now)
+        self.assertEqual((result.accepted, result.dropped), (3, 2))
+        self.assertEqual(ingestor.latest("AQI")["value"], 4.0)
+        self.assertEqual(ingestor.flush(), 3)
+
+    def test_failed_batches_are_retried_then_dropped(self) -> None:
+        failures = [0]
+
+        def flaky_session():
+            db = self.Session()
+            if failures[0]:
+                failures[0] -= 1
+
+                def broken_commit() -> None:
+                    raise RuntimeError("database is locked")
+
+                db.commit = broken_commit
+            return db
+
+        ingestor = SensorIngestor(flaky_session, batch_size=2, max_pending=5)
+        ingestor.ingest([{"sensor_type": "AQI", "value": v} for v in range(4)], now=self.now)
+        failures[0] = 1
+        self.assertEqual(ingestor.flush(), 0)
+        # The failed batch and the one behind it are still waiting and still use up room.
+        self.assertEqual(ingestor.stats()["pending"], 4)
+        self.assertEqual(ingestor.ingest([{"sensor_type": "AQI", "value": 9}] * 2, now=self.now).accepted, 1)
+        self.assertEqual(ingestor.flush(), 5)
+        self.assertEqual(self.count(SensorReading), 5)
+
+        ingestor.ingest([{"sensor_type": "AQI", "value": 1}] * 2, now=self.now)
+        failures[0] = MAX_WRITE_ATTEMPTS
+        for _ in range(MAX_WRITE_ATTEMPTS):
+            ingestor.flush()
+        stats = ingestor.stats()
+        self.assertEqual((stats["pending"], stats["dropped"], stats["failed_batches"]), (0, 3, 1 + MAX_WRITE_ATTEMPTS))
+        self.assertEqual(self.count(SensorReading), 5)
+
+    def test_background_flush_writes_readings_and_rollups(self) -> None:
+        ingestor = SensorIngestor(self.Session, batch_size=100, flush_interval_ms=20)
+        ingestor.start()
+        ingestor.ingest([{"sensor_type": "TRAFFIC", "value": i % 10} for i in range(250)])
+        # Poll the counters, not the table: the writer shares the single connection.
+        deadline = time.monotonic() + 5
+        while ingestor.stats()["written"] < 250 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(ingestor.stats()["written"], 250)
+        ingestor.stop()
+        self.assertEqual(self.count(SensorReading), 250)
+        self.assertGreater(self.count(SensorRollup), 0)
+
+    def test_payload_parsing(self) -> None:
+        decoder = NdjsonDecoder()
+        items = decoder.feed(b'{"sensor_type": "AQI", "value": 1}\n{"sensor_ty')
+        items += decoder.feed(b'pe": "AQI", "value": 2}\nnot json\n')
+        items += decoder.feed(b'{"sensor_type": "AQI", "value": 3}')
+        items += decoder.close()
+        self.assertEqual([i["value"] for i in items], [1, 2, 3])
+        self.assertEqual(decoder.bad_lines, 1)
+
+        self.assertEqual(len(parse_json_batch(b'[{"a": 1}, {"a": 2}]')), 2)
+        self.assertEqual(len(parse_json_batch(b'{"readings": [{"a": 1}]}')), 1)
+        with self.assertRaises(ValueError):
+            parse_json_batch(b'"nope"')
+
+
+if __name__ == "__main__":
+    unittest.main()
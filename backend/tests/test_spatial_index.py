@@ -0,0 +1,91 @@
+import pathlib
+import sys
+import unittest
+
+import numpy as np
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from emergency_dispatch import assign_units
+from spatial_index import GridIndex, haversine_m
+
+
+class GridIndexTests(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(7)
+        self.lat = rng.uniform(43.15, 43.35, 2000)
+        self.lng = rng.uniform(76.75, 77.10, 2000)
+        self.index = GridIndex()
+        self.index.rebuild(self.lat, self.lng)
+        self.queries = np.column_stack([rng.uniform(43.10, 43.40, 50), rng.uniform(76.70, 77.15, 50)])
+
+    def brute(self, lat: float, lng: float, mask=None) -> np.ndarray:
+        distances = haversine_m(lat, lng, self.lat, self.lng)
+        if mask is not None:
+            distances = np.where(mask, distances, np.inf)
+        return distances
+
+    def test_nearest_matches_brute_force(self) -> None:
+        mask = np.arange(len(self.lat)) % 3 == 0
+        for lat, lng in self.queries:
+            idx, dist = self.index.nearest(lat, lng, 5)
+            np.testing.assert_allclose(dist, np.sort(self.brute(lat, lng))[:5])
+            idx, dist = self.index.nearest(lat, lng, 5, mask)
+            self.assertTrue(mask[idx].all())
+            np.testing.assert_allclose(dist, np.sort(self.brute(lat, lng, mask))[:5])
+
+    def test_within_matches_brute_force(self) -> None:
+        for lat, lng in self.queries:
+            idx, dist = self.index.within(lat, lng, 1500.0)
+            expected = np.flatnonzero(self.brute(lat, lng) <= 1500.0)
+            self.assertEqual(sorted(idx.tolist()), expected.tolist())
+            self.assertTrue(np.all(np.diff(dist) >= 0))
+
+    def test_update_rebuckets_moved_points_only(self) -> None:
+        lat = self.lat.copy()
+        lat[:10] += 0.05
+        self.assertEqual(self.index.update(lat, self.lng), 10)
+        self.assertEqual(self.index.update(lat, self.lng), 0)
+        self.lat = lat
+        for q_lat, q_lng in self.queries[:10]:
+            _, dist = self.index.nearest(q_lat, q_lng, 3)
+            np.testing.assert_allclose(dist, np.sort(self.brute(q_lat, q_lng))[:3])
+
+    def test_fewer_matches_than_k(self) -> None:
+        mask = np.zeros(len(self.lat), dtype=bool)
+        mask[[3, 4]] = True
+        idx, _ = self.index.nearest(43.25, 76.9, 5, mask)
+        self.assertEqual(sorted(idx.tolist()), [3, 4])
+
+
+class AssignUnitsTests(unittest.TestCase):
+    ids = ["FIRE_1", "FIRE_2", "AMBULANCE_3", "POLICE_4"]
+    types = np.array(["FIRE", "FIRE", "AMBULANCE", "POLICE"], dtype=object)
+    lat = np.array([43.20, 43.30, 43.25, 43.25])
+    lng = np.array([76.90, 76.90, 76.90, 76.95])
+
+    def test_minimizes_total_distance_with_compatible_types(self) -> None:
+        status = np.array(["AVAILABLE"] * 4, dtype=object)
+        incidents = [
+            {"id": 1, "type": "FIRE", "severity": "HIGH", "lat": 43.29, "lng": 76.90},
+            {"id": 2, "type": "FIRE", "severity": "LOW", "lat": 43.21, "lng": 76.90},
+            {"id": 3, "type": "MEDICAL", "severity": "CRITICAL", "lat": 43.20, "lng": 76.90},
+        ]
+        got = {a.incident_id: a.unit_id for a in assign_units(incidents, self.ids, self.types, status, self.lat, self.lng)}
+        self.assertEqual(got, {1: "FIRE_2", 2: "FIRE_1", 3: "AMBULANCE_3"})
+
+    def test_scarce_units_go_to_higher_severity(self) -> None:
+        status = np.array(["AVAILABLE", "EN_ROUTE", "ON_SCENE", "PATROLLING"], dtype=object)
+        incidents = [
+            {"id": 1, "type": "FIRE", "severity": "LOW", "lat": 43.20, "lng": 76.90},
+            {"id": 2, "type": "FIRE", "severity": "CRITICAL", "lat": 43.30, "lng": 76.90},
+            {"id": 3, "type": "MEDICAL", "severity": "HIGH", "lat": 43.25, "lng": 76.90},
+        ]
+        got = {a.incident_id: a.unit_id for a in assign_units(incidents, self.ids, self.types, status, self.lat, self.lng)}
+        # FIRE_1 goes to the critical fire; nothing compatible is free for the medical call.
+        self.assertEqual(got, {2: "FIRE_1"})
+
+
+if __name__ == "__main__":
+    unittest.main()
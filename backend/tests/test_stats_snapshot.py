@@ -0,0 +1,85 @@
+import datetime
+import json
+import pathlib
+import sys
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from database import ActivityLog, Base, EmergencyIncident, SensorReading, User
+from city_state import CityStateCache
+from stats_snapshot import StatsSnapshot, build_stats
+
+
+class StatsSnapshotTests(unittest.TestCase):
+    def setUp(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        self.Session = sessionmaker(bind=engine)
+        self.now = datetime.datetime(2026, 3, 10, 12, 0, 0)
+        db = self.Session()
+        db.add_all([
+            User(id=1, email="a@x", username="alice"),
+            SensorReading(sensor_type="AQI", value=30, timestamp=self.now - datetime.timedelta(hours=2)),
+            SensorReading(sensor_type="AQI", value=150, timestamp=self.now),
+            EmergencyIncident(type="FIRE", status="ACTIVE"),
+            EmergencyIncident(type="FIRE", status="RESOLVED"),
+            ActivityLog(user_id=1, action="AI_QUERY", timestamp=self.now),
+            ActivityLog(user_id=1, action="AI_QUERY", timestamp=self.now - datetime.timedelta(days=1)),
+            ActivityLog(user_id=1, action="LOGIN", timestamp=self.now - datetime.timedelta(days=1)),
+            ActivityLog(user_id=1, action="LOGIN", timestamp=self.now - datetime.timedelta(days=30)),
+        ])
+        db.commit()
+        db.close()
+
+    def test_totals_and_activity_by_day(self) -> None:
+        db = self.Session()
+        stats = build_stats(db, now=self.now)
+        db.close()
+        self.assertEqual(stats["activeUsers"], 1)
+        self.assertEqual(stats["active_emergency_alerts"], 1)
+        self.assertEqual(stats["ai_metrics"]["total_queries"], 2 + 1240)
+        # Latest AQI 150 and default traffic 5: 100 - (50 * 0.6 + 50 * 0.4)
+        self.assertEqual(stats["city_health_score"], 50)
+
+        days = stats["activityByDay"]
+        self.assertEqual([d["date"] for d in days][-2:], ["2026-03-09", "2026-03-10"])
+        real = [d["count"] - 5 for d in days]  # minus the minimum demo padding
+        self.assertTrue(all(0 <= r - expected <= 10 for r, expected in zip(real, [0, 0, 0, 0, 0, 2, 1])))
+
+    def test_latest_values_come_from_city_state(self) -> None:
+        city = CityStateCache(clock=lambda: self.now)
+        city.apply_readings([
+            {"sensor_type": "AQI", "value": 300.0, "timestamp": self.now},
+            {"sensor_type": "TRAFFIC", "value": 10.0, "timestamp": self.now},
+        ])
+        db = self.Session()
+        stats = build_stats(db, now=self.now, city=city)
+        db.close()
+        self.assertEqual(stats["city_health_score"], 0)
+        self.assertEqual(stats["data_freshness"]["aqi"]["age_seconds"], 0.0)
+
+    def test_snapshot_is_reused_until_stale(self) -> None:
+        calls = []
+
+        def factory():
+            calls.append(1)
+            return self.Session()
+
+        snapshot = StatsSnapshot(factory, max_age=60)
+        first = snapshot.get()
+        self.assertIs(snapshot.get(), first)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(json.loads(first)["activeUsers"], 1)
+
+        snapshot.invalidate()
+        snapshot.get()
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import datetime
+import pathlib
+import sys
+import unittest
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from database import Base, SensorRollup
+from timeseries import lttb, pick_resolution, rebuild_rollups, record_readings, series
+
+
+class TimeseriesTests(unittest.TestCase):
+    def setUp(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        self.t0 = datetime.datetime(2026, 5, 1, 10, 0, 0)
+        readings = [
+            {"sensor_type": "AQI", "value": float(v), "timestamp": self.t0 + datetime.timedelta(seconds=20 * i)}
+            for i, v in enumerate([10, 20, 30, 40, 50, 60, 70, 80, 90])
+        ]
+        # Two batches so the second one has to merge into existing buckets.
+        record_readings(self.db, readings[:4])
+        record_readings(self.db, readings[4:])
+        self.db.commit()
+
+    def tearDown(self) -> None:
+        self.db.close()
+
+    def buckets(self, resolution: str):
+        return [(r.bucket_start, r.count, r.total, r.min_value, r.max_value)
+                for r in self.db.query(SensorRollup).filter_by(resolution=resolution).order_by(SensorRollup.bucket_start)]
+
+    def test_incremental_rollups_match_rebuild(self) -> None:
+        minutes = self.buckets("1m")
+        self.assertEqual([(c, t, lo, hi) for _, c, t, lo, hi in minutes],
+                         [(3, 60.0, 10.0, 30.0), (3, 150.0, 40.0, 60.0), (3, 240.0, 70.0, 90.0)])
+        self.assertEqual(self.buckets("1h")[0][1:], (9, 450.0, 10.0, 90.0))
+        incremental = {r: self.buckets(r) for r in ("1m", "1h", "1d")}
+        rebuild_rollups(self.db)
+        self.assertEqual({r: self.buckets(r) for r in ("1m", "1h", "1d")}, incremental)
+
+    def test_series_resolutions(self) -> None:
+        end = self.t0 + datetime.timedelta(minutes=10)
+        raw = series(self.db, "AQI", self.t0, end)
+        self.assertEqual(raw["resolution"], "raw")
+        self.assertEqual(len(raw["points"]), 9)
+
+        minute = series(self.db, "AQI", self.t0, end, resolution="1m")
+        self.assertEqual([p["value"] for p in minute["points"]], [20.0, 50.0, 80.0])
+
+        aware = self.t0.replace(tzinfo=datetime.timezone.utc)
+        self.assertEqual(len(series(self.db, "AQI", aware, aware + datetime.timedelta(days=1))["points"]), 3)
+        with self.assertRaises(ValueError):
+            series(self.db, "AQI", self.t0, end, resolution="5m")
+
+    def test_pick_resolution(self) -> None:
+        self.assertEqual(pick_resolution(self.t0, self.t0 + datetime.timedelta(days=1)), "1m")
+        self.assertEqual(pick_resolution(self.t0, self.t0 + datetime.timedelta(days=30)), "1h")
+        self.assertEqual(pick_resolution(self.t0, self.t0 + datetime.timedelta(days=365)), "1d")
+
+    def test_lttb_keeps_extremes_and_budget(self) -> None:
+        x = np.arange(1000, dtype=float)
+        y = np.zeros(1000)
+        y[437] = 100.0
+        keep = lttb(x, y, 50)
+        self.assertEqual(len(keep), 50)
+        self.assertEqual((keep[0], keep[-1]), (0, 999))
+        self.assertIn(437, keep)
+        self.assertTrue(np.all(np.diff(keep) > 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,190 @@
+"""
+Sensor time series: incremental rollups, range queries and LTTB downsampling.
+
+- `record_readings` inserts raw readings and folds them into 1m / 1h / 1d
+  buckets in `sensor_rollups` (count, sum, min, max) with one upsert per
+  batch, so charts never aggregate raw rows
+- `series` serves a from/to window from raw rows or the coarsest rollup that
+  still gives enough points ("auto"), then optionally downsamples to a point
+  budget with Largest-Triangle-Three-Buckets
+- `rebuild_rollups` recomputes every bucket from sensor_readings in SQL
+"""
+
+from __future__ import annotations
+
+import datetime
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import Session
+
+from database import SensorReading, SensorRollup
+
+
+RESOLUTIONS: Dict[str, datetime.timedelta] = {
+    "1m": datetime.timedelta(minutes=1),
+    "1h": datetime.timedelta(hours=1),
+    "1d": datetime.timedelta(days=1),
+}
+RAW_MAX_SPAN = datetime.timedelta(minutes=15)
+AUTO_MAX_BUCKETS = 5000
+
+
+def bucket_start(ts: datetime.datetime, resolution: str) -> datetime.datetime:
+    if resolution == "1m":
+        return ts.replace(second=0, microsecond=0)
+    if resolution == "1h":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def rollup_rows(readings: Iterable[Tuple[str, float, datetime.datetime]]) -> List[Dict]:
+    """Pre-aggregate (sensor_type, value, timestamp) triples into one row per bucket."""
+    buckets: Dict[Tuple[str, str, datetime.datetime], List[float]] = defaultdict(lambda: [0, 0.0, None, None])
+    for sensor_type, value, ts in readings:
+        for resolution in RESOLUTIONS:
+            agg = buckets[(sensor_type, resolution, bucket_start(ts, resolution))]
+            agg[0] += 1
+            agg[1] += value
+            agg[2] = value if agg[2] is None else min(agg[2], value)
+            agg[3] = value if agg[3] is None else max(agg[3], value)
+    return [
+        {"sensor_type": t, "resolution": r, "bucket_start": b,
+         "count": agg[0], "total": agg[1], "min_value": agg[2], "max_value": agg[3]}
+        for (t, r, b), agg in buckets.items()
+    ]
+
+
+def upsert_rollups(db: Session, rows: Sequence[Dict]) -> None:
+    if not rows:
+        return
+    table = SensorRollup.__table__
+    stmt = sqlite.insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["sensor_type", "resolution", "bucket_start"],
+        set_={
+            "count": table.c.count + stmt.excluded.count,
+            "total": table.c.total + stmt.excluded.total,
+            # Two-argument min()/max() are SQLite's scalar functions.
+            "min_value": func.min(table.c.min_value, stmt.excluded.min_value),
+            "max_value": func.max(table.c.max_value, stmt.excluded.max_value),
+        },
+    )
+    db.execute(stmt, list(rows))
+
+
+def record_readings(db: Session, readings: Sequence[Dict]) -> int:
+    """Insert readings ({sensor_type, value, timestamp[, lat, lng]}) and update their rollups. Caller commits."""
+    if not readings:
+        return 0
+    db.execute(SensorReading.__table__.insert(), list(readings))
+    upsert_rollups(db, rollup_rows((r["sensor_type"], r["value"], r["timestamp"]) for r in readings))
+    return len(readings)
+
+
+# strftime patterns producing SQLAlchemy's SQLite DateTime storage format.
+_BUCKET_FORMATS = {
+    "1m": "%Y-%m-%d %H:%M:00.000000",
+    "1h": "%Y-%m-%d %H:00:00.000000",
+    "1d": "%Y-%m-%d 00:00:00.000000",
+}
+
+
+def rebuild_rollups(db: Session) -> int:
+    """Recompute every rollup bucket from sensor_readings in SQL. Returns the number of buckets."""
+    db.execute(delete(SensorRollup))
+    for resolution, pattern in _BUCKET_FORMATS.items():
+        db.execute(text(
+            "INSERT INTO sensor_rollups "
+            "(sensor_type, resolution, bucket_start, count, total, min_value, max_value) "
+            "SELECT sensor_type, :resolution, strftime(:pattern, timestamp), "
+            "COUNT(*), SUM(value), MIN(value), MAX(value) "
+            "FROM sensor_readings WHERE timestamp IS NOT NULL "
+            "GROUP BY sensor_type, strftime(:pattern, timestamp)"
+        ), {"resolution": resolution, "pattern": pattern})
+    return db.query(SensorRollup).count()
+
+
+def _naive_utc(ts: datetime.datetime) -> datetime.datetime:
+    """Stored timestamps are naive UTC; convert aware query bounds to match."""
+    if ts.tzinfo is not None:
+        return ts.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def pick_resolution(start: datetime.datetime, end: datetime.datetime) -> str:
+    """Finest source that keeps the window under AUTO_MAX_BUCKETS points."""
+    span = end - start
+    if span <= RAW_MAX_SPAN:
+        return "raw"
+    for resolution, width in RESOLUTIONS.items():
+        if span / width <= AUTO_MAX_BUCKETS:
+            return resolution
+    return "1d"
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points Largest-Triangle-Three-Buckets keeps (first and last always)."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        nxt_hi = min(int((i + 2) * every) + 1, n)
+        # The third vertex is the average of the next bucket (the last point for the final bucket).
+        avg_x, avg_y = x[hi:nxt_hi].mean(), y[hi:nxt_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def series(
+    db: Session,
+    sensor_type: str,
+    start: datetime.datetime,
+    end: datetime.datetime,
+    resolution: str = "auto",
+    points: Optional[int] = None,
+) -> Dict:
+    """Chart data for [start, end): {"resolution", "points": [{timestamp, value, ...}]}."""
+    start, end = _naive_utc(start), _naive_utc(end)
+    if resolution == "auto":
+        resolution = pick_resolution(start, end)
+    if resolution != "raw" and resolution not in RESOLUTIONS:
+        raise ValueError(f"resolution must be auto, raw or one of {tuple(RESOLUTIONS)}")
+
+    if resolution == "raw":
+        rows = db.execute(
+            select(SensorReading.timestamp, SensorReading.value)
+            .where(SensorReading.sensor_type == sensor_type,
+                   SensorReading.timestamp >= start, SensorReading.timestamp < end)
+            .order_by(SensorReading.timestamp)
+        ).all()
+        data = [{"timestamp": ts, "value": value} for ts, value in rows]
+    else:
+        rows = db.execute(
+            select(SensorRollup.bucket_start, SensorRollup.total / SensorRollup.count,
+                   SensorRollup.min_value, SensorRollup.max_value, SensorRollup.count)
+            .where(SensorRollup.sensor_type == sensor_type, SensorRollup.resolution == resolution,
+                   SensorRollup.bucket_start >= bucket_start(start, resolution), SensorRollup.bucket_start < end)
+            .order_by(SensorRollup.bucket_start)
+        ).all()
+        data = [{"timestamp": ts, "value": avg, "min": lo, "max": hi, "count": count}
+                for ts, avg, lo, hi, count in rows]
+
+    if points and len(data) > points:
+        x = np.array([d["timestamp"] for d in data], dtype="datetime64[ms]").astype(np.float64)
+        y = np.array([d["value"] for d in data], dtype=float)
+        data = [data[i] for i in lttb(x, y, points)]
+
+    for d in data:
+        d["timestamp"] = d["timestamp"].isoformat()
+    return {"sensor_type": sensor_type, "resolution": resolution, "points": data}
@@ -37,9 +37,15 @@ const AIPredictivePanel = () => {
                             <CardDescription className="text-[10px] font-mono uppercase tracking-widest">Almaty Predictive Engine V5</CardDescription>
                         </div>
                     </div>
-                    <Badge variant="outline" className="bg-emerald-500/10 text-emerald-500 border-emerald-500/20 font-black text-[10px]">
-                        98.4% PRECISION
-                    </Badge>
+                    {forecast?.stale ? (
+                        <Badge variant="outline" className="bg-amber-500/10 text-amber-500 border-amber-500/20 font-black text-[10px]">
+                            STALE DATA
+                        </Badge>
+                    ) : (
+                        <Badge variant="outline" className="bg-emerald-500/10 text-emerald-500 border-emerald-500/20 font-black text-[10px]">
+                            98.4% PRECISION
+                        </Badge>
+                    )}
                 </div>
             </CardHeader>
 
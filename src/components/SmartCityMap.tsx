@@ -144,11 +144,30 @@ const SmartCityMap: React.FC<SmartCityMapProps> = ({ trafficCongestion, airQuali
       L.marker(district.position as [number, number], { icon: labelIcon, interactive: false }).addTo(districtLayerRef.current!);
     });
 
-    // 2. Reports
+    // 2. Reports: only the current viewport, clustered server-side when zoomed out
+    const map = mapInstanceRef.current;
     const loadReports = async () => {
       try {
-        const reports = await reportsApi.getAll();
+        const bounds = map.getBounds();
+        const { clusters, points: reports } = await reportsApi.getInView({
+          west: bounds.getWest(),
+          south: bounds.getSouth(),
+          east: bounds.getEast(),
+          north: bounds.getNorth(),
+          zoom: map.getZoom(),
+        });
         reportLayerRef.current!.clearLayers();
+        clusters.forEach((c) => {
+          const size = Math.min(44, 20 + Math.round(Math.log2(c.count) * 4));
+          const icon = L.divIcon({
+            className: 'report-cluster',
+            html: `<div style="background:#ef4444cc; width:${size}px; height:${size}px; border-radius:50%; border:2px solid white; box-shadow:0 0 10px rgba(239, 68, 68, 0.4); display:flex; align-items:center; justify-content:center; color:white; font-size:10px; font-weight:900; font-family:monospace;">${c.count}</div>`,
+            iconSize: [size, size]
+          });
+          L.marker([c.lat, c.lng], { icon })
+            .addTo(reportLayerRef.current!)
+            .on('click', () => map.setView([c.lat, c.lng], Math.min(map.getMaxZoom(), map.getZoom() + 2)));
+        });
         reports.forEach((r: any) => {
           if (r.lat && r.lng) {
             const icon = L.divIcon({
@@ -260,13 +279,17 @@ const SmartCityMap: React.FC<SmartCityMapProps> = ({ trafficCongestion, airQuali
     loadBuses();
     loadEmergencyUnits();
     loadHeatmap();
+    map.on('moveend', loadReports);
 
     const interval = setInterval(() => {
       loadBuses();
       loadEmergencyUnits();
     }, 4000);
 
-    return () => clearInterval(interval);
+    return () => {
+      clearInterval(interval);
+      map.off('moveend', loadReports);
+    };
 
   }, [trafficCongestion, airQualityIndex]);
 
@@ -84,6 +84,7 @@ interface Contact {
 
 const SERVER_URL = 'http://localhost:8000';
 const API_BASE = `${SERVER_URL}/api/messenger`;
+const WS_URL = `${SERVER_URL.replace(/^http/, 'ws')}/ws/messenger`;
 
 interface Sticker {
     id: string;
@@ -107,8 +108,9 @@ const api = {
         return res.json();
     },
 
-    getMessages: async (chatId: number): Promise<ChatMessage[]> => {
-        const res = await fetch(`${API_BASE}/chats/${chatId}/messages`);
+    getMessages: async (chatId: number, afterId?: number): Promise<ChatMessage[]> => {
+        const query = afterId ? `?after_id=${afterId}` : '';
+        const res = await fetch(`${API_BASE}/chats/${chatId}/messages${query}`);
         return res.json();
     },
 
@@ -542,20 +544,109 @@ const MessengerApp: React.FC = () => {
         }
     }, []);
 
+    // Poll only for messages newer than the last one we have
+    const lastMessageRef = useRef<ChatMessage | null>(null);
+    useEffect(() => {
+        lastMessageRef.current = messages.length ? messages[messages.length - 1] : null;
+    }, [messages]);
+
+    const pollMessages = useCallback(async (chatId: number) => {
+        const last = lastMessageRef.current;
+        if (!last || last.chat_id !== chatId) {
+            return fetchMessages(chatId);
+        }
+        try {
+            const data = await api.getMessages(chatId, last.id);
+            if (data.length === 0) return;
+            setMessages(prev => {
+                const lastId = prev.length ? prev[prev.length - 1].id : 0;
+                if (prev.length && prev[0].chat_id !== chatId) return prev;
+                const fresh = data.filter(m => m.id > lastId);
+                return fresh.length ? [...prev, ...fresh] : prev;
+            });
+        } catch (e) {
+            console.error('Failed to poll messages:', e);
+        }
+    }, [fetchMessages]);
+
+    // Push channel: new messages and unread changes arrive over the socket;
+    // polling below only runs while it is disconnected.
+    const [pushConnected, setPushConnected] = useState(false);
+    const activeChatRef = useRef<Chat | null>(null);
+    useEffect(() => {
+        activeChatRef.current = activeChat;
+    }, [activeChat]);
+
+    useEffect(() => {
+        if (!currentUserId) return;
+        let socket: WebSocket | null = null;
+        let retry: ReturnType<typeof setTimeout> | undefined;
+        let keepAlive: ReturnType<typeof setInterval> | undefined;
+        let stopped = false;
+
+        const connect = () => {
+            socket = new WebSocket(`${WS_URL}?user_id=${currentUserId}`);
+            socket.onopen = () => {
+                setPushConnected(true);
+                keepAlive = setInterval(() => socket?.send('ping'), 25000);
+            };
+            socket.onclose = () => {
+                setPushConnected(false);
+                clearInterval(keepAlive);
+                if (!stopped) retry = setTimeout(connect, 3000);
+            };
+            socket.onmessage = (event) => {
+                const data = JSON.parse(event.data);
+                if (data.type === 'message') {
+                    const message: ChatMessage = data.message;
+                    if (activeChatRef.current?.id === data.chat_id) {
+                        setMessages(prev => prev.some(m => m.id === message.id) ? prev : [...prev, message]);
+                    }
+                    setChats(prev => {
+                        const chat = prev.find(c => c.id === data.chat_id);
+                        if (!chat) return prev;
+                        const updated = {
+                            ...chat,
+                            last_message: { content: message.content, sender_id: message.sender_id, created_at: message.created_at }
+                        };
+                        return [updated, ...prev.filter(c => c.id !== data.chat_id)];
+                    });
+                } else if (data.type === 'unread') {
+                    setChats(prev => prev.map(c => c.id !== data.chat_id ? c : {
+                        ...c,
+                        unread_count: data.unread_count ?? c.unread_count + data.delta
+                    }));
+                } else if (data.type === 'chat_created') {
+                    fetchChats();
+                }
+            };
+        };
+
+        connect();
+        return () => {
+            stopped = true;
+            clearTimeout(retry);
+            clearInterval(keepAlive);
+            socket?.close();
+        };
+    }, [currentUserId, fetchChats]);
+
     useEffect(() => {
         fetchChats();
         api.getStickers().then(setStickers).catch(() => { });
+        if (pushConnected) return;
         const interval = setInterval(fetchChats, 5000); // Poll every 5s
         return () => clearInterval(interval);
-    }, [fetchChats]);
+    }, [fetchChats, pushConnected]);
 
     useEffect(() => {
         if (activeChat) {
             fetchMessages(activeChat.id);
-            const interval = setInterval(() => fetchMessages(activeChat.id), 2000);
+            if (pushConnected) return;
+            const interval = setInterval(() => pollMessages(activeChat.id), 2000);
             return () => clearInterval(interval);
         }
-    }, [activeChat, fetchMessages]);
+    }, [activeChat, fetchMessages, pollMessages, pushConnected]);
 
 
     const handleSendMessage = async (contentOverride?: string, typeOverride?: string) => {
@@ -570,7 +661,7 @@ const MessengerApp: React.FC = () => {
                 content,
                 message_type: typeOverride || 'TEXT'
             });
-            fetchMessages(activeChat.id);
+            pollMessages(activeChat.id);
             fetchChats();
         } catch (e) {
             toast.error('Failed to send message');
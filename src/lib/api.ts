@@ -51,6 +51,66 @@ async function fetchApi<T>(endpoint: string, options?: RequestInit): Promise<T>
   return response.json();
 }
 
+// Keyset-paginated list endpoints return the next page's cursor in X-Next-Cursor;
+// follow it until the last page so large datasets are not silently truncated.
+async function fetchAllPages<T>(endpoint: string): Promise<T[]> {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const separator = endpoint.includes('?') ? '&' : '?';
+    const url = `${API_BASE_URL}${endpoint}${cursor ? `${separator}cursor=${encodeURIComponent(cursor)}` : ''}`;
+    const response = await fetch(url);
+    if (!response.ok) throw new Error(`API Error: ${response.statusText}`);
+    items.push(...(await response.json()));
+    cursor = response.headers.get('X-Next-Cursor');
+  } while (cursor);
+  return items;
+}
+
+export interface MapViewport {
+  west: number;
+  south: number;
+  east: number;
+  north: number;
+  zoom: number;
+}
+
+export interface MapCluster {
+  quadkey: string;
+  count: number;
+  lat: number;
+  lng: number;
+}
+
+export interface MapLayerData<T> {
+  clusters: MapCluster[];
+  points: T[];
+}
+
+// Viewport query of a map layer (reports, incidents): clusters below street zoom,
+// raw points (paged through next_cursor) above it.
+async function fetchViewport<T>(endpoint: string, viewport: MapViewport): Promise<MapLayerData<T>> {
+  const clamp = (value: number, limit: number) => Math.min(limit, Math.max(-limit, value));
+  const bbox = [
+    clamp(viewport.west, 180), clamp(viewport.south, 85),
+    clamp(viewport.east, 180), clamp(viewport.north, 85),
+  ].map(v => v.toFixed(6)).join(',');
+  const zoom = Math.max(0, Math.round(viewport.zoom));
+  const data: MapLayerData<T> = { clusters: [], points: [] };
+  let cursor: string | null = null;
+  do {
+    const params = new URLSearchParams({ bbox, zoom: String(zoom) });
+    if (cursor) params.set('cursor', cursor);
+    const response = await fetch(`${API_BASE_URL}${endpoint}?${params}`);
+    if (!response.ok) throw new Error(`API Error: ${response.statusText}`);
+    const page = await response.json();
+    data.clusters.push(...page.clusters);
+    data.points.push(...page.points);
+    cursor = page.next_cursor ?? null;
+  } while (cursor);
+  return data;
+}
+
 // Items API
 export const itemsApi = {
   getAll: async (filters?: { categoryId?: number; tagId?: number }) => {
@@ -239,14 +299,20 @@ export const statsApi = {
 export const emergencyApi = {
   getIncidents: async () => {
     try {
-      const response = await fetch(`${API_BASE_URL}/emergency/incidents`);
-      if (!response.ok) throw new Error("Emergency API failed");
-      return await response.json();
+      return await fetchAllPages<any>('/emergency/incidents');
     } catch (e) {
       console.warn("Emergency API offline");
       return [];
     }
   },
+  getIncidentsInView: async (viewport: MapViewport): Promise<MapLayerData<any>> => {
+    try {
+      return await fetchViewport<any>('/emergency/incidents', viewport);
+    } catch (e) {
+      console.warn("Emergency API offline");
+      return { clusters: [], points: [] };
+    }
+  },
   getStatus: async () => {
     try {
       const response = await fetch(`${API_BASE_URL}/emergency/status`);
@@ -307,22 +373,26 @@ export const transportApi = {
 export const reportsApi = {
   getAll: async () => {
     try {
-      const response = await fetch(`${API_BASE_URL}/reports`);
-      if (!response.ok) throw new Error("Failed to fetch reports");
-      return await response.json();
+      return await fetchAllPages<any>('/reports');
     } catch (e) {
       console.warn("Reports API offline");
       return [];
     }
+  },
+  getInView: async (viewport: MapViewport): Promise<MapLayerData<any>> => {
+    try {
+      return await fetchViewport<any>('/reports', viewport);
+    } catch (e) {
+      console.warn("Reports API offline");
+      return { clusters: [], points: [] };
+    }
   }
 };
 
 export const adminApi = {
   getUsers: async () => {
     try {
-      const response = await fetch(`${API_BASE_URL}/admin/users`);
-      if (!response.ok) throw new Error("Admin Users API failed");
-      return await response.json();
+      return await fetchAllPages<any>('/admin/users?limit=500');
     } catch (e) {
       console.warn("Admin Users API offline");
       return [];
@@ -23,6 +23,7 @@ import { ScrollArea } from '@/components/ui/scroll-area';
 import { ReportIssueDialog } from '@/components/ReportIssueDialog';
 import { toast } from 'sonner';
 import { cn } from '@/lib/utils';
+import { reportsApi } from '@/lib/api';
 
 interface CitizenReport {
     id: number;
@@ -41,10 +42,7 @@ const Infrastructure = () => {
 
     const { data: reports, isLoading } = useQuery({
         queryKey: ['citizen-reports'],
-        queryFn: async () => {
-            const res = await fetch('http://localhost:8000/api/reports');
-            return res.json();
-        },
+        queryFn: reportsApi.getAll,
         refetchInterval: 5000
     });
 